@@ -0,0 +1,131 @@
+"""
+Measures the latency of adding a record to the records database and showing it in the table
+with the selected row scrolled into the middle of the view
+
+  insert_ms              the incremental insert of the row, the view keeps the selection and the scroll position
+  insert_reselect_ms     the full reselect of the model, then the selection and the scroll position are restored
+  table_model_submit_ms  the QSqlTableModel insertRecord and submitAll the app did before the incremental insert,
+                         the selection and the scroll position are lost
+
+Every timing includes the repaint of the view.
+
+    python benchmarks/add_record.py --sizes 1000 100000 1000000
+
+"""
+
+from argparse import ArgumentParser
+import json
+from pathlib import Path
+import statistics
+import sys
+from tempfile import TemporaryDirectory
+import time
+
+from PySide6.QtCore import QItemSelectionModel, Qt
+from PySide6.QtSql import QSqlTableModel
+from PySide6.QtWidgets import QApplication, QTableView
+from synthetic import fill_records
+
+from voicerecorder.recordsdb import RecordsDatabase
+from voicerecorder.recordsmodel import RecordsTableModel
+
+SELECT_ROWS = QItemSelectionModel.SelectionFlag.ClearAndSelect | QItemSelectionModel.SelectionFlag.Rows
+
+
+def records_view(model: RecordsTableModel | QSqlTableModel, created_column: int) -> QTableView:
+    view = QTableView()
+    view.setModel(model)
+    view.setSortingEnabled(True)
+    view.sortByColumn(created_column, Qt.SortOrder.DescendingOrder)
+    view.resize(800, 600)
+    view.show()
+
+    row = min(model.rowCount() // 2, 200)
+    view.selectionModel().setCurrentIndex(model.index(row, 0), SELECT_ROWS)
+    view.scrollTo(model.index(row, 0), QTableView.ScrollHint.PositionAtCenter)
+
+    return view
+
+
+def measure(records_db: RecordsDatabase, view: QTableView, inserts: int, mode: str) -> float:
+    app = QApplication.instance()
+    model = view.model()
+    scroll_bar = view.verticalScrollBar()
+    timings = []
+
+    for i in range(inserts):
+        start = time.perf_counter()
+
+        filename = f'/records/new-{mode}-{i}.mka'
+
+        if mode == 'table_model_submit':
+            record = model.record()
+            record.setValue('filename', filename)
+            record.setValue('created', 2_000_000_000 + i)
+            record.setValue('duration', 1000)
+            record.setValue('format', 'Matroska/Opus')
+            model.insertRecord(-1, record)
+            model.submitAll()
+        else:
+            record_id = records_db.insert_record(filename, 2_000_000_000 + i, 1000, 'Matroska/Opus')
+
+            if mode == 'insert':
+                model.insert_record(record_id)
+            else:
+                selected_id = model.row_record(view.currentIndex().row())['id']
+                scroll_position = scroll_bar.value()
+
+                model.select()
+
+                row = model.record_row(selected_id)
+                view.selectionModel().setCurrentIndex(model.index(row, 0), SELECT_ROWS)
+                scroll_bar.setValue(scroll_position)
+
+        view.viewport().repaint()
+
+        timings.append(time.perf_counter() - start)
+        app.processEvents()
+
+    return statistics.median(timings) * 1000
+
+
+def main():
+    parser = ArgumentParser(description=__doc__)
+    parser.add_argument('--sizes', type=int, nargs='+', default=[1_000, 100_000, 1_000_000])
+    parser.add_argument('--inserts', type=int, default=100)
+    args = parser.parse_args()
+
+    app = QApplication(sys.argv)  # noqa: F841
+    report = {'inserts': args.inserts, 'results': {}}
+
+    with TemporaryDirectory() as tmp_dir:
+        for size in args.sizes:
+            records_db = RecordsDatabase(Path(tmp_dir) / f'records-{size}.db', connection_name=f'records-{size}')
+            records_db.open()
+            fill_records(records_db.database(), size)
+
+            results = report['results'][size] = {}
+
+            for mode in ('insert', 'insert_reselect'):
+                model = RecordsTableModel(records_db.database())
+                model.select()
+                view = records_view(model, model.field_index('created'))
+                results[f'{mode}_ms'] = measure(records_db, view, args.inserts, mode)
+                view.close()
+
+            table_model = QSqlTableModel(db=records_db.database())
+            table_model.setTable('records')
+            table_model.setEditStrategy(QSqlTableModel.EditStrategy.OnManualSubmit)
+            table_model.select()
+            view = records_view(table_model, table_model.fieldIndex('created'))
+            results['table_model_submit_ms'] = measure(records_db, view, args.inserts, 'table_model_submit')
+            view.close()
+
+            records_db.close()
+
+    json.dump(report, sys.stdout, indent=2)
+    sys.stdout.write('\n')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,160 @@
+"""
+Measures the cost of recording from several audio inputs at once with the recorder group
+
+Every input count runs in a fresh process that records for the given time and reports:
+
+  cpu_percent            the process CPU time (user + system) relative to the wall time
+  cpu_percent_per_input  the same divided by the input count
+  write_kib_per_s        the size of the written record files per second of recording
+  loop_lag_p95_ms        the 95th percentile of the GUI thread event loop lag, measured by a 10 ms timer
+  loop_lag_max_ms        the longest event loop stall
+
+If there are fewer inputs than requested, the inputs are reused. The records are written
+to a temporary directory with the file format and the codec from the settings.
+
+    python benchmarks/multiinput.py --inputs 1 2 4 --duration 30
+
+"""
+
+from argparse import ArgumentParser
+import json
+import os
+from pathlib import Path
+import platform
+import statistics
+import subprocess
+import sys
+from tempfile import TemporaryDirectory
+import time
+
+from PySide6 import __version__ as pyside_version
+from PySide6.QtCore import QCoreApplication, QStandardPaths, QTimer, qVersion
+
+LOOP_PROBE_INTERVAL = 10  # ms
+
+
+def measure(inputs: int, duration: float) -> dict[str, float]:
+    from voicerecorder.audiorecorder import AudioRecorder
+    from voicerecorder.constants import PKG_NAME
+    from voicerecorder.journal import RecordingJournal
+    from voicerecorder.recordergroup import RecorderGroup
+    from voicerecorder.recordsdb import RecordsDatabase
+    from voicerecorder.settings import Settings
+    from voicerecorder.utils import AUDIO_FILE_FORMATS, audio_media_format
+
+    app = QCoreApplication(sys.argv[:1])
+    app.setApplicationName(PKG_NAME)
+    QStandardPaths.setTestModeEnabled(True)
+
+    with TemporaryDirectory() as tmp_dir:
+        records_directory = Path(tmp_dir)
+
+        settings = Settings()
+        settings.set_records_directory(records_directory)
+
+        records_db = RecordsDatabase(records_directory / 'records.db', connection_name='multiinput')
+        records_db.open()
+        journal = RecordingJournal(records_db)
+
+        recorder = AudioRecorder(settings, app, journal=journal)
+        group = RecorderGroup(recorder, settings, journal, app)
+
+        audio_inputs = recorder.devices.inputs()
+        if not audio_inputs:
+            raise RuntimeError('There are no audio inputs')
+        audio_inputs = [audio_inputs[i % len(audio_inputs)] for i in range(inputs)]
+
+        recorder.set_audio_input(audio_inputs[0])
+        group.set_extra_inputs(audio_inputs[1:])
+
+        file_format = settings.get_file_format()
+        group.set_audio_format(
+            audio_media_format(file_format, settings.get_audio_codec()), AUDIO_FILE_FORMATS[file_format]
+        )
+
+        filenames = []
+        lags = []
+        last_probe = time.perf_counter()
+
+        def probe_loop():
+            nonlocal last_probe
+            now = time.perf_counter()
+            lags.append(max((now - last_probe) * 1000 - LOOP_PROBE_INTERVAL, 0))
+            last_probe = now
+
+        def on_recording_finished(record):
+            filenames.append(record.filename)
+            if group.is_idle():
+                app.quit()
+
+        loop_probe = QTimer(app)
+        loop_probe.setInterval(LOOP_PROBE_INTERVAL)
+        loop_probe.timeout.connect(probe_loop)
+
+        group.recording_finished.connect(on_recording_finished)
+        QTimer.singleShot(int(duration * 1000), group.stop_recording)
+        QTimer.singleShot(int(duration * 1000) + 60_000, app.quit)
+
+        cpu_start = time.process_time()
+        wall_start = time.perf_counter()
+
+        group.start_recording()
+        loop_probe.start()
+        app.exec()
+        loop_probe.stop()
+
+        wall = time.perf_counter() - wall_start
+        cpu = time.process_time() - cpu_start
+        written = sum(os.stat(filename).st_size for filename in filenames if os.path.exists(filename))
+
+        records_db.close()
+
+    cpu_percent = cpu / wall * 100
+    lags.sort()
+
+    return {
+        'records': len(filenames),
+        'cpu_percent': cpu_percent,
+        'cpu_percent_per_input': cpu_percent / inputs,
+        'write_kib_per_s': written / 1024 / duration,
+        'loop_lag_p95_ms': lags[int(len(lags) * 0.95)] if lags else 0.0,
+        'loop_lag_max_ms': lags[-1] if lags else 0.0,
+        'loop_lag_median_ms': statistics.median(lags) if lags else 0.0,
+    }
+
+
+def main():
+    parser = ArgumentParser(description=__doc__)
+    parser.add_argument('--inputs', type=int, nargs='+', default=[1, 2, 4])
+    parser.add_argument('--duration', type=float, default=30, help='recording time in seconds')
+    parser.add_argument('--output', type=Path, help='JSON file to write the results to (stdout if omitted)')
+    parser.add_argument('--child', type=int, help='measure the input count in this process')
+    args = parser.parse_args()
+
+    if args.child:
+        json.dump(measure(args.child, args.duration), sys.stdout)
+        return
+
+    report = {
+        'qt': qVersion(),
+        'pyside': pyside_version,
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'duration': args.duration,
+        'results': {},
+    }
+
+    for inputs in args.inputs:
+        command = [sys.executable, __file__, '--child', str(inputs), '--duration', str(args.duration)]
+        output = subprocess.run(command, capture_output=True, text=True, check=True)
+        report['results'][inputs] = json.loads(output.stdout)
+
+    if args.output:
+        args.output.write_text(json.dumps(report, indent=2) + '\n')
+    else:
+        json.dump(report, sys.stdout, indent=2)
+        sys.stdout.write('\n')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,91 @@
+"""
+Compares sort and insert times on a synthetic records database
+with the bare schema and with the indexed schema and tuned pragmas
+
+    python benchmarks/records_db.py --rows 1000000
+
+"""
+
+from argparse import ArgumentParser
+import json
+from pathlib import Path
+import sys
+from tempfile import TemporaryDirectory
+import time
+
+from PySide6.QtCore import QCoreApplication
+from PySide6.QtSql import QSqlDatabase
+from synthetic import fill_records
+
+from voicerecorder.recordsdb import MIGRATIONS, RecordsDatabase, exec_query
+
+SORT_QUERIES = {
+    'sort_created': 'SELECT * FROM records ORDER BY created DESC, id DESC LIMIT 256',
+    'sort_duration': 'SELECT * FROM records ORDER BY duration DESC, id DESC LIMIT 256',
+    'filter_format': "SELECT COUNT(*) FROM records WHERE format = 'Wave/FLAC'",
+}
+
+
+def open_baseline(path: Path) -> QSqlDatabase:
+    db = QSqlDatabase.addDatabase('QSQLITE', 'baseline')
+    db.setDatabaseName(path.as_posix())
+    db.open()
+    for sql in MIGRATIONS[0]:
+        exec_query(db, sql)
+    return db
+
+
+def open_tuned(path: Path) -> QSqlDatabase:
+    records_db = RecordsDatabase(path, connection_name='tuned')
+    records_db.open()
+    return records_db.database()
+
+
+def measure(db: QSqlDatabase, inserts: int, repeat: int) -> dict[str, float]:
+    results = {}
+
+    for name, sql in SORT_QUERIES.items():
+        timings = []
+        for _ in range(repeat):
+            start = time.perf_counter()
+            query = exec_query(db, sql)
+            while query.next():
+                pass
+            timings.append(time.perf_counter() - start)
+        results[f'{name}_ms'] = min(timings) * 1000
+
+    start = time.perf_counter()
+    for i in range(inserts):
+        exec_query(
+            db,
+            'INSERT INTO records (filename, created, duration, format) VALUES (?, ?, ?, ?)',
+            [f'/records/new-{i}.mka', 2_000_000_000 + i, 1000, 'Matroska/Opus'],
+        )
+    results['insert_ms'] = (time.perf_counter() - start) * 1000 / inserts
+
+    return results
+
+
+def main():
+    parser = ArgumentParser(description=__doc__)
+    parser.add_argument('--rows', type=int, default=100_000)
+    parser.add_argument('--inserts', type=int, default=200)
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    app = QCoreApplication(sys.argv)  # noqa: F841
+    report = {'rows': args.rows, 'inserts': args.inserts, 'results': {}}
+
+    with TemporaryDirectory() as tmp_dir:
+        for name, open_db in [('baseline', open_baseline), ('tuned', open_tuned)]:
+            db = open_db(Path(tmp_dir) / f'{name}.db')
+            fill_records(db, args.rows)
+            report['results'][name] = measure(db, args.inserts, args.repeat)
+            db.close()
+
+    json.dump(report, sys.stdout, indent=2)
+    sys.stdout.write('\n')
+
+
+if __name__ == '__main__':
+    main()
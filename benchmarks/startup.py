@@ -0,0 +1,111 @@
+"""
+Measures the GUI startup in fresh processes: the time to the first paint of the main window
+and the time until the multimedia is initialized and the recording controls are unlocked,
+both from the process start, so the imports are included
+
+    python benchmarks/startup.py --rows 100000 --runs 5
+
+"""
+
+import time
+
+_started = time.perf_counter()
+
+from argparse import ArgumentParser  # noqa: E402
+import json  # noqa: E402
+import statistics  # noqa: E402
+import subprocess  # noqa: E402
+import sys  # noqa: E402
+
+from PySide6.QtCore import QCoreApplication, QStandardPaths, QTimer  # noqa: E402
+
+
+def _elapsed_ms() -> float:
+    return (time.perf_counter() - _started) * 1000
+
+
+def measure_startup() -> dict[str, float]:
+    from PySide6.QtWidgets import QApplication
+
+    from voicerecorder.constants import PKG_NAME
+    from voicerecorder.mainwindow import MainWindow
+
+    app = QApplication(sys.argv[:1])
+    app.setApplicationName(PKG_NAME)
+    QStandardPaths.setTestModeEnabled(True)
+
+    timings = {}
+
+    def on_ready():
+        timings['multimedia_ready_ms'] = _elapsed_ms()
+        QTimer.singleShot(0, app.quit)
+
+    window = MainWindow()
+    window.first_painted.connect(lambda: timings.setdefault('first_paint_ms', _elapsed_ms()))
+    window.multimedia_ready.connect(on_ready)
+    window.show()
+
+    QTimer.singleShot(60_000, app.quit)
+    app.exec()
+    window.close()
+
+    return timings
+
+
+def prepare_records(rows: int) -> None:
+    """Fills the records database of the Qt test mode settings location with synthetic records"""
+
+    from synthetic import fill_records
+
+    from voicerecorder.constants import PKG_NAME
+    from voicerecorder.recordsdb import RecordsDatabase
+    from voicerecorder.settings import Settings
+
+    app = QCoreApplication(sys.argv[:1])  # noqa: F841
+    app.setApplicationName(PKG_NAME)
+    QStandardPaths.setTestModeEnabled(True)
+
+    settings = Settings()
+    settings.records_db_path().unlink(missing_ok=True)
+
+    records_db = RecordsDatabase(settings.records_db_path())
+    records_db.open()
+    fill_records(records_db.database(), rows)
+    records_db.close()
+
+
+def main():
+    parser = ArgumentParser(description=__doc__)
+    parser.add_argument('--rows', type=int, default=100_000)
+    parser.add_argument('--runs', type=int, default=5)
+    parser.add_argument('--child', action='store_true', help='measure one startup in this process')
+    args = parser.parse_args()
+
+    if args.child:
+        json.dump(measure_startup(), sys.stdout)
+        return
+
+    prepare_records(args.rows)
+
+    runs = []
+    for _ in range(args.runs):
+        output = subprocess.run([sys.executable, __file__, '--child'], capture_output=True, text=True, check=True)
+        runs.append(json.loads(output.stdout))
+
+    report = {'rows': args.rows, 'runs': args.runs, 'results': {}}
+
+    for metric in ('first_paint_ms', 'multimedia_ready_ms'):
+        values = [run[metric] for run in runs if metric in run]
+        if values:
+            report['results'][metric] = {
+                'median': statistics.median(values),
+                'min': min(values),
+                'max': max(values),
+            }
+
+    json.dump(report, sys.stdout, indent=2)
+    sys.stdout.write('\n')
+
+
+if __name__ == '__main__':
+    main()
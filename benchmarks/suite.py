@@ -0,0 +1,232 @@
+"""
+Benchmark suite of the records database, the table model, the delegates and the records manager
+
+Every size runs in a fresh offscreen process against a copy of a synthetic records database
+in the Qt test mode settings location and measures:
+
+  cold_open_ms      creating the records manager with the model and the view and painting the first page
+  select_ms         reselecting the model and repainting
+  sort_created_ms   sorting by the date and repainting
+  sort_duration_ms  sorting by the duration and repainting
+  scroll_ms         scrolling to a random position and painting the rows through the delegates
+  add_record_ms     adding a record and repainting
+  bulk_delete_ms    deleting the selected records with the Delete key and repainting
+
+The results (medians and minimums in ms) are written as JSON with the commit they were measured at
+
+    python benchmarks/suite.py --sizes 1000 100000 1000000 --output results.json
+
+"""
+
+from argparse import ArgumentParser
+import json
+import os
+from pathlib import Path
+import platform
+import random
+import shutil
+import statistics
+import subprocess
+import sys
+from tempfile import TemporaryDirectory
+import time
+
+from PySide6 import __version__ as pyside_version
+from PySide6.QtCore import QCoreApplication, QItemSelection, QItemSelectionModel, QStandardPaths, Qt, qVersion
+
+from voicerecorder.recordsdb import MIGRATIONS, RecordsDatabase
+
+# The synthetic records live in a directory that does not exist, so the startup rescan is cheap
+RECORDS_DIRECTORY = '/records'
+
+
+def prepare_database(path: Path, rows: int) -> None:
+    """Creates the synthetic records database with all the migrations applied"""
+
+    from synthetic import fill_records
+
+    records_db = RecordsDatabase(path, connection_name=f'prepare-{rows}')
+    records_db.open()
+    fill_records(records_db.database(), rows)
+    records_db.exec('UPDATE records SET missing = 1')
+    records_db.close()
+
+
+def _timings(func, repeat: int) -> dict[str, float]:
+    values = []
+    for i in range(repeat):
+        start = time.perf_counter()
+        func(i)
+        values.append((time.perf_counter() - start) * 1000)
+    return {'median': statistics.median(values), 'min': min(values)}
+
+
+def measure(database: Path, repeat: int, inserts: int, delete_rows: int) -> dict[str, dict[str, float]]:
+    from PySide6.QtMultimedia import QMediaFormat
+    from PySide6.QtTest import QTest
+    from PySide6.QtWidgets import QApplication, QTableView
+
+    from voicerecorder.constants import PKG_NAME
+    from voicerecorder.record import Record
+    from voicerecorder.recordsmanager import RecordsManager
+    from voicerecorder.settings import Settings
+    from voicerecorder.utils import audio_media_format
+
+    app = QApplication(sys.argv[:1])
+    app.setApplicationName(PKG_NAME)
+    QStandardPaths.setTestModeEnabled(True)
+
+    settings = Settings()
+    settings.set_records_directory(Path(RECORDS_DIRECTORY))
+
+    records_db_path = settings.records_db_path()
+    for suffix in ('', '-wal', '-shm'):
+        records_db_path.with_name(f'{records_db_path.name}{suffix}').unlink(missing_ok=True)
+    shutil.copyfile(database, records_db_path)
+
+    view = QTableView()
+    view.resize(1024, 768)
+    results = {}
+
+    def repaint():
+        view.viewport().repaint()
+
+    manager: RecordsManager | None = None
+
+    def cold_open(_):
+        nonlocal manager
+        manager = RecordsManager(settings, view)
+        view.show()
+        repaint()
+
+    results['cold_open_ms'] = _timings(cold_open, 1)
+
+    # Let the startup rescan of the records directory finish
+    QTest.qWait(200)
+
+    model = manager.records_model
+    orders = [Qt.SortOrder.AscendingOrder, Qt.SortOrder.DescendingOrder]
+
+    def select(_):
+        model.select()
+        repaint()
+
+    def sort_by(field):
+        def sort(i):
+            view.sortByColumn(model.field_index(field), orders[i % 2])
+            repaint()
+
+        return sort
+
+    results['select_ms'] = _timings(select, repeat)
+    results['sort_created_ms'] = _timings(sort_by('created'), repeat)
+    results['sort_duration_ms'] = _timings(sort_by('duration'), repeat)
+
+    rnd = random.Random(0)
+    scroll_bar = view.verticalScrollBar()
+
+    def scroll(_):
+        scroll_bar.setValue(rnd.randrange(scroll_bar.maximum() + 1))
+        repaint()
+
+    results['scroll_ms'] = _timings(scroll, repeat * 10)
+
+    audio_format = audio_media_format(QMediaFormat.FileFormat.Matroska, QMediaFormat.AudioCodec.Opus)
+
+    def add_record(i):
+        manager.add_record(Record(f'{RECORDS_DIRECTORY}/new-{i}.mka', 2_000_000_000 + i, 1000, audio_format))
+        repaint()
+
+    results['add_record_ms'] = _timings(add_record, inserts)
+
+    def bulk_delete(_):
+        rows = min(delete_rows, model.rowCount())
+        if not rows:
+            return
+        selection = QItemSelection(model.index(0, 0), model.index(rows - 1, 0))
+        view.selectionModel().select(
+            selection, QItemSelectionModel.SelectionFlag.ClearAndSelect | QItemSelectionModel.SelectionFlag.Rows
+        )
+        QTest.keyClick(view, Qt.Key.Key_Delete)
+        repaint()
+
+    view.setFocus()
+    results['bulk_delete_ms'] = _timings(bulk_delete, repeat)
+
+    view.close()
+    manager.close()
+
+    return results
+
+
+def _commit() -> str | None:
+    try:
+        output = subprocess.run(
+            ['git', 'rev-parse', 'HEAD'], cwd=Path(__file__).parent, capture_output=True, text=True, check=True
+        )
+    except (OSError, subprocess.CalledProcessError):
+        return None
+    return output.stdout.strip()
+
+
+def main():
+    parser = ArgumentParser(description=__doc__)
+    parser.add_argument('--sizes', type=int, nargs='+', default=[1_000, 10_000, 100_000, 1_000_000])
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--inserts', type=int, default=50)
+    parser.add_argument('--delete-rows', type=int, default=1000, help='records deleted at once')
+    parser.add_argument('--data-dir', type=Path, help='directory to keep the synthetic databases between runs')
+    parser.add_argument('--output', type=Path, help='JSON file to write the results to (stdout if omitted)')
+    parser.add_argument('--child', type=Path, help='measure the database in this process')
+    args = parser.parse_args()
+
+    os.environ.setdefault('QT_QPA_PLATFORM', 'offscreen')
+
+    if args.child:
+        json.dump(measure(args.child, args.repeat, args.inserts, args.delete_rows), sys.stdout)
+        return
+
+    report = {
+        'commit': _commit(),
+        'qt': qVersion(),
+        'pyside': pyside_version,
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'results': {},
+    }
+
+    with TemporaryDirectory() as tmp_dir:
+        data_dir = args.data_dir or Path(tmp_dir)
+        data_dir.mkdir(parents=True, exist_ok=True)
+
+        app = QCoreApplication(sys.argv[:1])  # noqa: F841
+
+        for size in args.sizes:
+            database = data_dir / f'records-{size}-v{len(MIGRATIONS)}.db'
+            if not database.exists():
+                prepare_database(database, size)
+
+            command = [
+                sys.executable,
+                __file__,
+                '--child',
+                str(database),
+                '--repeat',
+                str(args.repeat),
+                '--inserts',
+                str(args.inserts),
+                '--delete-rows',
+                str(args.delete_rows),
+            ]
+            output = subprocess.run(command, capture_output=True, text=True, check=True)
+            report['results'][size] = json.loads(output.stdout)
+
+    if args.output:
+        args.output.write_text(json.dumps(report, indent=2) + '\n')
+    else:
+        json.dump(report, sys.stdout, indent=2)
+        sys.stdout.write('\n')
+
+
+if __name__ == '__main__':
+    main()
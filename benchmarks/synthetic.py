@@ -0,0 +1,28 @@
+"""
+Synthetic records for the benchmarks
+"""
+
+import random
+
+from PySide6.QtSql import QSqlDatabase, QSqlQuery
+
+FORMATS = ['Matroska/Opus', 'Wave/FLAC', 'MPEG-4 Audio/AAC', 'Ogg/Vorbis']
+
+
+def fill_records(db: QSqlDatabase, rows: int, seed: int = 0) -> None:
+    """Inserts the given number of random records in one transaction"""
+
+    rnd = random.Random(seed)
+
+    query = QSqlQuery(db)
+    query.prepare('INSERT INTO records (filename, created, duration, format, description) VALUES (?, ?, ?, ?, ?)')
+
+    db.transaction()
+    for i in range(rows):
+        query.bindValue(0, f'/records/record-{i}.mka')
+        query.bindValue(1, 1_500_000_000 + rnd.randrange(300_000_000))
+        query.bindValue(2, rnd.randrange(10_000_000))
+        query.bindValue(3, rnd.choice(FORMATS))
+        query.bindValue(4, f'take {i}' if rnd.random() < 0.3 else None)
+        query.exec()
+    db.commit()
@@ -16,6 +16,7 @@ BuildRequires:  python3-hatchling
 BuildRequires:  pyproject-rpm-macros
 
 Requires:       python3-pyside6
+Requires:       python3-numpy
 
 %description
 VoiceRecorder is a simple voice/audio recording application.
@@ -40,6 +41,7 @@ install -Dpm 644 icons/mic.png %{buildroot}%{_datadir}/icons/hicolor/32x32/apps/
 %doc README.md
 %{python3_sitelib}/voicerecorder*
 %{_bindir}/voicerecorder
+%{_bindir}/voicerecorder-cli
 %{_datadir}/applications/voicerecorder.desktop
 %{_datadir}/icons/hicolor/32x32/apps/voicerecorder.png
 
@@ -0,0 +1,104 @@
+from typing import Self
+from dataclasses import dataclass
+
+from PySide6.QtCore import QByteArray, QCoreApplication, QObject, Signal
+from PySide6.QtMultimedia import QAudioDevice, QMediaDevices
+
+
+@dataclass
+class AudioInputInfo:
+    """Audio input with info"""
+
+    device: QAudioDevice
+    id: QByteArray
+    description: str
+
+    @classmethod
+    def from_audio_device(cls, audio_device: QAudioDevice, is_default: bool | None = None) -> Self:
+        if is_default is None:
+            is_default = QMediaDevices.defaultAudioInput().id() == audio_device.id()
+
+        description = audio_device.description()
+
+        if is_default:
+            default_label = QCoreApplication.translate('AudioInput', 'Default')
+            description = f'{audio_device.description()} [{default_label}]'
+
+        return cls(
+            device=audio_device,
+            id=audio_device.id(),
+            description=description,
+        )
+
+    @classmethod
+    def default_audio_input(cls) -> Self:
+        return cls.from_audio_device(QMediaDevices.defaultAudioInput(), is_default=True)
+
+
+def _device_key(device_id: QByteArray) -> bytes:
+    return bytes(device_id.data())
+
+
+def audio_inputs() -> list[AudioInputInfo]:
+    """Get the list of all available audio inputs"""
+
+    default_key = _device_key(QMediaDevices.defaultAudioInput().id())
+    inputs = []
+
+    for audio_input in QMediaDevices.audioInputs():
+        inputs.append(AudioInputInfo.from_audio_device(audio_input, _device_key(audio_input.id()) == default_key))
+
+    return inputs
+
+
+class AudioDeviceRegistry(QObject):
+    """Snapshot of the audio inputs indexed by id
+
+    The inputs are queried once and then only when QMediaDevices reports that they have changed,
+    the inputs that have been plugged, unplugged or changed (became the default one or not) are reported.
+    """
+
+    input_added = Signal(AudioInputInfo)
+    input_removed = Signal(AudioInputInfo)
+    input_changed = Signal(AudioInputInfo)
+
+    def __init__(self, parent: QObject | None = None):
+        super().__init__(parent)
+
+        self._inputs: dict[bytes, AudioInputInfo] = {}
+        self._default_key = b''
+        self._snapshot()
+
+        self._media_devices = QMediaDevices(self)
+        self._media_devices.audioInputsChanged.connect(self.refresh)
+
+    def inputs(self) -> list[AudioInputInfo]:
+        return list(self._inputs.values())
+
+    def get(self, device_id: QByteArray) -> AudioInputInfo | None:
+        return self._inputs.get(_device_key(device_id))
+
+    def default_input(self) -> AudioInputInfo | None:
+        return self._inputs.get(self._default_key)
+
+    def refresh(self) -> None:
+        old_inputs = self._inputs
+        self._snapshot()
+
+        for key, audio_input in old_inputs.items():
+            if key not in self._inputs:
+                self.input_removed.emit(audio_input)
+
+        for key, audio_input in self._inputs.items():
+            if key not in old_inputs:
+                self.input_added.emit(audio_input)
+            elif audio_input.description != old_inputs[key].description:
+                self.input_changed.emit(audio_input)
+
+    def _snapshot(self) -> None:
+        self._default_key = _device_key(QMediaDevices.defaultAudioInput().id())
+        self._inputs = {}
+
+        for audio_device in QMediaDevices.audioInputs():
+            key = _device_key(audio_device.id())
+            self._inputs[key] = AudioInputInfo.from_audio_device(audio_device, key == self._default_key)
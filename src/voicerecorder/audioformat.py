@@ -2,11 +2,14 @@ from typing import Self
 from dataclasses import dataclass
 from functools import partial
 
-from PySide6.QtCore import Signal
+from PySide6.QtCore import Qt, Signal
+from PySide6.QtGui import QAction
 from PySide6.QtMultimedia import QMediaFormat
 from PySide6.QtWidgets import QHBoxLayout, QLabel, QMenu, QWidget
 
+from .mediacapabilities import MediaCapabilities
 from .settings import Settings
+from .utils import AUDIO_FILE_FORMATS, audio_media_format
 
 
 @dataclass
@@ -43,22 +46,6 @@ class FileFormatInfo(ItemInfo[QMediaFormat.FileFormat]):
             description=QMediaFormat.fileFormatDescription(file_format),
         )
 
-    def supported_audio_codecs(
-        self,
-        mode: QMediaFormat.ConversionMode = QMediaFormat.ConversionMode.Encode,
-    ) -> list[AudioCodecInfo]:
-        """Get supported audio codecs for the file format"""
-
-        media_format = QMediaFormat()
-        media_format.setFileFormat(self.item)
-        media_format.setAudioCodec(QMediaFormat.AudioCodec.Unspecified)
-        media_format.setVideoCodec(QMediaFormat.VideoCodec.Unspecified)
-
-        codecs = []
-        for audio_codec in media_format.supportedAudioCodecs(mode):
-            codecs.append(AudioCodecInfo.from_audio_codec(audio_codec))
-        return codecs
-
 
 class AudioFormatInfoLabel[T: ItemInfo](QLabel):
     item_changed: Signal
@@ -115,25 +102,21 @@ class AudioCodecLabel(AudioFormatInfoLabel[AudioCodecInfo]):
 
 
 class AudioFormat(QWidget):
-    """AudioFormat widget to manipulate audio file formats and codecs"""
+    """AudioFormat widget to manipulate audio file formats and codecs
+
+    The supported formats and codecs are served from the persistent media capabilities cache,
+    which can be rescanned from the context menu.
+    """
 
     audio_format_changed = Signal(QMediaFormat, str)
 
-    audio_file_formats = {
-        QMediaFormat.FileFormat.Mpeg4Audio: '.mp4a',
-        QMediaFormat.FileFormat.Matroska: '.mka',
-        QMediaFormat.FileFormat.Ogg: '.oga',
-        QMediaFormat.FileFormat.Wave: '.wav',
-        QMediaFormat.FileFormat.WMA: '.wma',
-        QMediaFormat.FileFormat.MP3: '.mp3',
-        QMediaFormat.FileFormat.AAC: '.aac',
-        QMediaFormat.FileFormat.FLAC: '.flac',
-    }
+    audio_file_formats = AUDIO_FILE_FORMATS
 
     def __init__(self, settings: Settings, parent: QWidget | None = None, *args, **kwargs):
         super().__init__(parent, *args, **kwargs)
 
         self._settings = settings
+        self._capabilities = MediaCapabilities(settings.media_capabilities_path())
 
         self._file_format_label = FileFormatLabel()
         self._file_format_label.setToolTip(self.tr('File format (container)'))
@@ -141,8 +124,6 @@ class AudioFormat(QWidget):
         self._audio_codec_label = AudioCodecLabel()
         self._audio_codec_label.setToolTip(self.tr('Audio codec'))
 
-        self._set_file_formats_info()
-
         self._file_format_label.item_changed.connect(self._set_audio_codecs_info)
         self._file_format_label.item_changed.connect(self._on_change_audio_format)
         self._audio_codec_label.item_changed.connect(self._on_change_audio_format)
@@ -157,37 +138,55 @@ class AudioFormat(QWidget):
 
         self.setLayout(self._layout)
 
-    def audio_format(self) -> tuple[QMediaFormat, str]:
+        rescan_action = QAction(self.tr('Rescan formats and codecs'), self)
+        rescan_action.triggered.connect(self.rescan_formats)
+        self.addAction(rescan_action)
+        self.setContextMenuPolicy(Qt.ContextMenuPolicy.ActionsContextMenu)
+
+    def collect_formats(self) -> None:
+        """Loads the supported encoding formats and selects the ones from the settings"""
+
+        self._capabilities.load()
+        self._set_file_formats_info(self._settings.get_file_format(), self._settings.get_audio_codec())
+
+    def rescan_formats(self) -> None:
+        """Probes the supported encoding formats again and keeps the selected ones if they are still supported"""
+
         file_format = self._file_format_label.item()
         audio_codec = self._audio_codec_label.item()
 
-        media_format = QMediaFormat()
-        media_format.setFileFormat(file_format.item)
-        media_format.setAudioCodec(audio_codec.item)
-        media_format.setVideoCodec(QMediaFormat.VideoCodec.Unspecified)
+        self._capabilities.load(rescan=True)
 
-        return media_format, self.audio_file_formats[file_format.item]
+        if file_format is None or audio_codec is None:
+            self._set_file_formats_info(self._settings.get_file_format(), self._settings.get_audio_codec())
+        else:
+            self._set_file_formats_info(file_format.item, audio_codec.item)
 
-    def _set_file_formats_info(self):
-        media_format = QMediaFormat()
-        media_format.setFileFormat(QMediaFormat.FileFormat.UnspecifiedFormat)
-        media_format.setAudioCodec(QMediaFormat.AudioCodec.Unspecified)
-        media_format.setVideoCodec(QMediaFormat.VideoCodec.Unspecified)
+    def audio_format(self) -> tuple[QMediaFormat, str]:
+        file_format = self._file_format_label.item()
+        audio_codec = self._audio_codec_label.item()
 
+        media_format = audio_media_format(file_format.item, audio_codec.item)
+        return media_format, self.audio_file_formats[file_format.item]
+
+    def _set_file_formats_info(self, file_format: QMediaFormat.FileFormat, audio_codec: QMediaFormat.AudioCodec):
         formats = []
-        for file_format in media_format.supportedFileFormats(QMediaFormat.ConversionMode.Encode):
-            if file_format in self.audio_file_formats:
-                formats.append(FileFormatInfo.from_file_format(file_format))
+        for supported_format in self._capabilities.file_formats():
+            if supported_format in self.audio_file_formats:
+                formats.append(FileFormatInfo.from_file_format(supported_format))
+
+        if not formats:
+            return
 
         self._file_format_label.set_items(formats)
         self._set_audio_codecs_info(self._file_format_label.item())
 
-        self._file_format_label.set_item(FileFormatInfo.from_file_format(self._settings.get_file_format()))
-        self._audio_codec_label.set_item(AudioCodecInfo.from_audio_codec(self._settings.get_audio_codec()))
+        self._file_format_label.set_item(FileFormatInfo.from_file_format(file_format))
+        self._audio_codec_label.set_item(AudioCodecInfo.from_audio_codec(audio_codec))
 
     def _set_audio_codecs_info(self, file_format_info: FileFormatInfo):
-        codecs = file_format_info.supported_audio_codecs()
-        self._audio_codec_label.set_items(codecs)
+        codecs = self._capabilities.audio_codecs(file_format_info.item)
+        self._audio_codec_label.set_items([AudioCodecInfo.from_audio_codec(codec) for codec in codecs])
 
     def _on_change_audio_format(self):
         file_format = self._file_format_label.item()
@@ -196,9 +195,5 @@ class AudioFormat(QWidget):
         self._settings.set_file_format(file_format.item)
         self._settings.set_audio_codec(audio_codec.item)
 
-        media_format = QMediaFormat()
-        media_format.setFileFormat(file_format.item)
-        media_format.setAudioCodec(audio_codec.item)
-        media_format.setVideoCodec(QMediaFormat.VideoCodec.Unspecified)
-
+        media_format = audio_media_format(file_format.item, audio_codec.item)
         self.audio_format_changed.emit(media_format, self.audio_file_formats[file_format.item])
@@ -1,84 +1,82 @@
-from typing import Self
 from dataclasses import dataclass
 from datetime import datetime
+from functools import partial
+import os
 from pathlib import Path
-import shutil
 import time
 
-from PySide6.QtCore import QByteArray, QObject, Signal
-from PySide6.QtMultimedia import (
-    QAudioDevice,
-    QAudioInput,
-    QMediaCaptureSession,
-    QMediaDevices,
-    QMediaFormat,
-    QMediaRecorder,
-)
-from PySide6.QtWidgets import QApplication
-
-from .recordsmanager import Record
+from PySide6.QtCore import QObject, QTimer, QUrl, Signal
+from PySide6.QtMultimedia import QAudioInput, QMediaCaptureSession, QMediaDevices, QMediaFormat, QMediaRecorder
+
+from .audiodevices import AudioDeviceRegistry, AudioInputInfo
+from .journal import RecordingJournal
+from .levelmonitor import AudioLevelMonitor
+from .record import Record
+from .recordfinalizer import RecordFinalizer
 from .settings import Settings
+from .tasks import Task
+from .tracing import traced
+from .voiceactivity import VoiceActivityDetector
 
 
 @dataclass
-class AudioInputInfo:
-    """Audio input with info"""
-
-    device: QAudioDevice
-    id: QByteArray
-    description: str
-
-    @classmethod
-    def from_audio_device(cls, audio_device: QAudioDevice) -> Self:
-        default_audio_device = QMediaDevices.defaultAudioInput()
-        description = audio_device.description()
-
-        if default_audio_device.id() == audio_device.id():
-            default_label = QApplication.translate('AudioInput', 'Default')
-            description = f'{audio_device.description()} [{default_label}]'
-
-        return cls(
-            device=audio_device,
-            id=audio_device.id(),
-            description=description,
-        )
-
-    @classmethod
-    def from_id(cls, device_id: QByteArray) -> Self:
-        audio_device = QMediaDevices.defaultAudioInput()
-
-        for audio_input in QMediaDevices.audioInputs():
-            if device_id == audio_input.id():
-                audio_device = audio_input
-                break
+class _Take:
+    """The file one of the recorders is writing"""
 
-        return cls.from_audio_device(audio_device)
+    location: Path
+    started: float
+    session: Path | None = None
+    failed: bool = False
+    journal_id: int | None = None
+    group: str | None = None
+    offset: int | None = None
 
-    @classmethod
-    def default_audio_input(cls) -> Self:
-        return cls.from_audio_device(QMediaDevices.defaultAudioInput())
 
+class AudioRecorder(QMediaRecorder):
+    """Audio recorder
 
-def audio_inputs() -> list[AudioInputInfo]:
-    """Get the list of all available audio inputs"""
-
-    inputs = []
+    If the input is unplugged, the recorder switches to the fallback input from the settings
+    or to the default one and the record goes on.
 
-    for audio_input in QMediaDevices.audioInputs():
-        inputs.append(AudioInputInfo.from_audio_device(audio_input))
+    In the segmented mode the record is split into the segments of the limited duration or size,
+    which are grouped by the playlist of the recording session. The next segment is started
+    by the standby recorder of the same input, and the current one is stopped only when the next one
+    has started to record, so there is no gap between the segments.
 
-    return inputs
+    A follower records an extra input of the recorder group: its input is not monitored,
+    so it is not auto-paused, and its recording is stopped if the input is unplugged.
 
-
-class AudioRecorder(QMediaRecorder):
-    """Audio recorder"""
+    If the journal is given, the files that are being recorded are journaled in it, so that they
+    can be recovered if the app dies before they are saved.
+    """
 
     recording_finished = Signal(Record)
-
-    def __init__(self, settings: Settings, parent: QObject | None = None) -> None:
+    recording_failed = Signal(str)
+    record_duration_changed = Signal(int)
+    task_started = Signal(Task, str)
+    auto_paused = Signal(bool)
+    input_failed_over = Signal(AudioInputInfo, AudioInputInfo)
+
+    segment_check_interval = 1000
+    journal_interval = 2000
+    handover_overlap = 250
+
+    def __init__(
+        self,
+        settings: Settings,
+        parent: QObject | None = None,
+        devices: AudioDeviceRegistry | None = None,
+        journal: RecordingJournal | None = None,
+        follower: bool = False,
+    ) -> None:
         super().__init__(parent)
 
         self._settings = settings
+        self._journal = journal
+        self._follower = follower
+
+        self._devices = devices or AudioDeviceRegistry(self)
+        self._devices.input_removed.connect(self._on_input_removed)
 
         self.setQuality(QMediaRecorder.Quality.HighQuality)
         self.setEncodingMode(QMediaRecorder.EncodingMode.ConstantQualityEncoding)
@@ -89,9 +87,53 @@ class AudioRecorder(QMediaRecorder):
         self._media_capture_session.setAudioInput(self._audio_input)
         self._media_capture_session.setRecorder(self)
 
+        self._level_monitor = AudioLevelMonitor(self)
+        if not follower:
+            self._level_monitor.set_device(self._audio_input.device())
+        self._level_monitor.block_ready.connect(self._on_input_block)
+
+        self._voice_detector = VoiceActivityDetector(parent=self)
+        self._voice_detector.voice_changed.connect(self._on_voice_changed)
+
+        self._auto_pause = False
+        self._auto_paused = False
+        self._user_paused = False
+
         self._suffix: str | None = None
 
-        self.recorderStateChanged.connect(self._on_change_recorder_state)
+        self._takes: dict[QMediaRecorder, _Take] = {}
+        self._saving = 0
+
+        # The recorder that writes the current segment and the one that is starting the next segment
+        self._writer: QMediaRecorder = self
+        self._handover: QMediaRecorder | None = None
+
+        self._standby: QMediaRecorder | None = None
+        self._standby_input: QAudioInput | None = None
+
+        self._group: str | None = None
+
+        self._session: Path | None = None
+        self._segment_index = 0
+        self._session_offset = 0
+
+        self._segment_timer = QTimer(self)
+        self._segment_timer.setInterval(self.segment_check_interval)
+        self._segment_timer.timeout.connect(self._check_segment)
+
+        self._journal_timer = QTimer(self)
+        self._journal_timer.setInterval(self.journal_interval)
+        self._journal_timer.timeout.connect(self._update_journal)
+
+        self._connect_recorder(self)
+
+    @property
+    def level_monitor(self) -> AudioLevelMonitor:
+        return self._level_monitor
+
+    @property
+    def devices(self) -> AudioDeviceRegistry:
+        return self._devices
 
     def audio_input_info(self) -> AudioInputInfo:
         return AudioInputInfo(
@@ -103,38 +145,351 @@ class AudioRecorder(QMediaRecorder):
     def set_audio_input(self, audio_input: AudioInputInfo) -> None:
         if audio_input.id == self._audio_input.device().id():
             return
-        self._audio_input.deleteLater()
-        self._audio_input = QAudioInput(audio_input.device, self)
-        self._media_capture_session.setAudioInput(self._audio_input)
+        self._audio_input.setDevice(audio_input.device)
+        if self._standby_input is not None:
+            self._standby_input.setDevice(audio_input.device)
+        if not self._follower:
+            self._level_monitor.set_device(audio_input.device)
 
     def set_audio_format(self, audio_format: QMediaFormat, suffix: str):
         self.setMediaFormat(audio_format)
         self._suffix = suffix
 
-    def _on_change_recorder_state(self, state: QMediaRecorder.RecorderState) -> None:
-        match state:
-            case QMediaRecorder.RecorderState.StoppedState:
-                self._finish_recording()
+    def recording_state(self) -> QMediaRecorder.RecorderState:
+        """The state of the recording, which may go on in the standby recorder in the segmented mode"""
+        return self._writer.recorderState()
+
+    def record_duration(self) -> int:
+        """The duration of the record in ms, including the finished segments of the session"""
+        return self._session_offset + self._writer.duration()
+
+    def record_location(self) -> Path | None:
+        """The session playlist in the segmented mode or the record file"""
+
+        if self._session is not None:
+            return self._session
+        take = self._takes.get(self._writer)
+        return take.location if take is not None else None
+
+    def output_locations(self) -> set[str]:
+        """The files the recorder is writing to, including the temporary locations and the session playlist"""
+
+        locations = {take.location.as_posix() for take in self._takes.values()}
+        locations.update(
+            recorder.actualLocation().toLocalFile()
+            for recorder in self._takes
+            if not recorder.actualLocation().isEmpty()
+        )
+        if self._session is not None:
+            locations.add(self._session.as_posix())
+        return locations
+
+    def is_idle(self) -> bool:
+        """Whether the recording is stopped and all its files are saved"""
+        return (
+            self.recording_state() == QMediaRecorder.RecorderState.StoppedState and not self._takes and not self._saving
+        )
+
+    def start_recording(self, started: float | None = None, label: str | None = None, group: str | None = None) -> None:
+        """Starts a new record
+
+        The record filename is chosen before the start. In the direct mode the recorder writes
+        to that file, otherwise it writes to its own location and the file is moved after stop.
+        The recorders of a group share the creation time and have the labels added to the filenames.
+        """
+
+        started = started or time.time()
+        self._group = group
+
+        self._auto_pause = not self._follower and self._settings.auto_pause()
+        self._auto_paused = False
+        self._user_paused = False
+        self._voice_detector.configure(self._settings.auto_pause_threshold(), self._settings.auto_pause_hangover())
+        self._voice_detector.reset()
+
+        self._writer = self
+        self._handover = None
+        self._session_offset = 0
+
+        if self._settings.segment_minutes() or self._settings.segment_megabytes():
+            self._session = self._new_record_location(started, '.m3u', label)
+            self._segment_index = 1
+            location = self._segment_location()
+            self._segment_timer.start()
+        else:
+            self._session = None
+            location = self._new_record_location(started, label=label)
+
+        self._start_take(self, location, started)
+
+        if self._journal is not None:
+            self._journal_timer.start()
+
+    def stop_recording(self) -> None:
+        self._segment_timer.stop()
+
+        if self._handover is not None:
+            handover, self._handover = self._handover, None
+            handover.stop()
+
+        self._writer.stop()
+
+    def pause_recording(self) -> None:
+        """Pauses the record by the user, the auto-pause does not resume it"""
+
+        self._user_paused = True
+        self._set_auto_paused(False)
+        self._writer.pause()
+
+    def resume_recording(self) -> None:
+        self._user_paused = False
+        self._voice_detector.reset()
+        self._writer.record()
+
+    def _connect_recorder(self, recorder: QMediaRecorder) -> None:
+        recorder.recorderStateChanged.connect(partial(self._on_recorder_state_changed, recorder))
+        recorder.durationChanged.connect(partial(self._on_recorder_duration_changed, recorder))
+        recorder.errorOccurred.connect(partial(self._on_error, recorder))
+
+    def _standby_recorder(self) -> QMediaRecorder:
+        """Returns the second recorder of the same input and format, which starts the next segment"""
+
+        if self._standby is None:
+            self._standby = QMediaRecorder(self)
+            self._standby.setQuality(self.quality())
+            self._standby.setEncodingMode(self.encodingMode())
+
+            self._standby_input = QAudioInput(self._audio_input.device(), self._standby)
+
+            capture_session = QMediaCaptureSession(self._standby)
+            capture_session.setAudioInput(self._standby_input)
+            capture_session.setRecorder(self._standby)
 
-    def _finish_recording(self):
-        ts = time.time()
+            self._connect_recorder(self._standby)
+
+        self._standby.setMediaFormat(self.mediaFormat())
+        self._standby_input.setDevice(self._audio_input.device())
+
+        return self._standby
+
+    def _start_take(self, recorder: QMediaRecorder, location: Path, started: float) -> None:
+        take = self._takes[recorder] = _Take(location, started, self._session, group=self._group)
+
+        if self._journal is not None:
+            take.journal_id = self._journal.begin(location, started, recorder.mediaFormat(), self._session)
+
+        if self._settings.record_to_destination():
+            location.parent.mkdir(parents=True, exist_ok=True)
+            recorder.setOutputLocation(QUrl.fromLocalFile(location.as_posix()))
+        else:
+            recorder.setOutputLocation(QUrl())
+
+        recorder.record()
+
+    def _update_journal(self) -> None:
+        for recorder, take in self._takes.items():
+            self._journal_take(recorder, take)
+
+    def _journal_take(self, recorder: QMediaRecorder, take: _Take) -> None:
+        if self._journal is not None and take.journal_id is not None:
+            self._journal.update(take.journal_id, recorder.actualLocation().toLocalFile(), recorder.duration())
+
+    def _end_journal_entry(self, take: _Take) -> None:
+        if self._journal is not None and take.journal_id is not None:
+            self._journal.end(take.journal_id)
+
+    def _check_segment(self) -> None:
+        if self._handover is not None or self._writer.recorderState() != QMediaRecorder.RecorderState.RecordingState:
+            return
+
+        segment_minutes = self._settings.segment_minutes()
+        segment_megabytes = self._settings.segment_megabytes()
+
+        rotate = segment_minutes is not None and self._writer.duration() >= segment_minutes * 60_000
+
+        if not rotate and segment_megabytes is not None:
+            try:
+                size = os.stat(self._writer.actualLocation().toLocalFile()).st_size
+            except OSError:
+                size = 0
+            rotate = size >= segment_megabytes * 1024 * 1024
+
+        if rotate:
+            self._rotate_segment()
+
+    def _rotate_segment(self) -> None:
+        recorder = self._standby_recorder() if self._writer is self else self
+
+        self._segment_index += 1
+        self._handover = recorder
+        self._start_take(recorder, self._segment_location(), time.time())
+
+    def _complete_handover(self) -> None:
+        previous, self._writer = self._writer, self._handover
+        self._handover = None
+        self._session_offset += previous.duration()
+
+        if self._user_paused or self._auto_paused:
+            self._writer.pause()
+
+        # The overlap is kept so that the last buffers of the previous segment are not lost
+        QTimer.singleShot(self.handover_overlap, previous.stop)
+
+    def _segment_location(self) -> Path:
+        suffix = self._suffix or f'.{self.mediaFormat().mimeType().preferredSuffix()}'
+        return self._session.with_name(f'{self._session.stem}-{self._segment_index:03d}{suffix}')
+
+    def _on_input_removed(self, removed_input: AudioInputInfo) -> None:
+        if removed_input.id != self._audio_input.device().id():
+            return
+
+        if self._follower:
+            if self.recording_state() != QMediaRecorder.RecorderState.StoppedState:
+                self.stop_recording()
+            return
+
+        candidates = [
+            self._devices.get(self._settings.audio_fallback_input_id()),
+            self._devices.default_input(),
+            *self._devices.inputs(),
+        ]
+        fallback_input = next((info for info in candidates if info is not None and info.id != removed_input.id), None)
+
+        if fallback_input is None:
+            # Nothing to record from, so the record is saved as it is
+            self._level_monitor.stop()
+            if self.recording_state() != QMediaRecorder.RecorderState.StoppedState:
+                self.stop_recording()
+            return
+
+        self.set_audio_input(fallback_input)
+        self.input_failed_over.emit(removed_input, fallback_input)
+
+    def _on_input_block(self, samples) -> None:
+        if not self._auto_pause or self._user_paused:
+            return
+        if self.recording_state() == QMediaRecorder.RecorderState.StoppedState:
+            return
+
+        self._voice_detector.process(samples, self._level_monitor.sample_rate())
+
+    def _on_voice_changed(self, voice: bool) -> None:
+        if voice and self._auto_paused:
+            self._set_auto_paused(False)
+            self._writer.record()
+        elif not voice and self.recording_state() == QMediaRecorder.RecorderState.RecordingState:
+            self._set_auto_paused(True)
+            self._writer.pause()
+
+    def _set_auto_paused(self, auto_paused: bool) -> None:
+        if auto_paused == self._auto_paused:
+            return
+
+        self._auto_paused = auto_paused
+
+        # While waiting for the voice the input is read more often to catch its start sooner
+        if auto_paused:
+            self._level_monitor.set_update_interval(self._settings.auto_pause_pre_roll())
+        else:
+            self._level_monitor.set_update_interval(AudioLevelMonitor.update_interval)
+
+        self.auto_paused.emit(auto_paused)
+
+    def _new_record_location(self, ts: float, suffix: str | None = None, label: str | None = None) -> Path:
         datetime_format = self._settings.record_filename_format()
         record_name = datetime.fromtimestamp(ts).strftime(datetime_format)
+        if label:
+            record_name = f'{record_name}-{label}'
+        suffix = suffix or self._suffix or f'.{self.mediaFormat().mimeType().preferredSuffix()}'
 
-        record_location = Path(self.actualLocation().toLocalFile())
-        suffix = self._suffix or record_location.suffix
+        records_directory = self._settings.records_directory()
+        location = records_directory / f'{record_name}{suffix}'
 
-        new_record_location = self._settings.records_directory() / f'{record_name}{suffix}'
-        new_record_location.parent.mkdir(parents=True, exist_ok=True)
+        index = 1
+        while location.exists():
+            location = records_directory / f'{record_name}-{index}{suffix}'
+            index += 1
 
-        if new_record_location != record_location:
-            shutil.move(record_location, new_record_location)
+        return location
 
-        self.recording_finished.emit(
-            Record(
-                filename=new_record_location.as_posix(),
-                duration=self.duration(),
-                created=int(ts),
-                audio_format=QMediaFormat(self.mediaFormat()),
+    def _on_recorder_state_changed(self, recorder: QMediaRecorder, state: QMediaRecorder.RecorderState) -> None:
+        match state:
+            case QMediaRecorder.RecorderState.RecordingState:
+                # The location the recorder writes to is known from now on
+                if take := self._takes.get(recorder):
+                    if take.offset is None:
+                        take.offset = max(int((time.time() - take.started) * 1000), 0)
+                    self._journal_take(recorder, take)
+                if recorder is self._handover:
+                    self._complete_handover()
+            case QMediaRecorder.RecorderState.StoppedState:
+                if recorder is self._handover:
+                    # The next segment has failed to start, so the current one goes on
+                    self._handover = None
+                elif recorder is self._writer:
+                    self._segment_timer.stop()
+                    self._journal_timer.stop()
+                    self._auto_pause = False
+                    self._set_auto_paused(False)
+                self._finish_recording(recorder)
+
+    def _on_recorder_duration_changed(self, recorder: QMediaRecorder, duration: int) -> None:
+        if recorder is self._writer:
+            self.record_duration_changed.emit(self._session_offset + duration)
+
+    def _on_error(self, recorder: QMediaRecorder, error: QMediaRecorder.Error, error_string: str) -> None:
+        take = self._takes.get(recorder)
+        if take is not None:
+            take.failed = True
+        self.recording_failed.emit(error_string)
+
+    @traced('AudioRecorder.finish_recording')
+    def _finish_recording(self, recorder: QMediaRecorder):
+        take = self._takes.pop(recorder, None)
+        if take is None:
+            return
+
+        record_location = Path(recorder.actualLocation().toLocalFile())
+
+        if take.failed:
+            # Do not leave the partial file of the failed record in the records directory
+            if self._settings.record_to_destination():
+                record_location.unlink(missing_ok=True)
+            self._end_journal_entry(take)
+            return
+
+        # If the file cannot be saved, the journal entry is left for the recovery
+        self._journal_take(recorder, take)
+
+        duration = recorder.duration()
+        audio_format = QMediaFormat(recorder.mediaFormat())
+        session = take.session.as_posix() if take.session is not None else None
+
+        def on_finalized(filename: str) -> None:
+            self._saving -= 1
+            self.recording_finished.emit(
+                Record(
+                    filename=filename,
+                    duration=duration,
+                    created=int(take.started),
+                    audio_format=audio_format,
+                    session=session,
+                    group=take.group,
+                    offset=take.offset or 0,
+                )
             )
-        )
+            self._end_journal_entry(take)
+
+        def on_not_saved() -> None:
+            self._saving -= 1
+
+        self._saving += 1
+
+        finalizer = RecordFinalizer(record_location, take.location, self)
+        finalizer.finalized.connect(on_finalized)
+        finalizer.failed.connect(on_not_saved)
+        finalizer.cancelled.connect(on_not_saved)
+        finalizer.finished.connect(finalizer.deleteLater)
+
+        self.task_started.emit(finalizer, self.tr('Saving record'))
+        finalizer.start()
@@ -0,0 +1,63 @@
+import math
+
+import numpy as np
+from PySide6.QtMultimedia import QAudioFormat
+
+SILENCE_DB = -90.0
+
+# dtype, zero level and full scale of the sample formats
+_SAMPLE_FORMATS = {
+    QAudioFormat.SampleFormat.UInt8: (np.uint8, 128.0, 128.0),
+    QAudioFormat.SampleFormat.Int16: (np.int16, 0.0, 32768.0),
+    QAudioFormat.SampleFormat.Int32: (np.int32, 0.0, 2147483648.0),
+    QAudioFormat.SampleFormat.Float: (np.float32, 0.0, 1.0),
+}
+
+
+def mono_samples(data: bytes, audio_format: QAudioFormat) -> np.ndarray:
+    """Converts the interleaved PCM data to mono float32 samples in [-1, 1]"""
+
+    if audio_format.sampleFormat() not in _SAMPLE_FORMATS:
+        return np.empty(0, dtype=np.float32)
+
+    dtype, zero, scale = _SAMPLE_FORMATS[audio_format.sampleFormat()]
+    channels = max(audio_format.channelCount(), 1)
+
+    samples = np.frombuffer(data, dtype=dtype)
+    samples = samples[: samples.size - samples.size % channels].astype(np.float32)
+    samples = (samples - zero) / scale
+
+    if channels > 1:
+        samples = samples.reshape(-1, channels).mean(axis=1)
+    return samples
+
+
+def levels(samples: np.ndarray) -> tuple[float, float]:
+    """Returns the RMS and the peak level of the samples in dBFS"""
+
+    if samples.size == 0:
+        return SILENCE_DB, SILENCE_DB
+
+    rms = float(np.sqrt(np.mean(np.square(samples, dtype=np.float64))))
+    peak = float(np.max(np.abs(samples)))
+
+    return to_db(rms), to_db(peak)
+
+
+def to_db(value: float) -> float:
+    return max(20.0 * math.log10(value), SILENCE_DB) if value > 0 else SILENCE_DB
+
+
+def frame_features(samples: np.ndarray, frame_size: int) -> tuple[np.ndarray, np.ndarray]:
+    """Returns the energy in dBFS and the zero-crossing rate of every whole frame of the samples"""
+
+    count = samples.size // frame_size
+    frames = samples[: count * frame_size].reshape(count, frame_size)
+
+    energy = np.mean(np.square(frames, dtype=np.float64), axis=1)
+    energy_db = 10.0 * np.log10(np.maximum(energy, 10.0 ** (SILENCE_DB / 10.0)))
+
+    signs = np.signbit(frames)
+    zero_crossing_rate = np.count_nonzero(signs[:, 1:] != signs[:, :-1], axis=1) / max(frame_size - 1, 1)
+
+    return energy_db, zero_crossing_rate
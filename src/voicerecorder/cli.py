@@ -0,0 +1,281 @@
+"""
+Command line interface to record and manage the records without the GUI
+
+Every command writes its results and events to stdout as JSON lines.
+"""
+
+from typing import Any
+import argparse
+from collections.abc import Sequence
+import json
+import os
+from pathlib import Path
+import signal
+import sys
+
+from PySide6.QtCore import QCoreApplication, QTimer
+
+from .audiodevices import AudioInputInfo, audio_inputs
+from .audiorecorder import AudioRecorder
+from .constants import APP_NAME, APP_VERSION, PKG_NAME
+from .exporter import EXPORT_TARGETS, ExportTask, export_jobs, ffmpeg_path
+from .journal import RecordingJournal
+from .record import Record
+from .recordergroup import RecorderGroup
+from .recordsdb import RecordsDatabase
+from .sessions import add_segment, attach_segments
+from .settings import Settings
+from .tracing import TRACE_OPTION, configure
+from .utils import AUDIO_FILE_FORMATS, audio_media_format, format_audio_format
+
+os.environ['QT_ENABLE_EXPERIMENTAL_CODECS'] = '1'
+
+COMMANDS = ('record', 'list', 'export', 'delete', 'inputs')
+
+
+def _emit(event: str, **data: Any) -> None:
+    sys.stdout.write(json.dumps({'event': event, **data}, ensure_ascii=False) + '\n')
+    sys.stdout.flush()
+
+
+def _record_data(record: dict[str, Any]) -> dict[str, Any]:
+    return {**record, 'missing': bool(record['missing'])}
+
+
+def _input_id(audio_input: AudioInputInfo) -> str:
+    return audio_input.id.data().decode(errors='replace')
+
+
+def _find_input(inputs: list[AudioInputInfo], query: str) -> AudioInputInfo | None:
+    matching = [info for info in inputs if query in (_input_id(info), info.description)]
+    matching = matching or [info for info in inputs if query.lower() in info.description.lower()]
+    return matching[0] if matching else None
+
+
+def _parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(prog=PKG_NAME, description=f'{APP_NAME} command line interface')
+    parser.add_argument('--version', action='version', version=APP_VERSION)
+    parser.add_argument(TRACE_OPTION, metavar='FILE', help='write a Chrome trace of the spans to the file at exit')
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    record = commands.add_parser('record', help='record from the audio input')
+    record.add_argument('--duration', type=float, required=True, help='record duration in seconds')
+    record.add_argument(
+        '--input',
+        action='append',
+        help='audio input id or a part of its description (the default input if omitted), '
+        'repeat it to record from several inputs at once',
+    )
+    record.add_argument('--description', help='record description')
+
+    list_ = commands.add_parser('list', help='list the records in the creation order')
+    list_.add_argument('--search', default='', help='words the descriptions contain')
+    list_.add_argument('--limit', type=int, help='maximum number of records')
+
+    export = commands.add_parser('export', help='transcode the records to another format')
+    export.add_argument('ids', type=int, nargs='+', help='record ids')
+    export.add_argument('--format', required=True, choices=[target.name.lower() for target in EXPORT_TARGETS])
+    export.add_argument('--output', type=Path, required=True, help='output directory')
+
+    delete = commands.add_parser('delete', help='delete the records')
+    delete.add_argument('ids', type=int, nargs='+', help='record ids')
+    delete.add_argument('--keep-files', action='store_true', help='do not delete the record files')
+
+    commands.add_parser('inputs', help='list the audio inputs')
+
+    return parser
+
+
+def _record(app: QCoreApplication, settings: Settings, records_db: RecordsDatabase, args: argparse.Namespace) -> int:
+    journal = RecordingJournal(records_db)
+    recorder = AudioRecorder(settings, app, journal=journal)
+    group = RecorderGroup(recorder, settings, journal, app)
+
+    audio_inputs = []
+    for query in args.input or []:
+        audio_input = _find_input(recorder.devices.inputs(), query)
+        if audio_input is None:
+            _emit('error', message=f'Audio input {query!r} is not found')
+            return 1
+        audio_inputs.append(audio_input)
+
+    recorder.set_audio_input(audio_inputs[0] if audio_inputs else AudioInputInfo.default_audio_input())
+    group.set_extra_inputs(audio_inputs[1:])
+
+    file_format = settings.get_file_format()
+    group.set_audio_format(audio_media_format(file_format, settings.get_audio_codec()), AUDIO_FILE_FORMATS[file_format])
+
+    record_ids = []
+
+    def on_error(_error, message: str) -> None:
+        _emit('error', message=message)
+        app.exit(1)
+
+    def on_task_started(task, text: str) -> None:
+        task.failed.connect(lambda message: on_error(None, f'{text}: {message}'))
+
+    def on_recording_finished(record: Record) -> None:
+        description = args.description or record.description
+
+        if record.session is not None:
+            record_id, _ = add_segment(records_db, record, description)
+            _emit('segment', id=record_id, filename=record.filename, duration=record.duration)
+        else:
+            record_id = records_db.insert_record(
+                record.filename, record.created, record.duration, format_audio_format(record.audio_format), description
+            )
+
+        if record.group is not None:
+            records_db.add_to_group(record_id, record.group, record.offset)
+        if record_id not in record_ids:
+            record_ids.append(record_id)
+
+        if group.is_idle():
+            for record_data in records_db.select_records(record_ids):
+                if record_group := records_db.record_group(record_data['id']):
+                    record_data['group'], record_data['offset'] = record_group
+                _emit('recorded', **_record_data(record_data))
+            app.exit(0)
+
+    def report_progress() -> None:
+        _emit('progress', duration=recorder.record_duration(), state=recorder.recording_state().name)
+
+    for group_recorder in group.recorders():
+        group_recorder.recording_failed.connect(lambda message: on_error(None, message))
+    group.task_started.connect(on_task_started)
+    group.recording_finished.connect(on_recording_finished)
+
+    progress_timer = QTimer(app)
+    progress_timer.setInterval(1000)
+    progress_timer.timeout.connect(report_progress)
+
+    # Stop and save the records on Ctrl+C or SIGTERM
+    signal.signal(signal.SIGINT, lambda *_: group.stop_recording())
+    signal.signal(signal.SIGTERM, lambda *_: group.stop_recording())
+
+    QTimer.singleShot(int(args.duration * 1000), group.stop_recording)
+    group.start_recording()
+    progress_timer.start()
+
+    locations = [group_recorder.record_location() for group_recorder in group.recorders()]
+    filenames = [location.as_posix() if location is not None else None for location in locations]
+    _emit('started', filename=filenames[0], filenames=filenames)
+    return app.exec()
+
+
+def _list(records_db: RecordsDatabase, args: argparse.Namespace) -> int:
+    for record in records_db.select_records(search=args.search, limit=args.limit):
+        _emit('record', **_record_data(record))
+    return 0
+
+
+def _export(app: QCoreApplication, records_db: RecordsDatabase, args: argparse.Namespace) -> int:
+    if ffmpeg_path() is None:
+        _emit('error', message='ffmpeg is not found')
+        return 1
+
+    target = next(target for target in EXPORT_TARGETS if target.name.lower() == args.format)
+    records = records_db.select_records(args.ids)
+    attach_segments(records_db, records)
+
+    for record_id in sorted(set(args.ids) - {record['id'] for record in records}):
+        _emit('error', id=record_id, message='Record is not found')
+
+    args.output.mkdir(parents=True, exist_ok=True)
+    exported = []
+    errors = []
+
+    def on_item_done(job, location: Path) -> None:
+        exported.append((job[0], location))
+
+    def on_item_failed(job, message: str) -> None:
+        errors.append(job[0]['id'])
+        _emit('error', id=job[0]['id'], message=message)
+
+    export_task = ExportTask(export_jobs(records, args.output, target.suffix), target, parent=app)
+    export_task.item_done.connect(on_item_done)
+    export_task.item_failed.connect(on_item_failed)
+    export_task.finished.connect(app.quit)
+
+    signal.signal(signal.SIGINT, lambda *_: export_task.cancel())
+
+    if records:
+        export_task.start()
+        app.exec()
+
+    record_ids = records_db.insert_records(
+        [
+            (location.as_posix(), record['created'], record['duration'], target.audio_format(), record['description'])
+            for record, location in exported
+        ]
+    )
+    for (record, _), record_id in zip(exported, record_ids):
+        _emit('exported', source_id=record['id'], **_record_data(records_db.select_records([record_id])[0]))
+
+    return 1 if errors or len(records) != len(set(args.ids)) else 0
+
+
+def _delete(records_db: RecordsDatabase, args: argparse.Namespace) -> int:
+    records = records_db.select_records(args.ids)
+    attach_segments(records_db, records)
+    records_db.delete_records([record['id'] for record in records])
+
+    failed = False
+
+    for record in records:
+        if not args.keep_files:
+            for filename in [record['filename'], *record.get('segments', [])]:
+                try:
+                    Path(filename).unlink(missing_ok=True)
+                except OSError as err:
+                    _emit('error', id=record['id'], message=str(err))
+                    failed = True
+        _emit('deleted', id=record['id'], filename=record['filename'])
+
+    for record_id in sorted(set(args.ids) - {record['id'] for record in records}):
+        _emit('error', id=record_id, message='Record is not found')
+        failed = True
+
+    return 1 if failed else 0
+
+
+def _inputs() -> int:
+    for info in audio_inputs():
+        _emit('input', id=_input_id(info), description=info.description)
+    return 0
+
+
+def main(argv: Sequence[str] | None = None) -> int:
+    args = _parser().parse_args(configure(sys.argv[1:] if argv is None else argv))
+
+    app = QCoreApplication(sys.argv[:1])
+    app.setApplicationName(PKG_NAME)
+    app.setApplicationVersion(APP_VERSION)
+
+    # Let the Python signal handlers run while the Qt event loop is waiting
+    signal_timer = QTimer(app)
+    signal_timer.timeout.connect(lambda: None)
+    signal_timer.start(200)
+
+    if args.command == 'inputs':
+        return _inputs()
+
+    settings = Settings()
+    records_db = RecordsDatabase(settings.records_db_path())
+    records_db.open()
+
+    try:
+        match args.command:
+            case 'record':
+                return _record(app, settings, records_db, args)
+            case 'list':
+                return _list(records_db, args)
+            case 'export':
+                return _export(app, records_db, args)
+            case 'delete':
+                return _delete(records_db, args)
+    finally:
+        records_db.close()
+        settings.flush()
+
+    return 2
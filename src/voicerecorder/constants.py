@@ -1,8 +1,8 @@
 from importlib.metadata import PackageNotFoundError, version
 
-from PySide6.QtWidgets import QApplication
+from PySide6.QtCore import QCoreApplication
 
-APP_NAME = QApplication.translate('Main', 'VoiceRecorder')
+APP_NAME = QCoreApplication.translate('Main', 'VoiceRecorder')
 PKG_NAME = 'voicerecorder'
 
 try:
@@ -0,0 +1,169 @@
+from typing import Any
+from collections.abc import Iterable
+from dataclasses import dataclass, field
+import os
+from pathlib import Path
+from shutil import which
+import subprocess
+
+from PySide6.QtCore import QObject, QThreadPool
+from PySide6.QtMultimedia import QMediaFormat
+
+from .recordfinalizer import fsync_directory, fsync_file
+from .tasks import BatchTask, TaskCancelled
+from .utils import format_audio_format
+
+type ExportJob = tuple[dict[str, Any], Path]
+
+
+@dataclass(frozen=True)
+class ExportTarget:
+    name: str
+    suffix: str
+    muxer: str
+    file_format: QMediaFormat.FileFormat
+    audio_codec: QMediaFormat.AudioCodec
+    codec_args: tuple[str, ...] = field(default=())
+
+    def audio_format(self) -> str:
+        """Returns the format of the exported files as it is stored in the records table"""
+
+        media_format = QMediaFormat(self.file_format)
+        media_format.setAudioCodec(self.audio_codec)
+        return format_audio_format(media_format)
+
+
+EXPORT_TARGETS = (
+    ExportTarget(
+        'Opus',
+        '.opus',
+        'ogg',
+        QMediaFormat.FileFormat.Ogg,
+        QMediaFormat.AudioCodec.Opus,
+        ('-c:a', 'libopus', '-b:a', '96k'),
+    ),
+    ExportTarget('FLAC', '.flac', 'flac', QMediaFormat.FileFormat.FLAC, QMediaFormat.AudioCodec.FLAC, ('-c:a', 'flac')),
+    ExportTarget(
+        'MP3',
+        '.mp3',
+        'mp3',
+        QMediaFormat.FileFormat.MP3,
+        QMediaFormat.AudioCodec.MP3,
+        ('-c:a', 'libmp3lame', '-q:a', '2'),
+    ),
+    ExportTarget(
+        'WAV', '.wav', 'wav', QMediaFormat.FileFormat.Wave, QMediaFormat.AudioCodec.Wave, ('-c:a', 'pcm_s16le')
+    ),
+)
+
+
+def ffmpeg_path() -> str | None:
+    return which('ffmpeg')
+
+
+def _concat_entry(filename: str) -> str:
+    quoted = filename.replace("'", "'\\''")
+    return f"file '{quoted}'\n"
+
+
+def export_jobs(records: Iterable[dict[str, Any]], directory: Path, suffix: str) -> list[ExportJob]:
+    """Assigns the output files in the directory to the records without overwriting anything
+
+    The names are reserved up front, so the parallel transcodes never compete for the same file.
+    """
+
+    reserved: set[Path] = set()
+    jobs = []
+
+    for record in records:
+        stem = Path(record['filename']).stem
+        location = directory / f'{stem}{suffix}'
+
+        index = 1
+        while location in reserved or location.exists():
+            location = directory / f'{stem}-{index}{suffix}'
+            index += 1
+
+        reserved.add(location)
+        jobs.append((record, location))
+
+    return jobs
+
+
+class ExportTask(BatchTask):
+    """Transcodes the record files to the export target
+
+    Every file is transcoded by a separate single-threaded ffmpeg process and the processes
+    are driven by the own thread pool sized to the CPU count. The output is written to a partial
+    file that is synced and renamed, and the running processes are killed on cancellation.
+    The item result is the path of the exported file.
+    """
+
+    poll_interval = 0.2  # s
+
+    def __init__(self, jobs: Iterable[ExportJob], target: ExportTarget, parent: QObject | None = None):
+        thread_pool = QThreadPool()
+        thread_pool.setMaxThreadCount(os.cpu_count() or 1)
+
+        super().__init__(self._export, jobs, thread_pool, parent)
+        thread_pool.setParent(self)
+
+        self._target = target
+        self._ffmpeg = ffmpeg_path()
+
+    def _export(self, job: ExportJob) -> Path:
+        record, location = job
+
+        if self._ffmpeg is None:
+            raise RuntimeError('ffmpeg is not found')
+
+        partial_path = location.with_name(f'{location.name}.part')
+        input_args = ('-i', record['filename'])
+
+        # The segments of the session record are joined into one file by the concat demuxer
+        segments = record.get('segments')
+        list_path = location.with_name(f'{location.name}.segments')
+        if segments:
+            list_path.write_text(''.join(_concat_entry(filename) for filename in segments), encoding='utf-8')
+            input_args = ('-f', 'concat', '-safe', '0', '-i', list_path.as_posix())
+
+        args = [
+            self._ffmpeg,
+            *('-nostdin', '-hide_banner', '-loglevel', 'error', '-y', '-threads', '1'),
+            *input_args,
+            *('-vn', '-map_metadata', '0'),
+            *self._target.codec_args,
+            *('-f', self._target.muxer, partial_path.as_posix()),
+        ]
+
+        try:
+            self._run_process(args)
+            fsync_file(partial_path)
+            os.replace(partial_path, location)
+        except BaseException:
+            partial_path.unlink(missing_ok=True)
+            raise
+        finally:
+            if segments:
+                list_path.unlink(missing_ok=True)
+
+        fsync_directory(location.parent)
+        return location
+
+    def _run_process(self, args: list[str]) -> None:
+        process = subprocess.Popen(args, stdin=subprocess.DEVNULL, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE)
+
+        with process:
+            while True:
+                try:
+                    _, stderr = process.communicate(timeout=self.poll_interval)
+                    break
+                except subprocess.TimeoutExpired:
+                    if self.is_cancelled():
+                        process.kill()
+                        process.communicate()
+                        raise TaskCancelled
+
+        if process.returncode != 0:
+            message = stderr.decode(errors='replace').strip().splitlines()
+            raise RuntimeError(message[-1] if message else f'ffmpeg exited with code {process.returncode}')
@@ -0,0 +1,160 @@
+from dataclasses import dataclass
+from functools import partial
+import os
+from pathlib import Path
+
+from PySide6.QtCore import QFileSystemWatcher, QObject, QThreadPool, Signal
+
+
+@dataclass(frozen=True)
+class FileStatus:
+    exists: bool
+    size: int = 0
+    mtime: int = 0  # ns
+
+
+MISSING = FileStatus(exists=False)
+
+
+def _list_directory(directory: str) -> tuple[dict[str, FileStatus], list[str]] | None:
+    """Returns the status of the files in the directory by filename and its subdirectories
+
+    None is returned if the directory cannot be listed.
+    """
+
+    files = {}
+    subdirectories = []
+
+    try:
+        entries = os.scandir(directory)
+    except OSError:
+        return None
+
+    with entries:
+        for entry in entries:
+            if entry.name.startswith('.') or entry.name.endswith('.part'):
+                continue
+            try:
+                if entry.is_dir(follow_symlinks=False):
+                    subdirectories.append(Path(entry.path).as_posix())
+                elif entry.is_file():
+                    stat = entry.stat()
+                    files[Path(entry.path).as_posix()] = FileStatus(True, stat.st_size, stat.st_mtime_ns)
+            except OSError:
+                continue
+
+    return files, subdirectories
+
+
+def _stat_file(filename: str) -> FileStatus:
+    try:
+        stat = os.stat(filename)
+    except OSError:
+        return MISSING
+    return FileStatus(True, stat.st_size, stat.st_mtime_ns)
+
+
+class FileStatusCache(QObject):
+    """Status (exists, size, mtime) of the record files without touching the filesystem on the GUI thread
+
+    The watched directory tree is listed with os.scandir on a worker thread at the start
+    and then every time QFileSystemWatcher reports that a directory has changed. The files
+    outside the tree are stat'ed on a worker thread when their status is asked for the first time,
+    and the status is unknown until then.
+    """
+
+    status_changed = Signal(list)
+    _directory_listed = Signal(str, object)
+    _file_stated = Signal(str, object)
+
+    def __init__(self, parent: QObject | None = None):
+        super().__init__(parent)
+
+        self._statuses: dict[str, FileStatus] = {}
+        self._listings: dict[str, set[str]] = {}
+        self._pending: set[str] = set()
+
+        self._thread_pool = QThreadPool(self)
+        self._thread_pool.setMaxThreadCount(2)
+
+        self._watcher = QFileSystemWatcher(self)
+        self._watcher.directoryChanged.connect(self._list_directory)
+
+        self._directory_listed.connect(self._on_directory_listed)
+        self._file_stated.connect(self._on_file_stated)
+
+    def watch(self, directory: Path) -> None:
+        self._list_directory(directory.as_posix())
+
+    def status(self, filename: str) -> FileStatus | None:
+        """Returns the known status of the file or None if it is not known yet"""
+
+        if (status := self._statuses.get(filename)) is not None:
+            return status
+
+        if filename.rpartition('/')[0] in self._listings:
+            return MISSING
+
+        if filename not in self._pending:
+            self._pending.add(filename)
+            self._thread_pool.start(partial(self._stat_file_job, filename))
+        return None
+
+    def exists(self, filename: str) -> bool | None:
+        status = self.status(filename)
+        return None if status is None else status.exists
+
+    def close(self) -> None:
+        self._thread_pool.clear()
+        self._thread_pool.waitForDone()
+
+    def _list_directory(self, directory: str) -> None:
+        self._thread_pool.start(partial(self._list_directory_job, directory))
+
+    def _list_directory_job(self, directory: str) -> None:
+        self._directory_listed.emit(directory, _list_directory(directory))
+
+    def _stat_file_job(self, filename: str) -> None:
+        self._file_stated.emit(filename, _stat_file(filename))
+
+    def _on_directory_listed(self, directory: str, listing: tuple[dict[str, FileStatus], list[str]] | None) -> None:
+        if listing is None:
+            # The directory has been removed, so it and its subdirectories are not watched anymore
+            removed = [d for d in self._listings if d == directory or d.startswith(f'{directory}/')]
+            changed = [filename for d in removed for filename in self._listings.pop(d)]
+            for filename in changed:
+                self._statuses[filename] = MISSING
+        else:
+            files, subdirectories = listing
+            changed = self._update_listing(directory, files)
+
+            if directory not in self._watcher.directories():
+                self._watcher.addPath(directory)
+            for subdirectory in subdirectories:
+                if subdirectory not in self._listings:
+                    self._list_directory(subdirectory)
+
+        if changed:
+            self.status_changed.emit(changed)
+
+    def _update_listing(self, directory: str, files: dict[str, FileStatus]) -> list[str]:
+        old_files = self._listings.get(directory, set())
+        changed = [filename for filename in old_files if filename not in files]
+
+        for filename in changed:
+            self._statuses[filename] = MISSING
+
+        for filename, status in files.items():
+            if self._statuses.get(filename) != status:
+                self._statuses[filename] = status
+                changed.append(filename)
+
+        self._listings[directory] = set(files)
+        return changed
+
+    def _on_file_stated(self, filename: str, status: FileStatus) -> None:
+        self._pending.discard(filename)
+
+        if self._statuses.get(filename) != status:
+            self._statuses[filename] = status
+            self.status_changed.emit([filename])
@@ -0,0 +1,191 @@
+from typing import Any
+from dataclasses import dataclass
+import logging
+import os
+from pathlib import Path
+import subprocess
+import time
+
+from PySide6.QtCore import QLockFile, QObject, Signal
+from PySide6.QtMultimedia import QMediaFormat
+
+from .exporter import ffmpeg_path
+from .recordfinalizer import RecordFinalizer, fsync_directory, fsync_file
+from .recordsdb import RecordsDatabase
+from .scanner import probe_duration
+from .silencetrim import repair_wav_header
+from .tasks import Task
+from .utils import format_audio_format
+
+logger = logging.getLogger(__name__)
+
+
+class RecordingJournal:
+    """Write-ahead journal of the records that are being recorded in the records database
+
+    An entry is added when a record file is started, it is updated with the location, the duration
+    and the size of the file while the recording goes on and it is removed when the file is saved.
+    The entries that are left after a crash are recovered by RecordingRecovery.
+
+    The entries are owned by the process that records them. The owner holds its lock file next
+    to the records database while it runs, so the entries of the owners which lock files are not held
+    are left after a crash, however recently they have been updated. If the lock file cannot be made,
+    the entries have no owner and they are left after a crash if they have not been updated for a while.
+    """
+
+    stale_after = 10  # s
+
+    def __init__(self, records_db: RecordsDatabase):
+        self._records_db = records_db
+        self._locks_dir = records_db.path().parent
+
+        self._owner: str | None = f'{os.getpid()}-{time.time_ns()}'
+        self._lock = QLockFile(self._lock_path(self._owner))
+        if not self._lock.tryLock(0):
+            self._owner = None
+
+    @property
+    def owner(self) -> str | None:
+        return self._owner
+
+    def begin(self, filename: Path, created: float, audio_format: QMediaFormat, session: Path | None = None) -> int:
+        return self._records_db.begin_recording(
+            filename.as_posix(),
+            int(created),
+            format_audio_format(audio_format),
+            session.as_posix() if session is not None else None,
+            self._owner,
+        )
+
+    def update(self, entry_id: int, location: str, duration: int) -> None:
+        try:
+            size = os.stat(location).st_size if location else 0
+        except OSError:
+            size = 0
+        self._records_db.update_recording(entry_id, location or None, duration, size)
+
+    def end(self, entry_id: int) -> None:
+        self._records_db.end_recordings([entry_id])
+
+    def unfinished(self) -> list[dict[str, Any]]:
+        """Returns the entries which owners are not running and which are not saved records
+
+        The entries which files have been saved as records but have not been removed are removed now.
+        """
+
+        entries = self._records_db.unfinished_recordings(self._running_owners(), int(time.time()) - self.stale_after)
+        if not entries:
+            return []
+
+        saved = self._records_db.record_filenames([entry['filename'] for entry in entries])
+        saved |= self._records_db.segment_filenames()
+
+        self._records_db.end_recordings([entry['id'] for entry in entries if entry['filename'] in saved])
+        return [entry for entry in entries if entry['filename'] not in saved]
+
+    def _lock_path(self, owner: str) -> str:
+        return (self._locks_dir / f'.recording-{owner}.lock').as_posix()
+
+    def _running_owners(self) -> list[str]:
+        """Returns the owners which lock files are held, the lock files left by the crashed owners are removed"""
+
+        owners = [self._owner] if self._owner is not None else []
+
+        for path in self._locks_dir.glob('.recording-*.lock'):
+            owner = path.name.removeprefix('.recording-').removesuffix('.lock')
+            if owner == self._owner:
+                continue
+
+            lock = QLockFile(path.as_posix())
+            if lock.tryLock(0):
+                lock.unlock()
+            else:
+                owners.append(owner)
+
+        return owners
+
+
+@dataclass
+class RecoveredRecord:
+    entry: dict[str, Any]
+    filename: str | None = None
+    duration: int = 0
+
+
+class RecordingRecovery(Task):
+    """Salvages the files of the records that were being recorded when the app or the machine died
+
+    The file is looked for at the location the recorder was writing to and at the record filename.
+    The header of a WAV file is repaired, the other files are remuxed by ffmpeg, if it is available,
+    so that they get their duration and index. The file is then moved to the record filename.
+    The entries which files are not found or cannot be recovered are reported without the filename,
+    one broken entry does not stop the recovery of the others.
+    """
+
+    recovered = Signal(list)
+
+    def __init__(self, entries: list[dict[str, Any]], parent: QObject | None = None):
+        super().__init__(parent=parent)
+        self._entries = entries
+
+    def run(self) -> None:
+        recovered = []
+
+        for i, entry in enumerate(self._entries):
+            try:
+                recovered.append(self._recover(entry))
+            except Exception:
+                logger.exception('Cannot recover the record %r', entry['filename'])
+                recovered.append(RecoveredRecord(entry))
+            self.progress.emit(i + 1, len(self._entries))
+
+        self.recovered.emit(recovered)
+
+    def _recover(self, entry: dict[str, Any]) -> RecoveredRecord:
+        destination = Path(entry['filename'])
+        candidates = [Path(location) for location in (entry['location'], entry['filename']) if location]
+        source = next((path for path in candidates if path.is_file() and path.stat().st_size > 0), None)
+
+        if source is None:
+            return RecoveredRecord(entry)
+
+        duration = entry['duration']
+
+        if source.suffix.lower() == '.wav':
+            info = repair_wav_header(source)
+            duration = info.frame_count * 1000 // info.sample_rate
+        else:
+            self._remux(source)
+
+        if source != destination:
+            RecordFinalizer(source, destination).run()
+
+        if source.suffix.lower() != '.wav':
+            duration = probe_duration(destination.as_posix()) or duration
+
+        return RecoveredRecord(entry, destination.as_posix(), duration)
+
+    @staticmethod
+    def _remux(path: Path) -> None:
+        """Rewrites the streams to a new container, the file is left as it is if ffmpeg fails"""
+
+        ffmpeg = ffmpeg_path()
+        if ffmpeg is None:
+            return
+
+        remuxed_path = path.with_name(f'{path.stem}.remux{path.suffix}')
+        args = [
+            ffmpeg,
+            *('-nostdin', '-hide_banner', '-loglevel', 'error', '-y'),
+            *('-i', path.as_posix(), '-map', '0', '-c', 'copy', remuxed_path.as_posix()),
+        ]
+
+        try:
+            process = subprocess.run(args, stdin=subprocess.DEVNULL, capture_output=True)
+            if process.returncode != 0 or not remuxed_path.is_file() or not remuxed_path.stat().st_size:
+                return
+            fsync_file(remuxed_path)
+            os.replace(remuxed_path, path)
+            fsync_directory(path.parent)
+        finally:
+            remuxed_path.unlink(missing_ok=True)
@@ -0,0 +1,56 @@
+from PySide6.QtCore import QLineF, QRectF, QSize
+from PySide6.QtGui import QColor, QPainter, QPalette
+from PySide6.QtWidgets import QWidget
+
+from .audiosamples import SILENCE_DB
+
+
+class LevelMeter(QWidget):
+    """Horizontal input level meter with the RMS bar and the peak mark"""
+
+    min_db = -60.0
+
+    def __init__(self, parent: QWidget | None = None, *args, **kwargs):
+        super().__init__(parent, *args, **kwargs)
+
+        self._rms = SILENCE_DB
+        self._peak = SILENCE_DB
+
+        self.setToolTip(self.tr('Input level'))
+
+    def set_levels(self, rms: float, peak: float) -> None:
+        if (rms, peak) == (self._rms, self._peak):
+            return
+        self._rms = rms
+        self._peak = peak
+        self.update()
+
+    def sizeHint(self):
+        return QSize(80, 10)
+
+    def paintEvent(self, event):
+        rect = QRectF(self.rect()).adjusted(0.5, 2.5, -0.5, -2.5)
+        palette = self.palette()
+
+        painter = QPainter(self)
+        painter.setPen(palette.color(QPalette.ColorRole.Mid))
+        painter.setBrush(palette.color(QPalette.ColorRole.Base))
+        painter.drawRect(rect)
+
+        rms_width = rect.width() * self._fraction(self._rms)
+        painter.fillRect(QRectF(rect.left(), rect.top(), rms_width, rect.height()), self._level_color(self._rms))
+
+        peak_x = rect.left() + rect.width() * self._fraction(self._peak)
+        painter.setPen(self._level_color(self._peak))
+        painter.drawLine(QLineF(peak_x, rect.top(), peak_x, rect.bottom()))
+
+    def _fraction(self, level: float) -> float:
+        return min(max((level - self.min_db) / -self.min_db, 0.0), 1.0)
+
+    @staticmethod
+    def _level_color(level: float) -> QColor:
+        if level > -3.0:
+            return QColor('red')
+        if level > -12.0:
+            return QColor('orange')
+        return QColor('green')
@@ -0,0 +1,76 @@
+from PySide6.QtCore import QObject, QTimer, Signal
+from PySide6.QtMultimedia import QAudioDevice, QAudioSource
+
+from .audiosamples import SILENCE_DB, levels, mono_samples
+
+
+class AudioLevelMonitor(QObject):
+    """Taps the audio input device in parallel with the recorder and measures the signal level
+
+    The captured data is pulled on a timer, converted to mono samples and the levels are computed
+    for the new block at once, so the cost is a few NumPy calls per tick whatever the device buffer size is.
+    The block is passed on to the voice activity detector by the block_ready signal.
+    """
+
+    levels_changed = Signal(float, float)
+    block_ready = Signal(object)
+
+    update_interval = 100  # ms
+
+    def __init__(self, parent: QObject | None = None):
+        super().__init__(parent)
+
+        self._audio_source: QAudioSource | None = None
+        self._io_device = None
+        self._sample_rate = 0
+
+        self._timer = QTimer(self)
+        self._timer.setInterval(self.update_interval)
+        self._timer.timeout.connect(self._read_block)
+
+    def sample_rate(self) -> int:
+        return self._sample_rate
+
+    def set_update_interval(self, interval: int) -> None:
+        """Sets how often the captured data is read, in ms"""
+        self._timer.setInterval(interval)
+
+    def set_device(self, device: QAudioDevice) -> None:
+        self.stop()
+
+        if device.isNull():
+            return
+
+        audio_format = device.preferredFormat()
+        self._sample_rate = audio_format.sampleRate()
+
+        self._audio_source = QAudioSource(device, audio_format, self)
+        self._audio_source.setBufferSize(audio_format.bytesForDuration(self.update_interval * 1000 * 4))
+        self._io_device = self._audio_source.start()
+
+        self._timer.start()
+
+    def stop(self) -> None:
+        self._timer.stop()
+
+        if self._audio_source is not None:
+            self._audio_source.stop()
+            self._audio_source.deleteLater()
+
+        self._audio_source = None
+        self._io_device = None
+
+        self.levels_changed.emit(SILENCE_DB, SILENCE_DB)
+
+    def _read_block(self) -> None:
+        if self._io_device is None:
+            return
+
+        data = self._io_device.readAll()
+        if data.isEmpty():
+            return
+
+        samples = mono_samples(data.data(), self._audio_source.format())
+
+        self.levels_changed.emit(*levels(samples))
+        self.block_ready.emit(samples)
@@ -5,15 +5,26 @@ VoiceRecorder is a simple application for voice recording
 import os
 import sys
 
-from PySide6.QtWidgets import QApplication
-
-from voicerecorder import mainwindow
+from voicerecorder import tracing
 from voicerecorder.constants import APP_NAME, APP_VERSION, PKG_NAME
 
 os.environ['QT_ENABLE_EXPERIMENTAL_CODECS'] = '1'
 
 
 def main():
+    sys.argv = tracing.configure(sys.argv)
+
+    # The command line interface does not need QtWidgets and the display
+    if len(sys.argv) > 1 and not sys.argv[1].startswith('-'):
+        from voicerecorder import cli
+
+        if sys.argv[1] in cli.COMMANDS:
+            return cli.main(sys.argv[1:])
+
+    from PySide6.QtWidgets import QApplication
+
+    from voicerecorder import mainwindow
+
     app = QApplication(sys.argv)
 
     app.setApplicationName(PKG_NAME)
@@ -22,6 +33,8 @@ def main():
     app.setDesktopFileName(PKG_NAME)
 
     win = mainwindow.MainWindow()
-    win.show()
+
+    with tracing.span('MainWindow.show'):
+        win.show()
 
     return app.exec()
@@ -1,17 +1,32 @@
-from PySide6.QtGui import QIcon
+from PySide6.QtCore import Qt, QTimer, Signal
+from PySide6.QtGui import QAction, QIcon
 from PySide6.QtWidgets import QHeaderView, QMainWindow, QStatusBar, QWidget
 
+from .audiodevices import AudioDeviceRegistry, AudioInputInfo
 from .audioformat import AudioFormat
-from .audiorecorder import AudioInputInfo, AudioRecorder, audio_inputs
+from .audiorecorder import AudioRecorder
+from .levelmeter import LevelMeter
 from .mainwindow_ui import Ui_MainWindow
+from .recordergroup import RecorderGroup
 from .recordsmanager import RecordsManager
 from .settings import Settings
 from .statusinfo import StatusInfo
+from .taskprogress import TaskProgress
+from .tracing import instant, span, traced
 
 
 class MainWindow(QMainWindow):
-    """Application MainWindow class"""
+    """Application MainWindow class
 
+    The window and the records are shown first, and the multimedia (the encoding formats,
+    the recorder and the audio inputs) is initialized step by step after the first paint.
+    The recording controls are unlocked when it is done.
+    """
+
+    first_painted = Signal()
+    multimedia_ready = Signal()
+
+    @traced('MainWindow.__init__')
     def __init__(self, parent: QWidget | None = None, *args, **kwargs):
         super().__init__(parent, *args, **kwargs)
 
@@ -22,35 +37,103 @@ class MainWindow(QMainWindow):
 
         self._settings = Settings(self)
         self._status_info = StatusInfo()
+        self._level_meter = LevelMeter()
+        self._task_progress = TaskProgress()
         self._audio_format = AudioFormat(self._settings)
-        self._audio_recorder = AudioRecorder(self._settings, self)
+        self._audio_devices: AudioDeviceRegistry | None = None
+        self._audio_recorder: AudioRecorder | None = None
+        self._recorder_group: RecorderGroup | None = None
         self._records_manager = RecordsManager(self._settings, self.ui.recordsTableView, self)
 
+        self._painted = False
+        self._init_steps = [self._init_audio_formats, self._init_audio_recorder, self._init_audio_inputs]
+
         status_bar: QStatusBar = self.statusBar()
         status_bar.addWidget(self._status_info)
+        status_bar.addWidget(self._level_meter)
+        status_bar.addPermanentWidget(self._task_progress)
         status_bar.addPermanentWidget(self._audio_format)
 
-        self._audio_format.audio_format_changed.connect(self._audio_recorder.set_audio_format)
-
-        self._audio_recorder.set_audio_format(*self._audio_format.audio_format())
-        self._audio_recorder.durationChanged.connect(self._status_info.set_duration)
-        self._audio_recorder.recording_finished.connect(self._records_manager.add_record)
+        self._records_manager.task_started.connect(self._task_progress.track)
+        self.ui.leRecordsSearch.textChanged.connect(self._records_manager.search)
 
         self.ui.pbRecordingStartAndStop.toggled.connect(self._on_toggle_recording)
         self.ui.pbRecordingPause.toggled.connect(self._on_toggle_pause)
-        self.ui.cmboxAudioInput.currentIndexChanged.connect(self._on_change_audio_input)
 
-        self._collect_audio_inputs()
-        self._read_settings()
+        self._set_recording_controls_enabled(False)
+        self._settings.restory_window_state(self)
 
     def show(self):
         super().show()
         self.ui.recordsTableView.verticalHeader().setSectionResizeMode(QHeaderView.ResizeMode.ResizeToContents)
 
+    def paintEvent(self, event):
+        super().paintEvent(event)
+
+        if not self._painted:
+            self._painted = True
+            instant('MainWindow.first_paint')
+            self.first_painted.emit()
+            QTimer.singleShot(0, self._run_init_step)
+
     def closeEvent(self, event):
         self._records_manager.close()
         self._write_settings()
 
+    def _run_init_step(self):
+        """Runs the next multimedia initialization step and lets the window repaint before the following one"""
+
+        init_step = self._init_steps.pop(0)
+        with span(f'MainWindow.{init_step.__name__}'):
+            init_step()
+
+        if self._init_steps:
+            QTimer.singleShot(0, self._run_init_step)
+        else:
+            self._set_recording_controls_enabled(True)
+            instant('MainWindow.multimedia_ready')
+            self.multimedia_ready.emit()
+
+    def _init_audio_formats(self):
+        self._audio_format.collect_formats()
+
+    def _init_audio_recorder(self):
+        self._audio_devices = AudioDeviceRegistry(self)
+        self._audio_recorder = AudioRecorder(self._settings, self, self._audio_devices, self._records_manager.journal)
+        self._recorder_group = RecorderGroup(self._audio_recorder, self._settings, self._records_manager.journal, self)
+
+        self._audio_format.audio_format_changed.connect(self._recorder_group.set_audio_format)
+
+        self._recorder_group.set_audio_format(*self._audio_format.audio_format())
+        self._recorder_group.recording_finished.connect(self._records_manager.add_record)
+        self._records_manager.set_recording_locations(self._recorder_group.output_locations)
+        self._recorder_group.task_started.connect(self._task_progress.track)
+        self._audio_recorder.record_duration_changed.connect(self._status_info.set_duration)
+        self._audio_recorder.level_monitor.levels_changed.connect(self._level_meter.set_levels)
+        self._audio_recorder.auto_paused.connect(self._on_auto_pause)
+        self._audio_recorder.input_failed_over.connect(self._on_audio_input_failed_over)
+
+    def _init_audio_inputs(self):
+        for audio_input in self._audio_devices.inputs():
+            self.ui.cmboxAudioInput.addItem(audio_input.description, audio_input.id)
+
+        audio_input_id = self._settings.get_audio_input_id()
+        if (index := self.ui.cmboxAudioInput.findData(audio_input_id)) != -1:
+            self.ui.cmboxAudioInput.setCurrentIndex(index)
+
+        self.ui.cmboxAudioInput.setContextMenuPolicy(Qt.ContextMenuPolicy.ActionsContextMenu)
+        self._on_change_audio_input()
+        self.ui.cmboxAudioInput.currentIndexChanged.connect(self._on_change_audio_input)
+
+        self._audio_devices.input_added.connect(self._on_audio_input_added)
+        self._audio_devices.input_removed.connect(self._on_audio_input_removed)
+        self._audio_devices.input_changed.connect(self._on_audio_input_changed)
+
+    def _set_recording_controls_enabled(self, enabled: bool):
+        self.ui.pbRecordingStartAndStop.setEnabled(enabled)
+        self.ui.cmboxAudioInput.setEnabled(enabled)
+        self._audio_format.setEnabled(enabled)
+
     def _on_toggle_recording(self, is_recording: bool):
         button_text = self.tr('Stop') if is_recording else self.tr('Record')
 
@@ -65,38 +148,125 @@ class MainWindow(QMainWindow):
 
     def _on_toggle_pause(self, is_paused: bool):
         if is_paused:
+            self._recorder_group.pause_recording()
             self._status_info.set_pause_status()
-            self._audio_recorder.pause()
         else:
             self._status_info.set_record_status()
-            self._audio_recorder.record()
+            self._recorder_group.resume_recording()
+
+    def _on_auto_pause(self, is_paused: bool):
+        if self.ui.pbRecordingPause.isChecked() or not self.ui.pbRecordingStartAndStop.isChecked():
+            return
+
+        if is_paused:
+            self._status_info.set_pause_status(auto=True)
+        else:
+            self._status_info.set_record_status()
 
     def _start_recording(self):
-        self._audio_recorder.record()
+        self._recorder_group.start_recording()
         self._status_info.set_record_status()
 
         self.ui.pbRecordingStartAndStop.setIcon(QIcon(':icons/stop'))
 
     def _stop_recording(self):
-        self._audio_recorder.stop()
+        self._recorder_group.stop_recording()
         self._status_info.set_stop_status()
         self.ui.pbRecordingStartAndStop.setIcon(QIcon(':icons/record'))
 
-    def _collect_audio_inputs(self):
-        for audio_input in audio_inputs():
-            self.ui.cmboxAudioInput.addItem(audio_input.description, audio_input.id)
-
-    def _read_settings(self):
-        self._settings.restory_window_state(self)
-
-        audio_input_id = self._settings.get_audio_input_id()
-        if (index := self.ui.cmboxAudioInput.findData(audio_input_id)) != -1:
-            self.ui.cmboxAudioInput.setCurrentIndex(index)
+        # The extra inputs plugged or unplugged while recording are applied now
+        self._apply_extra_inputs()
 
     def _write_settings(self):
         self._settings.set_window_state(self)
-        self._settings.set_audio_input_id(self.ui.cmboxAudioInput.currentData())
+
+        if self._audio_recorder is not None:
+            self._settings.set_audio_input_id(self.ui.cmboxAudioInput.currentData())
+
+        self._settings.flush()
 
     def _on_change_audio_input(self):
         audio_device_id = self.ui.cmboxAudioInput.currentData()
-        self._audio_recorder.set_audio_input(AudioInputInfo.from_id(audio_device_id))
+        if audio_device_id is None:
+            return
+        if audio_input := self._audio_devices.get(audio_device_id):
+            self._audio_recorder.set_audio_input(audio_input)
+        self._update_extra_input_actions()
+
+    def _update_extra_input_actions(self):
+        """Fills the audio input context menu with the inputs that can be recorded together with the selected one"""
+
+        combobox = self.ui.cmboxAudioInput
+        for action in combobox.actions():
+            combobox.removeAction(action)
+            action.deleteLater()
+
+        current_id = combobox.currentData()
+        extra_ids = self._settings.extra_audio_input_ids()
+
+        for audio_input in self._audio_devices.inputs():
+            if audio_input.id == current_id:
+                continue
+
+            action = QAction(self.tr('Also record from "{}"').format(audio_input.description), combobox)
+            action.setCheckable(True)
+            action.setChecked(audio_input.id in extra_ids)
+            action.setData(audio_input.id)
+            action.toggled.connect(self._on_toggle_extra_input)
+            combobox.addAction(action)
+
+        self._apply_extra_inputs()
+
+    def _on_toggle_extra_input(self):
+        actions = self.ui.cmboxAudioInput.actions()
+        listed_ids = [action.data() for action in actions]
+
+        # The unplugged inputs stay selected until they are plugged again
+        extra_ids = [action.data() for action in actions if action.isChecked()]
+        extra_ids += [input_id for input_id in self._settings.extra_audio_input_ids() if input_id not in listed_ids]
+
+        self._settings.set_extra_audio_input_ids(extra_ids)
+        self._apply_extra_inputs()
+
+    def _apply_extra_inputs(self):
+        if self._recorder_group is None or self.ui.pbRecordingStartAndStop.isChecked():
+            return
+
+        extra_inputs = [
+            audio_input
+            for action in self.ui.cmboxAudioInput.actions()
+            if action.isChecked() and (audio_input := self._audio_devices.get(action.data()))
+        ]
+        if [info.id for info in extra_inputs] != [info.id for info in self._recorder_group.extra_inputs()]:
+            self._recorder_group.set_extra_inputs(extra_inputs)
+
+    def _on_audio_input_added(self, audio_input: AudioInputInfo):
+        self.ui.cmboxAudioInput.addItem(audio_input.description, audio_input.id)
+        self._update_extra_input_actions()
+
+    def _on_audio_input_removed(self, audio_input: AudioInputInfo):
+        # The recorder has already switched from the removed input if it was the current one
+        self.ui.cmboxAudioInput.blockSignals(True)
+        self.ui.cmboxAudioInput.removeItem(self.ui.cmboxAudioInput.findData(audio_input.id))
+        self._select_audio_input(self._audio_recorder.audio_input_info())
+        self.ui.cmboxAudioInput.blockSignals(False)
+        self._update_extra_input_actions()
+
+        # The recorder has stopped if there is no input left
+        if self.ui.cmboxAudioInput.count() == 0 and self.ui.pbRecordingStartAndStop.isChecked():
+            self.ui.pbRecordingStartAndStop.setChecked(False)
+
+    def _on_audio_input_changed(self, audio_input: AudioInputInfo):
+        if (index := self.ui.cmboxAudioInput.findData(audio_input.id)) != -1:
+            self.ui.cmboxAudioInput.setItemText(index, audio_input.description)
+        self._update_extra_input_actions()
+
+    def _on_audio_input_failed_over(self, removed_input: AudioInputInfo, fallback_input: AudioInputInfo):
+        self._select_audio_input(fallback_input)
+
+        message = self.tr('The audio input "{}" has been unplugged, switched to "{}"')
+        self.statusBar().showMessage(message.format(removed_input.description, fallback_input.description), 10000)
+
+    def _select_audio_input(self, audio_input: AudioInputInfo):
+        if (index := self.ui.cmboxAudioInput.findData(audio_input.id)) != -1:
+            self.ui.cmboxAudioInput.setCurrentIndex(index)
@@ -3,7 +3,7 @@
 ################################################################################
 ## Form generated from reading UI file 'mainwindow.ui'
 ##
-## Created by: Qt User Interface Compiler version 6.10.0
+## Created by: Qt User Interface Compiler version 6.12.0
 ##
 ## WARNING! All changes made in this file will be lost when recompiling UI file!
 ################################################################################
@@ -16,9 +16,10 @@ from PySide6.QtGui import (QBrush, QColor, QConicalGradient, QCursor,
     QImage, QKeySequence, QLinearGradient, QPainter,
     QPalette, QPixmap, QRadialGradient, QTransform)
 from PySide6.QtWidgets import (QAbstractItemView, QApplication, QComboBox, QGroupBox,
-    QHBoxLayout, QHeaderView, QLabel, QMainWindow,
-    QMenuBar, QPushButton, QSizePolicy, QSpacerItem,
-    QStatusBar, QTableView, QVBoxLayout, QWidget)
+    QHBoxLayout, QHeaderView, QLabel, QLineEdit,
+    QMainWindow, QMenuBar, QPushButton, QSizePolicy,
+    QSpacerItem, QStatusBar, QTableView, QVBoxLayout,
+    QWidget)
 from . import voicerecorder_rc
 
 class Ui_MainWindow(object):
@@ -89,14 +90,20 @@ class Ui_MainWindow(object):
 
         self.gboxRecords = QGroupBox(self.centralwidget)
         self.gboxRecords.setObjectName(u"gboxRecords")
-        self.horizontalLayout_2 = QHBoxLayout(self.gboxRecords)
-        self.horizontalLayout_2.setObjectName(u"horizontalLayout_2")
+        self.verticalLayout_2 = QVBoxLayout(self.gboxRecords)
+        self.verticalLayout_2.setObjectName(u"verticalLayout_2")
+        self.leRecordsSearch = QLineEdit(self.gboxRecords)
+        self.leRecordsSearch.setObjectName(u"leRecordsSearch")
+        self.leRecordsSearch.setClearButtonEnabled(True)
+
+        self.verticalLayout_2.addWidget(self.leRecordsSearch)
+
         self.recordsTableView = QTableView(self.gboxRecords)
         self.recordsTableView.setObjectName(u"recordsTableView")
         self.recordsTableView.setEditTriggers(QAbstractItemView.EditTrigger.EditKeyPressed|QAbstractItemView.EditTrigger.SelectedClicked)
         self.recordsTableView.setSelectionBehavior(QAbstractItemView.SelectionBehavior.SelectRows)
 
-        self.horizontalLayout_2.addWidget(self.recordsTableView)
+        self.verticalLayout_2.addWidget(self.recordsTableView)
 
 
         self.verticalLayout.addWidget(self.gboxRecords)
@@ -122,5 +129,6 @@ class Ui_MainWindow(object):
         self.pbRecordingStartAndStop.setText(QCoreApplication.translate("MainWindow", u"Record", None))
         self.pbRecordingPause.setText(QCoreApplication.translate("MainWindow", u"Pause", None))
         self.gboxRecords.setTitle(QCoreApplication.translate("MainWindow", u"Records", None))
+        self.leRecordsSearch.setPlaceholderText(QCoreApplication.translate("MainWindow", u"Search in descriptions", None))
     # retranslateUi
 
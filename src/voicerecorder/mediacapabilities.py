@@ -0,0 +1,130 @@
+import json
+import os
+from pathlib import Path
+
+import PySide6
+from PySide6.QtCore import QLibraryInfo, qVersion
+from PySide6.QtMultimedia import QMediaFormat
+
+type CapabilityMatrix = dict[QMediaFormat.ConversionMode, dict[QMediaFormat.FileFormat, list[QMediaFormat.AudioCodec]]]
+
+_MODES = (QMediaFormat.ConversionMode.Encode, QMediaFormat.ConversionMode.Decode)
+
+
+def backend_key() -> dict[str, str]:
+    """Returns the versions of Qt, PySide and the multimedia backend the capabilities depend on
+
+    The backend is identified by the QT_MEDIA_BACKEND variable and the names, sizes
+    and mtimes of the Qt multimedia plugins.
+    """
+
+    plugins_dir = Path(QLibraryInfo.path(QLibraryInfo.LibraryPath.PluginsPath)) / 'multimedia'
+    plugins = []
+
+    try:
+        for entry in sorted(os.scandir(plugins_dir), key=lambda e: e.name):
+            stat = entry.stat()
+            plugins.append(f'{entry.name}:{stat.st_size}:{stat.st_mtime_ns}')
+    except OSError:
+        pass
+
+    return {
+        'qt': qVersion(),
+        'pyside': PySide6.__version__,
+        'backend': os.environ.get('QT_MEDIA_BACKEND', ''),
+        'plugins': ';'.join(plugins),
+    }
+
+
+class MediaCapabilities:
+    """Container to audio codec matrix of the multimedia backend persisted in a JSON file
+
+    Querying the backend is slow on some FFmpeg builds, so the matrix is probed once and is probed
+    again only when the Qt, PySide or backend version changes or when it is rescanned explicitly.
+    """
+
+    version = 1
+
+    def __init__(self, path: Path):
+        self._path = path
+        self._matrix: CapabilityMatrix = {}
+
+    def load(self, rescan: bool = False) -> None:
+        """Reads the matrix from the file or probes and saves it if the file is stale"""
+
+        if not rescan and self._read():
+            return
+
+        self._matrix = self.probe()
+
+        try:
+            self._write()
+        except OSError:
+            pass
+
+    def file_formats(
+        self, mode: QMediaFormat.ConversionMode = QMediaFormat.ConversionMode.Encode
+    ) -> list[QMediaFormat.FileFormat]:
+        return list(self._matrix.get(mode, {}))
+
+    def audio_codecs(
+        self,
+        file_format: QMediaFormat.FileFormat,
+        mode: QMediaFormat.ConversionMode = QMediaFormat.ConversionMode.Encode,
+    ) -> list[QMediaFormat.AudioCodec]:
+        return list(self._matrix.get(mode, {}).get(file_format, []))
+
+    @staticmethod
+    def probe() -> CapabilityMatrix:
+        """Queries the backend for the audio codecs of every supported file format"""
+
+        matrix = {}
+
+        for mode in _MODES:
+            formats = {}
+            for file_format in QMediaFormat().supportedFileFormats(mode):
+                media_format = QMediaFormat(file_format)
+                media_format.setAudioCodec(QMediaFormat.AudioCodec.Unspecified)
+                media_format.setVideoCodec(QMediaFormat.VideoCodec.Unspecified)
+                formats[file_format] = media_format.supportedAudioCodecs(mode)
+            matrix[mode] = formats
+
+        return matrix
+
+    def _read(self) -> bool:
+        try:
+            data = json.loads(self._path.read_text(encoding='utf-8'))
+        except (OSError, ValueError):
+            return False
+
+        if not isinstance(data, dict) or data.get('version') != self.version or data.get('key') != backend_key():
+            return False
+
+        try:
+            self._matrix = {
+                mode: {
+                    QMediaFormat.FileFormat[file_format]: [QMediaFormat.AudioCodec[codec] for codec in codecs]
+                    for file_format, codecs in data['matrix'][mode.name].items()
+                }
+                for mode in _MODES
+            }
+        except (KeyError, TypeError, AttributeError):
+            return False
+
+        return True
+
+    def _write(self) -> None:
+        data = {
+            'version': self.version,
+            'key': backend_key(),
+            'matrix': {
+                mode.name: {
+                    file_format.name: [codec.name for codec in codecs] for file_format, codecs in formats.items()
+                }
+                for mode, formats in self._matrix.items()
+            },
+        }
+
+        partial_path = self._path.with_name(f'{self._path.name}.part')
+        partial_path.write_text(json.dumps(data, indent=2), encoding='utf-8')
+        os.replace(partial_path, self._path)
@@ -0,0 +1,18 @@
+from dataclasses import dataclass
+
+from PySide6.QtMultimedia import QMediaFormat
+
+
+@dataclass
+class Record:
+    filename: str
+    created: int
+    duration: int
+    audio_format: QMediaFormat
+    session: str | None = None
+    """The playlist of the segmented recording session the record is a segment of"""
+    group: str | None = None
+    """The name of the records recorded from several inputs at once"""
+    offset: int = 0
+    """The delay of the recording start in ms from the group creation time"""
+    description: str | None = None
@@ -0,0 +1,162 @@
+from dataclasses import replace
+from datetime import datetime
+from functools import partial
+import re
+import time
+
+from PySide6.QtCore import QObject, Signal
+from PySide6.QtMultimedia import QMediaFormat
+
+from .audiodevices import AudioInputInfo
+from .audiorecorder import AudioRecorder
+from .journal import RecordingJournal
+from .record import Record
+from .settings import Settings
+from .tasks import Task
+
+
+def input_label(audio_input: AudioInputInfo) -> str:
+    """Returns the filename safe label of the input"""
+    return re.sub(r'\W+', '-', audio_input.device.description()).strip('-')[:32] or 'input'
+
+
+class RecorderGroup(QObject):
+    """Records from the input of the main recorder and from the extra inputs at once
+
+    Every extra input has its own follower recorder with its own capture session and encoder,
+    the encoding is done by the multimedia backend threads, so the GUI thread only dispatches
+    the recorder signals. The recorders are started and stopped together with one creation time
+    and the input labels in the filenames, and their records are grouped with the start delay
+    of every recorder. The followers are paused when the main recorder is paused automatically.
+    """
+
+    recording_finished = Signal(Record)
+    task_started = Signal(Task, str)
+
+    def __init__(
+        self,
+        recorder: AudioRecorder,
+        settings: Settings,
+        journal: RecordingJournal | None = None,
+        parent: QObject | None = None,
+    ):
+        super().__init__(parent)
+
+        self._recorder = recorder
+        self._settings = settings
+        self._journal = journal
+
+        self._followers: list[AudioRecorder] = []
+        self._audio_format: tuple[QMediaFormat, str] | None = None
+
+        self._connect_recorder(recorder)
+        recorder.auto_paused.connect(self._on_auto_paused)
+
+    @property
+    def recorder(self) -> AudioRecorder:
+        return self._recorder
+
+    def recorders(self) -> list[AudioRecorder]:
+        return [self._recorder, *self._followers]
+
+    def extra_inputs(self) -> list[AudioInputInfo]:
+        return [follower.audio_input_info() for follower in self._followers]
+
+    def set_extra_inputs(self, audio_inputs: list[AudioInputInfo]) -> None:
+        """Replaces the followers with the ones recording the inputs, it is done while the recording is stopped"""
+
+        for follower in self._followers:
+            self._retire(follower)
+        self._followers = []
+
+        for audio_input in audio_inputs:
+            follower = AudioRecorder(self._settings, self, self._recorder.devices, self._journal, follower=True)
+            follower.set_audio_input(audio_input)
+            if self._audio_format is not None:
+                follower.set_audio_format(*self._audio_format)
+            self._connect_recorder(follower)
+            self._followers.append(follower)
+
+    def set_audio_format(self, audio_format: QMediaFormat, suffix: str) -> None:
+        self._audio_format = (audio_format, suffix)
+        for recorder in self.recorders():
+            recorder.set_audio_format(audio_format, suffix)
+
+    def start_recording(self) -> None:
+        started = time.time()
+
+        # The followers of the unplugged inputs sit out until the inputs come back
+        followers = [
+            follower for follower in self._followers if self._recorder.devices.get(follower.audio_input_info().id)
+        ]
+
+        if not followers:
+            self._recorder.start_recording(started)
+            return
+
+        group = datetime.fromtimestamp(started).isoformat(timespec='milliseconds')
+        labels: list[str] = []
+
+        for recorder in [self._recorder, *followers]:
+            # The inputs of the same model have the same description
+            label = input_label(recorder.audio_input_info())
+            if label in labels:
+                label = f'{label}-{len(labels) + 1}'
+            labels.append(label)
+
+            recorder.start_recording(started, label, group)
+
+    def stop_recording(self) -> None:
+        for recorder in self.recorders():
+            if recorder.recording_state() != AudioRecorder.RecorderState.StoppedState:
+                recorder.stop_recording()
+
+    def pause_recording(self) -> None:
+        for recorder in self._active_recorders():
+            recorder.pause_recording()
+
+    def resume_recording(self) -> None:
+        for recorder in self._active_recorders():
+            recorder.resume_recording()
+
+    def output_locations(self) -> set[str]:
+        return set().union(*(recorder.output_locations() for recorder in self.recorders()))
+
+    def is_idle(self) -> bool:
+        return all(recorder.is_idle() for recorder in self.recorders())
+
+    def _active_recorders(self) -> list[AudioRecorder]:
+        return [
+            recorder
+            for recorder in self.recorders()
+            if recorder.recording_state() != AudioRecorder.RecorderState.StoppedState
+        ]
+
+    def _connect_recorder(self, recorder: AudioRecorder) -> None:
+        recorder.recording_finished.connect(partial(self._on_recording_finished, recorder))
+        recorder.task_started.connect(self.task_started)
+
+    def _retire(self, follower: AudioRecorder) -> None:
+        """Stops the follower and deletes it when it has saved its last record"""
+
+        if follower.recording_state() != AudioRecorder.RecorderState.StoppedState:
+            follower.stop_recording()
+
+        if follower.is_idle():
+            follower.deleteLater()
+        else:
+            follower.recording_finished.connect(lambda _: follower.is_idle() and follower.deleteLater())
+
+    def _on_auto_paused(self, auto_paused: bool) -> None:
+        for follower in self._followers:
+            if follower.recording_state() == AudioRecorder.RecorderState.StoppedState:
+                continue
+            if auto_paused:
+                follower.pause_recording()
+            else:
+                follower.resume_recording()
+
+    def _on_recording_finished(self, recorder: AudioRecorder, record: Record) -> None:
+        if record.group is not None:
+            record = replace(record, description=recorder.audio_input_info().description)
+        self.recording_finished.emit(record)
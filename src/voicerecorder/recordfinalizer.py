@@ -0,0 +1,87 @@
+import errno
+import os
+from pathlib import Path
+
+from PySide6.QtCore import QObject, Signal
+
+from .tasks import Task
+from .tracing import traced
+
+
+def fsync_file(path: Path) -> None:
+    with open(path, 'rb') as f:
+        os.fsync(f.fileno())
+
+
+def fsync_directory(path: Path) -> None:
+    """Makes the directory entries (renames, new files) durable where the platform allows it"""
+
+    if not hasattr(os, 'O_DIRECTORY'):
+        return
+
+    fd = os.open(path, os.O_RDONLY | os.O_DIRECTORY)
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+
+
+class RecordFinalizer(Task):
+    """Makes the finished record file durable in the records directory
+
+    The file is synced, and if the recorder wrote it elsewhere, it is renamed atomically when
+    both locations are on the same filesystem, otherwise it is copied by chunks to a partial file
+    that is synced and then renamed.
+    The progress is reported in KiB.
+    """
+
+    finalized = Signal(str)
+
+    chunk_size = 4 * 1024 * 1024
+
+    def __init__(self, source: Path, destination: Path, parent: QObject | None = None):
+        super().__init__(parent=parent)
+
+        self._source = source
+        self._destination = destination
+
+    @traced('RecordFinalizer.run', 'task')
+    def run(self) -> None:
+        self._destination.parent.mkdir(parents=True, exist_ok=True)
+
+        fsync_file(self._source)
+
+        if self._source != self._destination:
+            try:
+                os.replace(self._source, self._destination)
+            except OSError as err:
+                if err.errno != errno.EXDEV:
+                    raise
+                self._copy()
+                self._source.unlink()
+
+            fsync_directory(self._destination.parent)
+
+        self.finalized.emit(self._destination.as_posix())
+
+    def _copy(self) -> None:
+        partial_path = self._destination.with_name(f'{self._destination.name}.part')
+        total = self._source.stat().st_size
+        copied = 0
+
+        try:
+            with open(self._source, 'rb') as src, open(partial_path, 'wb') as dst:
+                while chunk := src.read(self.chunk_size):
+                    self._check_cancelled()
+
+                    dst.write(chunk)
+                    copied += len(chunk)
+                    self.progress.emit(copied // 1024, total // 1024)
+
+                dst.flush()
+                os.fsync(dst.fileno())
+
+            os.replace(partial_path, self._destination)
+        except BaseException:
+            partial_path.unlink(missing_ok=True)
+            raise
@@ -0,0 +1,466 @@
+from typing import Any, ContextManager
+from collections.abc import Sequence
+from contextlib import contextmanager
+from dataclasses import dataclass
+import json
+from pathlib import Path
+import re
+import time
+
+from PySide6.QtCore import QByteArray
+from PySide6.QtSql import QSqlDatabase, QSqlQuery
+
+from .tracing import span, traced
+
+
+def exec_query(database: QSqlDatabase, sql: str, params: Sequence[Any] = ()) -> QSqlQuery:
+    """Prepares and executes the query with positional parameters"""
+
+    with span('exec_query', 'db', sql=sql):
+        query = QSqlQuery(database)
+        query.setForwardOnly(True)
+        query.prepare(sql)
+
+        for param in params:
+            query.addBindValue(param)
+
+        if not query.exec():
+            raise RuntimeError(f'Cannot execute records query: {query.lastError().text()}')
+    return query
+
+
+def fts_query(text: str) -> str:
+    """Makes the full-text query that matches all the words of the text as prefixes"""
+    return ' '.join(f'"{word}"*' for word in re.findall(r'\w+', text))
+
+
+# Every item is the list of statements that upgrades the schema to the version equal to its position (1-based)
+MIGRATIONS: list[list[str]] = [
+    [
+        """
+        CREATE TABLE IF NOT EXISTS records (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            filename TEXT NOT NULL,
+            created INTEGER NOT NULL,
+            duration INTEGER NOT NULL,
+            format TEXT NOT NULL,
+            description TEXT
+        )
+        """,
+    ],
+    [
+        'CREATE INDEX IF NOT EXISTS records_created_idx ON records (created)',
+        'CREATE INDEX IF NOT EXISTS records_duration_idx ON records (duration)',
+        'CREATE INDEX IF NOT EXISTS records_format_idx ON records (format)',
+    ],
+    [
+        "CREATE VIRTUAL TABLE IF NOT EXISTS records_fts USING fts5(description, content='records', content_rowid='id')",
+        """
+        CREATE TRIGGER IF NOT EXISTS records_fts_insert AFTER INSERT ON records BEGIN
+            INSERT INTO records_fts (rowid, description) VALUES (new.id, new.description);
+        END
+        """,
+        """
+        CREATE TRIGGER IF NOT EXISTS records_fts_delete AFTER DELETE ON records BEGIN
+            INSERT INTO records_fts (records_fts, rowid, description) VALUES ('delete', old.id, old.description);
+        END
+        """,
+        """
+        CREATE TRIGGER IF NOT EXISTS records_fts_update AFTER UPDATE OF description ON records BEGIN
+            INSERT INTO records_fts (records_fts, rowid, description) VALUES ('delete', old.id, old.description);
+            INSERT INTO records_fts (rowid, description) VALUES (new.id, new.description);
+        END
+        """,
+        "INSERT INTO records_fts (records_fts) VALUES ('rebuild')",
+    ],
+    [
+        """
+        CREATE TABLE IF NOT EXISTS waveforms (
+            filename TEXT PRIMARY KEY,
+            mtime INTEGER NOT NULL,
+            peaks BLOB NOT NULL
+        )
+        """,
+        """
+        CREATE TRIGGER IF NOT EXISTS waveforms_delete AFTER DELETE ON records BEGIN
+            DELETE FROM waveforms WHERE filename = old.filename;
+        END
+        """,
+    ],
+    [
+        'ALTER TABLE records ADD COLUMN missing INTEGER NOT NULL DEFAULT 0',
+        'CREATE INDEX IF NOT EXISTS records_filename_idx ON records (filename)',
+        """
+        CREATE TABLE IF NOT EXISTS scan_index (
+            filename TEXT PRIMARY KEY,
+            size INTEGER NOT NULL,
+            mtime INTEGER NOT NULL,
+            duration INTEGER,
+            format TEXT,
+            ignored INTEGER NOT NULL DEFAULT 0
+        )
+        """,
+    ],
+    [
+        """
+        CREATE TABLE IF NOT EXISTS segments (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            record_id INTEGER NOT NULL,
+            filename TEXT NOT NULL,
+            created INTEGER NOT NULL,
+            duration INTEGER NOT NULL
+        )
+        """,
+        'CREATE INDEX IF NOT EXISTS segments_record_idx ON segments (record_id)',
+        """
+        CREATE TRIGGER IF NOT EXISTS segments_delete AFTER DELETE ON records BEGIN
+            DELETE FROM segments WHERE record_id = old.id;
+        END
+        """,
+    ],
+    [
+        """
+        CREATE TABLE IF NOT EXISTS recordings (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            filename TEXT NOT NULL,
+            location TEXT,
+            created INTEGER NOT NULL,
+            format TEXT NOT NULL,
+            session TEXT,
+            duration INTEGER NOT NULL DEFAULT 0,
+            size INTEGER NOT NULL DEFAULT 0,
+            updated INTEGER NOT NULL
+        )
+        """,
+    ],
+    [
+        """
+        CREATE TABLE IF NOT EXISTS record_groups (
+            record_id INTEGER PRIMARY KEY,
+            name TEXT NOT NULL,
+            start_offset INTEGER NOT NULL DEFAULT 0
+        )
+        """,
+        'CREATE INDEX IF NOT EXISTS record_groups_name_idx ON record_groups (name)',
+        """
+        CREATE TRIGGER IF NOT EXISTS record_groups_delete AFTER DELETE ON records BEGIN
+            DELETE FROM record_groups WHERE record_id = old.id;
+        END
+        """,
+    ],
+    [
+        'ALTER TABLE recordings ADD COLUMN owner TEXT',
+    ],
+]
+
+
+@dataclass
+class ScanIndexEntry:
+    """Known state of a file in the records directory
+
+    The duration and the format are probed only for the files that are not records,
+    the empty format means that the file is not audio.
+    """
+
+    size: int
+    mtime: int  # ns
+    duration: int | None = None
+    audio_format: str | None = None
+    ignored: bool = False
+
+
+class RecordsDatabase:
+    """Records SQLite database connection with the schema migrations"""
+
+    pragmas = {
+        'journal_mode': 'WAL',
+        'synchronous': 'NORMAL',
+        'cache_size': -16384,  # KiB
+        'mmap_size': 256 * 1024 * 1024,
+        'temp_store': 'MEMORY',
+    }
+
+    record_fields = ('id', 'filename', 'created', 'duration', 'format', 'description', 'missing')
+
+    def __init__(self, path: Path, connection_name: str = 'voicerecorder'):
+        self._path = path
+        self._db = QSqlDatabase.addDatabase('QSQLITE', connection_name)
+        self._db.setDatabaseName(path.as_posix())
+
+    def database(self) -> QSqlDatabase:
+        return self._db
+
+    def path(self) -> Path:
+        return self._path
+
+    @traced('RecordsDatabase.open', 'db')
+    def open(self) -> None:
+        if not self._db.open():
+            err = self._db.lastError()
+            raise RuntimeError(f'Cannot open records database {self._path.as_posix()!r}: {err.driverText()}')
+
+        for name, value in self.pragmas.items():
+            self.exec(f'PRAGMA {name} = {value}')
+
+        self.migrate()
+
+    def close(self) -> None:
+        self._db.close()
+
+    def exec(self, sql: str, params: Sequence[Any] = ()) -> QSqlQuery:
+        return exec_query(self._db, sql, params)
+
+    @contextmanager
+    def transaction(self) -> ContextManager[None]:  # noqa
+        self._db.transaction()
+        try:
+            yield
+        except Exception:
+            self._db.rollback()
+            raise
+        self._db.commit()
+
+    def schema_version(self) -> int:
+        self.exec('CREATE TABLE IF NOT EXISTS schema_version (version INTEGER NOT NULL)')
+        query = self.exec('SELECT MAX(version) FROM schema_version')
+        return (query.value(0) or 0) if query.next() else 0
+
+    @traced('RecordsDatabase.migrate', 'db')
+    def migrate(self) -> None:
+        """Applies the migrations the database has not seen yet, each one in its own transaction"""
+
+        version = self.schema_version()
+
+        for next_version, statements in enumerate(MIGRATIONS[version:], start=version + 1):
+            with self.transaction():
+                for sql in statements:
+                    self.exec(sql)
+                self.exec('INSERT INTO schema_version (version) VALUES (?)', [next_version])
+
+    def insert_record(
+        self, filename: str, created: int, duration: int, audio_format: str, description: str | None = None
+    ) -> int:
+        """Inserts the record and returns its id"""
+
+        query = self.exec(
+            'INSERT INTO records (filename, created, duration, format, description) VALUES (?, ?, ?, ?, ?)',
+            [filename, created, duration, audio_format, description],
+        )
+        return query.lastInsertId()
+
+    def insert_records(self, records: Sequence[tuple[str, int, int, str, str | None]]) -> list[int]:
+        """Inserts the (filename, created, duration, format, description) records in one transaction"""
+
+        with self.transaction():
+            return [self.insert_record(*record) for record in records]
+
+    def set_record_duration(self, record_id: int, duration: int) -> None:
+        self.exec('UPDATE records SET duration = ? WHERE id = ?', [duration, record_id])
+
+    def record_id(self, filename: str) -> int | None:
+        query = self.exec('SELECT id FROM records WHERE filename = ?', [filename])
+        return query.value(0) if query.next() else None
+
+    def insert_segment(self, record_id: int, filename: str, created: int, duration: int) -> None:
+        """Adds the segment to the session record and updates the record duration"""
+
+        with self.transaction():
+            self.exec(
+                'INSERT INTO segments (record_id, filename, created, duration) VALUES (?, ?, ?, ?)',
+                [record_id, filename, created, duration],
+            )
+            self.exec(
+                'UPDATE records SET duration = (SELECT SUM(duration) FROM segments WHERE record_id = ?) WHERE id = ?',
+                [record_id, record_id],
+            )
+
+    def segments(self, record_id: int) -> list[tuple[str, int]]:
+        """Returns the filenames and the durations of the session record segments in the recording order"""
+
+        query = self.exec(
+            'SELECT filename, duration FROM segments WHERE record_id = ? ORDER BY created, id', [record_id]
+        )
+        segments = []
+        while query.next():
+            segments.append((query.value(0), query.value(1)))
+        return segments
+
+    def segment_filenames(self) -> set[str]:
+        query = self.exec('SELECT filename FROM segments')
+        filenames = set()
+        while query.next():
+            filenames.add(query.value(0))
+        return filenames
+
+    def add_to_group(self, record_id: int, name: str, start_offset: int) -> None:
+        """Adds the record to the group of the records recorded at once, a record is in one group only"""
+
+        self.exec(
+            'INSERT OR IGNORE INTO record_groups (record_id, name, start_offset) VALUES (?, ?, ?)',
+            [record_id, name, start_offset],
+        )
+
+    def record_group(self, record_id: int) -> tuple[str, int] | None:
+        """Returns the group name and the start offset in ms of the record if it is in a group"""
+
+        query = self.exec('SELECT name, start_offset FROM record_groups WHERE record_id = ?', [record_id])
+        return (query.value(0), query.value(1)) if query.next() else None
+
+    def group_records(self, name: str) -> list[int]:
+        query = self.exec('SELECT record_id FROM record_groups WHERE name = ? ORDER BY record_id', [name])
+        record_ids = []
+        while query.next():
+            record_ids.append(query.value(0))
+        return record_ids
+
+    def begin_recording(
+        self, filename: str, created: int, audio_format: str, session: str | None = None, owner: str | None = None
+    ) -> int:
+        """Adds the journal entry of the record that is being recorded to the filename and returns its id"""
+
+        query = self.exec(
+            'INSERT INTO recordings (filename, created, format, session, updated, owner) VALUES (?, ?, ?, ?, ?, ?)',
+            [filename, created, audio_format, session, int(time.time()), owner],
+        )
+        return query.lastInsertId()
+
+    def update_recording(self, recording_id: int, location: str | None, duration: int, size: int) -> None:
+        self.exec(
+            'UPDATE recordings SET location = ?, duration = ?, size = ?, updated = ? WHERE id = ?',
+            [location, duration, size, int(time.time()), recording_id],
+        )
+
+    def end_recordings(self, recording_ids: Sequence[int]) -> None:
+        if not recording_ids:
+            return
+        self.exec(
+            'DELETE FROM recordings WHERE id IN (SELECT value FROM json_each(?))', [json.dumps(list(recording_ids))]
+        )
+
+    def recording_files(self) -> set[str]:
+        """Returns the record filenames, the locations and the session playlists of the journal entries"""
+
+        query = self.exec('SELECT filename, location, session FROM recordings')
+        filenames = set()
+        while query.next():
+            filenames.update(query.value(i) for i in range(3) if query.value(i))
+        return filenames
+
+    def unfinished_recordings(self, running_owners: Sequence[str], updated_before: int) -> list[dict[str, Any]]:
+        """Returns the journal entries which owners are not running
+
+        The entries without the owner are returned if they have not been updated since the time.
+        """
+
+        fields = ('id', 'filename', 'location', 'created', 'format', 'session', 'duration', 'size')
+        query = self.exec(
+            f'SELECT {", ".join(fields)} FROM recordings'
+            ' WHERE owner NOT IN (SELECT value FROM json_each(?)) OR (owner IS NULL AND updated < ?) ORDER BY id',
+            [json.dumps(list(running_owners)), updated_before],
+        )
+        recordings = []
+        while query.next():
+            recordings.append({name: query.value(i) for i, name in enumerate(fields)})
+        return recordings
+
+    def delete_records(self, record_ids: Sequence[int]) -> None:
+        """Deletes the records by ids with one statement in one transaction"""
+
+        with self.transaction():
+            self.exec(
+                'DELETE FROM records WHERE id IN (SELECT value FROM json_each(?))', [json.dumps(list(record_ids))]
+            )
+
+    def select_records(
+        self, record_ids: Sequence[int] | None = None, search: str = '', limit: int | None = None
+    ) -> list[dict[str, Any]]:
+        """Returns the records by ids or by the description words in the creation order"""
+
+        conditions = []
+        params: list[Any] = []
+
+        if record_ids is not None:
+            conditions.append('id IN (SELECT value FROM json_each(?))')
+            params.append(json.dumps(list(record_ids)))
+        if query_text := fts_query(search):
+            conditions.append('id IN (SELECT rowid FROM records_fts WHERE records_fts MATCH ?)')
+            params.append(query_text)
+
+        sql = f'SELECT {", ".join(self.record_fields)} FROM records'
+        if conditions:
+            sql += f' WHERE {" AND ".join(conditions)}'
+        sql += ' ORDER BY created, id'
+        if limit is not None:
+            sql += ' LIMIT ?'
+            params.append(limit)
+
+        query = self.exec(sql, params)
+        records = []
+        while query.next():
+            records.append({field: query.value(column) for column, field in enumerate(self.record_fields)})
+        return records
+
+    def record_files(self) -> list[tuple[int, str, bool]]:
+        """Returns the id, the filename and the missing flag of every record"""
+
+        query = self.exec('SELECT id, filename, missing FROM records')
+        records = []
+        while query.next():
+            records.append((query.value(0), query.value(1), bool(query.value(2))))
+        return records
+
+    def record_filenames(self, filenames: Sequence[str]) -> set[str]:
+        """Returns the filenames that belong to records"""
+
+        query = self.exec(
+            'SELECT filename FROM records WHERE filename IN (SELECT value FROM json_each(?))', [json.dumps(filenames)]
+        )
+        found = set()
+        while query.next():
+            found.add(query.value(0))
+        return found
+
+    def set_records_missing(self, record_ids: Sequence[int], missing: bool) -> None:
+        self.exec(
+            'UPDATE records SET missing = ? WHERE id IN (SELECT value FROM json_each(?))',
+            [int(missing), json.dumps(list(record_ids))],
+        )
+
+    def scan_index(self) -> dict[str, ScanIndexEntry]:
+        query = self.exec('SELECT filename, size, mtime, duration, format, ignored FROM scan_index')
+        index = {}
+        while query.next():
+            index[query.value(0)] = ScanIndexEntry(
+                size=query.value(1),
+                mtime=query.value(2),
+                duration=query.value(3),
+                audio_format=query.value(4),
+                ignored=bool(query.value(5)),
+            )
+        return index
+
+    def update_scan_index(self, entries: dict[str, ScanIndexEntry], removed: Sequence[str] = ()) -> None:
+        for filename, entry in entries.items():
+            self.exec(
+                'INSERT OR REPLACE INTO scan_index (filename, size, mtime, duration, format, ignored) '
+                'VALUES (?, ?, ?, ?, ?, ?)',
+                [filename, entry.size, entry.mtime, entry.duration, entry.audio_format, int(entry.ignored)],
+            )
+        if removed:
+            self.exec(
+                'DELETE FROM scan_index WHERE filename IN (SELECT value FROM json_each(?))', [json.dumps(list(removed))]
+            )
+
+    def waveform(self, filename: str) -> tuple[int, bytes] | None:
+        """Returns the stored mtime of the record file and its waveform peaks"""
+
+        query = self.exec('SELECT mtime, peaks FROM waveforms WHERE filename = ?', [filename])
+        if not query.next():
+            return None
+        return query.value(0), bytes(query.value(1))
+
+    def set_waveform(self, filename: str, mtime: int, peaks: bytes) -> None:
+        self.exec(
+            'INSERT OR REPLACE INTO waveforms (filename, mtime, peaks) VALUES (?, ?, ?)',
+            [filename, mtime, QByteArray(peaks)],
+        )
@@ -1,36 +1,86 @@
-from dataclasses import dataclass
+from collections.abc import Callable
+from functools import lru_cache, partial
 from pathlib import Path
 from shutil import which
 import subprocess
 import sys
 
-from PySide6.QtCore import QEvent, QModelIndex, QObject, Qt, QUrl
+from PySide6.QtCore import (
+    QCoreApplication,
+    QEvent,
+    QItemSelection,
+    QItemSelectionModel,
+    QModelIndex,
+    QObject,
+    Qt,
+    QTimer,
+    QUrl,
+    Signal,
+)
 from PySide6.QtGui import QDesktopServices, QKeyEvent, QKeySequence
-from PySide6.QtMultimedia import QMediaFormat
-from PySide6.QtSql import QSqlDatabase, QSqlQuery, QSqlTableModel
-from PySide6.QtWidgets import QHeaderView, QMenu, QStyledItemDelegate, QTableView
-
+from PySide6.QtWidgets import QFileDialog, QHeaderView, QMenu, QMessageBox, QStyledItemDelegate, QTableView
+
+from .exporter import EXPORT_TARGETS, ExportJob, ExportTarget, ExportTask, export_jobs, ffmpeg_path
+from .filestatus import FileStatusCache
+from .journal import RecordingJournal, RecordingRecovery, RecoveredRecord
+from .record import Record
+from .recordsdb import RecordsDatabase
+from .recordsmodel import RecordsTableModel
+from .scanner import RecordsScanner, ScanResult
+from .sessions import add_segment, add_session_segment, attach_segments
 from .settings import Settings
+from .silencetrim import SilenceTrimmer
+from .tasks import BatchTask, Task
+from .tracing import span, traced
 from .utils import format_audio_format, format_duration, format_timestamp
+from .waveform import WaveformCache, WaveformDelegate
 
 
 class DateDelegate(QStyledItemDelegate):
+    cache_size = 4096
+
     def __init__(self, settings: Settings, parent: QObject | None = None):
         super().__init__(parent)
         self._settings = settings
+        self._format = settings.record_table_format()
+        self._format_timestamp = lru_cache(maxsize=self.cache_size)(format_timestamp)
+
+        self._settings.changed.connect(self._on_settings_changed)
+
+    def reload_format(self) -> None:
+        """Re-reads the date format from the settings and drops the cached texts if it has changed"""
+
+        table_format = self._settings.record_table_format()
+        if table_format != self._format:
+            self._format = table_format
+            self._format_timestamp.cache_clear()
+
+    def _on_settings_changed(self, key: str) -> None:
+        if key == 'Record/RecordTableFormat':
+            self.reload_format()
 
     def displayText(self, value, locale):
+        if value is None:
+            return ''
         created = int(value)
-        return format_timestamp(created, self._settings.record_table_format())
+        return self._format_timestamp(created, self._format)
 
     def createEditor(self, parent, option, index):
         return None
 
 
 class DurationDelegate(QStyledItemDelegate):
+    cache_size = 4096
+
+    def __init__(self, parent: QObject | None = None):
+        super().__init__(parent)
+        self._format_duration = lru_cache(maxsize=self.cache_size)(format_duration)
+
     def displayText(self, value, locale):
+        if value is None:
+            return ''
         duration = int(value)
-        return format_duration(duration)
+        return self._format_duration(duration)
 
     def initStyleOption(self, option, index):
         super().initStyleOption(option, index)
@@ -40,43 +90,54 @@ class DurationDelegate(QStyledItemDelegate):
         return None
 
 
-class RecordsTableModel(QSqlTableModel):
-    def data(self, index, role=Qt.ItemDataRole.DisplayRole):
-        if not index.isValid():
-            return None
-
-        if role == Qt.ItemDataRole.ToolTipRole and index.column() == self.fieldIndex('description'):
-            return super().data(index, Qt.ItemDataRole.DisplayRole)
-
-        return super().data(index, role)
-
-
-@dataclass
-class Record:
-    filename: str
-    created: int
-    duration: int
-    audio_format: QMediaFormat
+def _remove_file(filename: str) -> None:
+    Path(filename).unlink(missing_ok=True)
 
 
 class RecordsManager(QObject):
     """Manages records"""
 
+    task_started = Signal(Task, str)
+
+    search_delay = 250  # ms
+
+    @traced('RecordsManager.__init__')
     def __init__(self, settings: Settings, records_view: QTableView, parent: QObject | None = None):
         super().__init__(parent)
 
+        self._closed = False
         self._settings = settings
         self._records_view = records_view
 
-        self._records_db = QSqlDatabase.addDatabase('QSQLITE', 'voicerecorder')
-        self._setup_records_db()
+        self._records_db = RecordsDatabase(self._settings.records_db_path())
+        self._records_db.open()
+        self._journal = RecordingJournal(self._records_db)
+
+        self._records_model = RecordsTableModel(self._records_db.database(), self)
+        self._waveform_cache = WaveformCache(self._records_db, self)
+
+        self._file_status = FileStatusCache(self)
+        self._file_status.watch(self._settings.records_directory())
+        self._records_model.set_file_status_cache(self._file_status)
 
-        self._records_model = RecordsTableModel(self, self._records_db)
-        self._setup_records_model()
-        self._setup_records_view()
+        self._search_text = ''
+        self._search_timer = QTimer(self)
+        self._search_timer.setSingleShot(True)
+        self._search_timer.setInterval(self.search_delay)
+        self._search_timer.timeout.connect(self._apply_search)
 
-    def __del__(self):
-        self.close()
+        with span('RecordsManager.setup_records_model'):
+            self._setup_records_model()
+        with span('RecordsManager.setup_records_view'):
+            self._setup_records_view()
+
+        self._records_scanner: RecordsScanner | None = None
+        self._recording_locations: Callable[[], set[str]] = set
+        QTimer.singleShot(0, self._recover_records)
+
+        # The background tasks are stopped while their thread pools still exist
+        if app := QCoreApplication.instance():
+            app.aboutToQuit.connect(self.close)
 
     def eventFilter(self, obj, event):
         if not isinstance(obj, QTableView):
@@ -103,66 +164,226 @@ class RecordsManager(QObject):
                 self._open_recording_location()
                 return True
 
+            case Qt.Key.Key_G | 0x41F:
+                self._select_record_group()
+                return True
+
         return False
 
     @property
-    def records_model(self) -> QSqlTableModel:
+    def records_model(self) -> RecordsTableModel:
         return self._records_model
 
+    @property
+    def journal(self) -> RecordingJournal:
+        return self._journal
+
+    @traced('RecordsManager.add_record')
     def add_record(self, record: Record):
-        table_record = self._records_model.record()
+        if record.session is not None:
+            record_id, is_new = add_segment(self._records_db, record, record.description)
+        else:
+            record_id = self._records_db.insert_record(
+                record.filename,
+                record.created,
+                record.duration,
+                format_audio_format(record.audio_format),
+                record.description,
+            )
+            is_new = True
+
+        if record.group is not None:
+            self._records_db.add_to_group(record_id, record.group, record.offset)
+
+        if record.session is not None:
+            self._show_session_record(record_id, is_new)
+            return
+
+        self._records_model.insert_record(record_id)
+
+        if self._settings.trim_silence() and Path(record.filename).suffix.lower() == '.wav':
+            self._trim_silence(record_id, record.filename)
+
+    def _show_session_record(self, record_id: int, is_new: bool) -> None:
+        if not is_new:
+            row = self._records_model.record_row(record_id)
+            if row != -1:
+                self._records_model.remove_rows([row])
+        self._records_model.insert_record(record_id)
+
+    def search(self, text: str) -> None:
+        """Filters the records by the description words after the user stops typing"""
+
+        self._search_text = text
+        self._search_timer.start()
+
+    def rescan_records_directory(self) -> None:
+        """Reconciles the records with the records directory in the background"""
 
-        table_record.setValue('filename', record.filename)
-        table_record.setValue('created', record.created)
-        table_record.setValue('duration', record.duration)
-        table_record.setValue('format', format_audio_format(record.audio_format))
+        if self._records_scanner is not None:
+            return
+
+        self._records_scanner = RecordsScanner(
+            self._settings.records_directory(),
+            self._records_db.record_files(),
+            self._records_db.scan_index(),
+            self._records_db.segment_filenames(),
+            self._recording_files(),
+            parent=self,
+        )
+        self._records_scanner.scanned.connect(self._on_records_scanned)
+        self._records_scanner.finished.connect(self._on_records_scanner_finished)
+
+        self.task_started.emit(self._records_scanner, self.tr('Scanning records'))
+        self._records_scanner.start()
 
-        self._records_model.insertRecord(-1, table_record)
-        self._submit_changes()
+    def set_recording_locations(self, recording_locations: Callable[[], set[str]]) -> None:
+        """Sets the function that returns the files the recorders of the app are writing to"""
+        self._recording_locations = recording_locations
 
     def close(self):
+        if self._closed:
+            return
+        self._closed = True
+
+        if self._records_scanner is not None:
+            self._records_scanner.cancel()
+        self._waveform_cache.close()
+        self._file_status.close()
         self._records_db.close()
 
-    def _submit_changes(self):
-        self._records_model.setEditStrategy(QSqlTableModel.EditStrategy.OnManualSubmit)
-        self._records_model.submitAll()
-        self._records_model.setEditStrategy(QSqlTableModel.EditStrategy.OnFieldChange)
+    def _recording_files(self) -> set[str]:
+        """The files that are being recorded by the app and, by the journal, by the other processes"""
+        return self._records_db.recording_files() | self._recording_locations()
 
-    def _field_index(self, field: str) -> int:
-        return self._records_model.fieldIndex(field)
-
-    def _create_records_table(self) -> None:
-        query = QSqlQuery(self._records_db)
-
-        query.exec("""
-            CREATE TABLE IF NOT EXISTS records (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                filename TEXT NOT NULL,
-                created INTEGER NOT NULL,
-                duration INTEGER NOT NULL,
-                format TEXT NOT NULL,
-                description TEXT
-            )
-        """)
+    def _apply_search(self) -> None:
+        self._records_model.set_search(self._search_text)
+
+    def _recover_records(self) -> None:
+        """Recovers the records that were being recorded when the app died, then rescans the records directory"""
+
+        if self._closed:
+            return
+
+        entries = self._journal.unfinished()
+        if not entries:
+            self.rescan_records_directory()
+            return
+
+        recovery = RecordingRecovery(entries, parent=self)
+        recovery.recovered.connect(self._on_records_recovered)
+        recovery.finished.connect(recovery.deleteLater)
+        recovery.finished.connect(lambda: self._closed or self.rescan_records_directory())
+
+        self.task_started.emit(recovery, self.tr('Recovering records'))
+        recovery.start()
+
+    def _on_records_recovered(self, recovered: list[RecoveredRecord]) -> None:
+        if self._closed:
+            return
+
+        description = self.tr('Recovered record')
+
+        for item in recovered:
+            if item.filename is None:
+                continue
+
+            entry = item.entry
+            if entry['session']:
+                self._show_session_record(
+                    *add_session_segment(
+                        self._records_db,
+                        entry['session'],
+                        item.filename,
+                        entry['created'],
+                        item.duration,
+                        entry['format'],
+                        description,
+                    )
+                )
+            else:
+                record_id = self._records_db.insert_record(
+                    item.filename, entry['created'], item.duration, entry['format'], description
+                )
+                self._records_model.insert_record(record_id)
+
+        self._records_db.end_recordings([item.entry['id'] for item in recovered])
+
+    def _on_records_scanner_finished(self) -> None:
+        self._records_scanner.deleteLater()
+        self._records_scanner = None
+
+    def _on_records_scanned(self, result: ScanResult) -> None:
+        with self._records_db.transaction():
+            self._records_db.update_scan_index(result.changed, result.removed)
+            self._records_db.set_records_missing(result.missing, True)
+            self._records_db.set_records_missing(result.found, False)
+
+        # The records added and the recordings started while scanning are not orphans
+        added = self._records_db.record_filenames([orphan.filename for orphan in result.orphans])
+        added |= self._records_db.segment_filenames() | self._recording_files()
+        orphans = [orphan for orphan in result.orphans if orphan.filename not in added]
+        if not orphans:
+            return
+
+        answer = QMessageBox.question(
+            self._records_view.window(),
+            self.tr('Scanning records'),
+            self.tr(
+                '%n audio file(s) in the records directory are not in the records list. Import them?',
+                None,
+                len(orphans),
+            ),
+        )
+
+        if answer != QMessageBox.StandardButton.Yes:
+            declined = {}
+            index = self._records_db.scan_index()
+            for orphan in orphans:
+                if entry := index.get(orphan.filename):
+                    entry.ignored = True
+                    declined[orphan.filename] = entry
+            self._records_db.update_scan_index(declined)
+            return
+
+        record_ids = self._records_db.insert_records(
+            [(orphan.filename, orphan.created, orphan.duration, orphan.audio_format, None) for orphan in orphans]
+        )
+        for record_id in record_ids:
+            self._records_model.insert_record(record_id)
+
+    def _trim_silence(self, record_id: int, filename: str) -> None:
+        trimmer = SilenceTrimmer(
+            Path(filename),
+            threshold=self._settings.trim_silence_threshold(),
+            margin=self._settings.trim_silence_margin(),
+            max_gap=self._settings.trim_silence_max_gap(),
+            parent=self,
+        )
+        trimmer.trimmed.connect(lambda _, duration: self._update_record_duration(record_id, duration))
+        trimmer.finished.connect(trimmer.deleteLater)
+
+        self.task_started.emit(trimmer, self.tr('Trimming silence'))
+        trimmer.start()
 
-    def _setup_records_db(self):
-        records_db_path = self._settings.records_db_path().as_posix()
-        self._records_db.setDatabaseName(records_db_path)
+    def _update_record_duration(self, record_id: int, duration: int) -> None:
+        row = self._records_model.record_row(record_id)
+        self._records_db.set_record_duration(record_id, duration)
 
-        if not self._records_db.open():
-            err = self._records_db.lastError()
-            raise RuntimeError(f'Cannot open records database {records_db_path!r}: {err.driverText()}')
+        if row != -1:
+            self._records_model.remove_rows([row])
+        self._records_model.insert_record(record_id)
 
-        self._create_records_table()
+    def _field_index(self, field: str) -> int:
+        return self._records_model.field_index(field)
 
     def _setup_records_model(self):
-        self._records_model.setTable('records')
-        self._records_model.setEditStrategy(QSqlTableModel.EditStrategy.OnFieldChange)
         self._records_model.select()
 
         self._records_model.setHeaderData(self._field_index('id'), Qt.Orientation.Horizontal, self.tr('#'))
         self._records_model.setHeaderData(self._field_index('created'), Qt.Orientation.Horizontal, self.tr('Date'))
         self._records_model.setHeaderData(self._field_index('duration'), Qt.Orientation.Horizontal, self.tr('Duration'))
+        self._records_model.setHeaderData(self._field_index('waveform'), Qt.Orientation.Horizontal, self.tr('Waveform'))
         self._records_model.setHeaderData(
             self._field_index('description'), Qt.Orientation.Horizontal, self.tr('Description')
         )
@@ -172,10 +393,10 @@ class RecordsManager(QObject):
         self._records_view.setSortingEnabled(True)
         self._records_view.setWordWrap(False)
 
-        fields_to_hide = ['id', 'filename', 'format']
+        fields_to_hide = ['id', 'filename', 'format', 'missing']
 
         for field in fields_to_hide:
-            column_index = self._records_model.fieldIndex(field)
+            column_index = self._field_index(field)
             self._records_view.setColumnHidden(column_index, True)
 
         self._records_view.horizontalHeader().setSectionResizeMode(
@@ -184,12 +405,28 @@ class RecordsManager(QObject):
         self._records_view.horizontalHeader().setSectionResizeMode(
             self._field_index('duration'), QHeaderView.ResizeMode.ResizeToContents
         )
+        # The thumbnails have the same width, so the header does not need to measure the rows
+        self._records_view.horizontalHeader().setSectionResizeMode(
+            self._field_index('waveform'), QHeaderView.ResizeMode.Fixed
+        )
+        self._records_view.horizontalHeader().resizeSection(self._field_index('waveform'), WaveformDelegate.width)
         self._records_view.horizontalHeader().setSectionResizeMode(
             self._field_index('description'), QHeaderView.ResizeMode.Stretch
         )
+        self._records_view.horizontalHeader().moveSection(
+            self._records_view.horizontalHeader().visualIndex(self._field_index('waveform')),
+            self._records_view.horizontalHeader().visualIndex(self._field_index('description')),
+        )
 
-        self._records_view.setItemDelegateForColumn(self._field_index('created'), DateDelegate(self._settings))
-        self._records_view.setItemDelegateForColumn(self._field_index('duration'), DurationDelegate())
+        self._date_delegate = DateDelegate(self._settings, self)
+        self._duration_delegate = DurationDelegate(self)
+
+        self._records_view.setItemDelegateForColumn(self._field_index('created'), self._date_delegate)
+        self._records_view.setItemDelegateForColumn(self._field_index('duration'), self._duration_delegate)
+
+        self._waveform_delegate = WaveformDelegate(self._waveform_cache, self._field_index('filename'), self)
+        self._records_view.setItemDelegateForColumn(self._field_index('waveform'), self._waveform_delegate)
+        self._waveform_cache.peaks_changed.connect(self._records_view.viewport().update)
 
         self._records_view.doubleClicked.connect(self._play_record)
         self._records_view.installEventFilter(self)
@@ -198,15 +435,51 @@ class RecordsManager(QObject):
         self._records_view.customContextMenuRequested.connect(self._show_records_context_menu)
 
     def _record_filename(self, row: int) -> str:
-        return self._records_model.record(row).value('filename')
+        return self._records_model.row_record(row)['filename']
 
     def _play_record(self, index: QModelIndex = None):
         if index is None:
             index = self._records_view.currentIndex()
-        filename = self._record_filename(index.row())
+        if not index.isValid():
+            return
+
+        record = self._records_model.row_record(index.row())
+        filename = record['filename']
+        if not filename:
+            return
 
-        if Path(filename).exists():
+        if not self._records_model.is_missing(index.row()):
             QDesktopServices.openUrl(QUrl.fromLocalFile(filename))
+        else:
+            if self._file_status.exists(filename) is False:
+                self._records_db.set_records_missing([record['id']], True)
+                self._records_model.set_missing(index.row(), True)
+            QMessageBox.warning(
+                self._records_view.window(),
+                self.tr('Play record'),
+                self.tr('The record file does not exist:\n%s') % Path(filename),
+            )
+
+    def _select_record_group(self, index: QModelIndex | None = None) -> None:
+        """Selects the records that were recorded from several inputs together with the record"""
+
+        if not index:
+            index = self._records_view.currentIndex()
+        if not index.isValid():
+            return
+
+        group = self._records_db.record_group(self._records_model.row_record(index.row())['id'])
+        if group is None:
+            return
+
+        selection = QItemSelection()
+        for record_id in self._records_db.group_records(group[0]):
+            if (row := self._records_model.record_row(record_id)) != -1:
+                selection.select(self._records_model.index(row, 0), self._records_model.index(row, 0))
+
+        self._records_view.selectionModel().select(
+            selection, QItemSelectionModel.SelectionFlag.ClearAndSelect | QItemSelectionModel.SelectionFlag.Rows
+        )
 
     def _open_recording_location(self, index: QModelIndex | None = None):
         if not index:
@@ -215,8 +488,10 @@ class RecordsManager(QObject):
             return
 
         filename = self._record_filename(index.row())
+        if not filename:
+            return
 
-        if Path(filename).exists():
+        if not self._records_model.is_missing(index.row()):
             if sys.platform == 'win32':
                 file_managers = [
                     ['explorer', f'/select,{Path(filename)}'],
@@ -242,21 +517,85 @@ class RecordsManager(QObject):
 
     def _delete_selected_records(self):
         indexes = self._records_view.selectionModel().selectedRows(0)
-        rows = sorted([index.row() for index in indexes], reverse=True)
+        rows = sorted(index.row() for index in indexes)
+        if not rows:
+            return
+
+        records = [self._records_model.row_record(row) for row in rows]
+        attach_segments(self._records_db, records)
+
+        self._records_db.delete_records([record['id'] for record in records])
+        self._records_model.remove_rows(rows)
+
+        filenames = [filename for record in records for filename in [record['filename'], *record.get('segments', [])]]
+        remove_task = BatchTask(_remove_file, filenames, parent=self)
+        remove_task.finished.connect(remove_task.deleteLater)
+        self.task_started.emit(remove_task, self.tr('Deleting files'))
+        remove_task.start()
+
+    def _export_selected_records(self, target: ExportTarget) -> None:
+        indexes = self._records_view.selectionModel().selectedRows(0)
+        rows = sorted(index.row() for index in indexes)
+        if not rows:
+            return
 
-        for row in rows:
-            Path(self._record_filename(row)).unlink(missing_ok=True)
-            self._records_model.removeRow(row)
+        directory = QFileDialog.getExistingDirectory(
+            self._records_view, self.tr('Export records to'), self._settings.records_directory().as_posix()
+        )
+        if not directory:
+            return
 
-        self._submit_changes()
+        records = [self._records_model.row_record(row) for row in rows]
+        attach_segments(self._records_db, records)
+        jobs = export_jobs(records, Path(directory), target.suffix)
+
+        exported: list[tuple[ExportJob, Path]] = []
+        errors: list[str] = []
+
+        export_task = ExportTask(jobs, target, parent=self)
+        export_task.item_done.connect(lambda job, location: exported.append((job, location)))
+        export_task.item_failed.connect(lambda job, message: errors.append(f'{job[0]["filename"]}: {message}'))
+        export_task.finished.connect(lambda: self._on_export_finished(export_task, target, exported, errors))
+        export_task.finished.connect(export_task.deleteLater)
+
+        self.task_started.emit(export_task, self.tr('Exporting records to %s') % target.name)
+        export_task.start()
+
+    def _on_export_finished(
+        self, export_task: ExportTask, target: ExportTarget, exported: list[tuple[ExportJob, Path]], errors: list[str]
+    ) -> None:
+        audio_format = target.audio_format()
+        record_ids = self._records_db.insert_records(
+            [
+                (location.as_posix(), record['created'], record['duration'], audio_format, record['description'])
+                for (record, _), location in exported
+            ]
+        )
+        for record_id in record_ids:
+            self._records_model.insert_record(record_id)
+
+        if errors and not export_task.is_cancelled():
+            QMessageBox.warning(
+                self._records_view.window(),
+                self.tr('Exporting records to %s') % target.name,
+                self.tr('%n file(s) could not be exported', None, len(errors)) + '\n\n' + '\n'.join(errors[:10]),
+            )
 
     def _show_records_context_menu(self, pos):
         index = self._records_view.indexAt(pos)
-        if not index.isValid():
-            return
+        menu = QMenu()
+
+        if index.isValid():
+            self._add_record_actions(menu, index)
+            menu.addSeparator()
+
+        rescan_action = menu.addAction(self.tr('Rescan records directory'), self.rescan_records_directory)
+        rescan_action.setEnabled(self._records_scanner is None)
+
+        menu.exec(self._records_view.viewport().mapToGlobal(pos))
 
+    def _add_record_actions(self, menu: QMenu, index: QModelIndex) -> None:
         selected_indexes = self._records_view.selectionModel().selectedRows(0)
-        menu = QMenu()
 
         if (selected_count := len(selected_indexes)) == 1:
             menu.addAction(
@@ -265,10 +604,20 @@ class RecordsManager(QObject):
             menu.addAction(
                 self.tr('Play record'), QKeySequence(Qt.Key.Key_P, Qt.Key.Key_Space), lambda: self._play_record(index)
             )
+            group_action = menu.addAction(
+                self.tr('Select record group'), QKeySequence(Qt.Key.Key_G), lambda: self._select_record_group(index)
+            )
+            group_action.setEnabled(
+                self._records_db.record_group(self._records_model.row_record(index.row())['id']) is not None
+            )
             delete_text = self.tr('Delete record')
         else:
             delete_text = self.tr('Delete %n records', None, selected_count)
 
-        menu.addAction(delete_text, QKeySequence(Qt.Key.Key_Delete), self._delete_selected_records)
+        export_menu = menu.addMenu(self.tr('Export to'))
+        export_menu.setEnabled(ffmpeg_path() is not None)
+        for target in EXPORT_TARGETS:
+            export_menu.addAction(target.name, partial(self._export_selected_records, target))
 
-        menu.exec(self._records_view.viewport().mapToGlobal(pos))
+        menu.addSeparator()
+        menu.addAction(delete_text, QKeySequence(Qt.Key.Key_Delete), self._delete_selected_records)
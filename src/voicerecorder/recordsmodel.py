@@ -0,0 +1,418 @@
+from typing import Any
+from collections import OrderedDict
+from collections.abc import Callable, Iterable, Iterator, Sequence
+
+from PySide6.QtCore import QAbstractTableModel, QModelIndex, QObject, Qt
+from PySide6.QtGui import QGuiApplication, QPalette
+from PySide6.QtSql import QSqlDatabase, QSqlQuery
+
+from .filestatus import FileStatusCache
+from .recordsdb import exec_query, fts_query
+
+type RowData = list[Any]
+type SortKey = tuple[Any, int]
+
+
+def _row_ranges(rows: list[int]) -> Iterator[tuple[int, int]]:
+    """Groups the sorted rows into contiguous (first, last) ranges"""
+
+    first = last = None
+
+    for row in rows:
+        if last is not None and row == last + 1:
+            last = row
+            continue
+        if first is not None:
+            yield first, last
+        first = last = row
+
+    if first is not None:
+        yield first, last
+
+
+class RecordsTableModel(QAbstractTableModel):
+    """Windowed model over the records table
+
+    Rows are loaded by pages as the view asks for them. The pages are read by keyset over
+    the sort column and the record id, and only the most recently used pages are kept in memory.
+    """
+
+    fields = ('id', 'filename', 'created', 'duration', 'format', 'description', 'missing')
+    # Columns that are not stored in the records table and are drawn by delegates
+    virtual_fields = ('waveform',)
+
+    # The columns are looked up for every cell, so they are computed once
+    columns = {field: column for column, field in enumerate(fields + virtual_fields)}
+    id_column = columns['id']
+    filename_column = columns['filename']
+    description_column = columns['description']
+    missing_column = columns['missing']
+    waveform_column = columns['waveform']
+
+    page_size = 256
+    max_pages = 8
+
+    def __init__(self, database: QSqlDatabase, parent: QObject | None = None):
+        super().__init__(parent)
+
+        self._db = database
+        self._headers: dict[int, Any] = {}
+
+        self._row_count = 0
+        self._pages: OrderedDict[int, list[RowData]] = OrderedDict()
+        self._page_anchors: dict[int, SortKey] = {}
+        # The missing flags of the loaded rows, every cell of the row asks for it on repaint
+        self._missing_rows: dict[int, bool] = {}
+
+        self._sort_field = 'id'
+        self._sort_order = Qt.SortOrder.AscendingOrder
+        self._search_query = ''
+        self._file_status: FileStatusCache | None = None
+
+    def set_file_status_cache(self, file_status: FileStatusCache) -> None:
+        """Sets the cache which tells what record files are missing
+
+        Without the cache or until the file status is known, the missing flag
+        of the last records directory scan is used.
+        """
+
+        self._file_status = file_status
+        file_status.status_changed.connect(self._on_file_status_changed)
+
+    def is_missing(self, row: int) -> bool:
+        try:
+            return self._missing_rows[row]
+        except KeyError:
+            pass
+
+        row_data = self._row(row)
+        filename = row_data[self.filename_column]
+        missing = bool(row_data[self.missing_column])
+
+        if filename and self._file_status is not None:
+            if (exists := self._file_status.exists(filename)) is not None:
+                missing = not exists
+            else:
+                # Not known yet, it is asked again until the status comes
+                return missing
+
+        if filename:
+            self._missing_rows[row] = missing
+        return missing
+
+    def set_missing(self, row: int, missing: bool) -> None:
+        """Updates the missing flag of the row which record has already been updated in the database"""
+
+        if row < 0 or row >= self._row_count:
+            return
+
+        page, offset = divmod(row, self.page_size)
+        if offset < len(rows := self._pages.get(page, [])):
+            rows[offset][self.missing_column] = missing
+        self._missing_rows.pop(row, None)
+
+        self.dataChanged.emit(
+            self.index(row, 0),
+            self.index(row, self.columnCount() - 1),
+            [Qt.ItemDataRole.ForegroundRole, Qt.ItemDataRole.ToolTipRole],
+        )
+
+    def field_index(self, field: str) -> int:
+        return self.columns.get(field, -1)
+
+    def row_record(self, row: int) -> dict[str, Any]:
+        """Returns the record values of the given row by field names"""
+        return dict(zip(self.fields, self._row(row)))
+
+    def select(self) -> None:
+        """Recounts the records and drops all loaded pages"""
+
+        self.beginResetModel()
+        self._row_count = self._count_records()
+        self._clear_pages()
+        self.endResetModel()
+
+    def set_search(self, text: str) -> None:
+        """Shows only the records which descriptions contain all the words of the text as prefixes
+
+        The search goes through the full-text index of the descriptions.
+        """
+
+        search_query = fts_query(text)
+        if search_query == self._search_query:
+            return
+
+        self._search_query = search_query
+        self.select()
+
+    def insert_record(self, record_id: int) -> None:
+        """Inserts the row of the record that has already been added to the database
+
+        The row is put in its place for the current sort order. Only the pages after
+        that place are dropped, so the cost does not depend on the table size.
+        """
+
+        row_data = self._record_row_data(record_id)
+        if row_data is None:
+            return
+
+        row = self._insert_position(self._sort_key(row_data))
+
+        self.beginInsertRows(QModelIndex(), row, row)
+        self._row_count += 1
+        self._drop_pages_from(row // self.page_size)
+        self.endInsertRows()
+
+    def record_row(self, record_id: int) -> int:
+        """Returns the row of the record by its values in the database or -1 if it is not shown"""
+
+        row_data = self._record_row_data(record_id)
+        if row_data is None:
+            return -1
+        return self._rows_before(self._sort_key(row_data))
+
+    def remove_rows(self, rows: Iterable[int]) -> None:
+        """Removes the rows which records have already been deleted from the database
+
+        The rows are removed by contiguous ranges, so the view keeps its scroll position
+        and the selection of the remaining rows.
+        """
+
+        for first, last in reversed(list(_row_ranges(sorted(set(rows))))):
+            self.beginRemoveRows(QModelIndex(), first, last)
+            self._row_count -= last - first + 1
+            self._clear_pages()
+            self.endRemoveRows()
+
+    def rowCount(self, parent=QModelIndex()):
+        if parent.isValid():
+            return 0
+        return self._row_count
+
+    def columnCount(self, parent=QModelIndex()):
+        if parent.isValid():
+            return 0
+        return len(self.fields) + len(self.virtual_fields)
+
+    def data(self, index, role=Qt.ItemDataRole.DisplayRole):
+        if not index.isValid() or index.column() == self.waveform_column:
+            return None
+
+        match role:
+            case Qt.ItemDataRole.DisplayRole | Qt.ItemDataRole.EditRole:
+                return self._row(index.row())[index.column()]
+            case Qt.ItemDataRole.ForegroundRole if self.is_missing(index.row()):
+                return QGuiApplication.palette().brush(QPalette.ColorGroup.Disabled, QPalette.ColorRole.Text)
+            case Qt.ItemDataRole.ToolTipRole if self.is_missing(index.row()):
+                return self.tr('The record file is missing')
+            case Qt.ItemDataRole.ToolTipRole if index.column() == self.description_column:
+                return self._row(index.row())[index.column()]
+
+        return None
+
+    def setData(self, index, value, role=Qt.ItemDataRole.EditRole):
+        if not index.isValid() or role != Qt.ItemDataRole.EditRole:
+            return False
+        if index.column() != self.description_column:
+            return False
+
+        row = self._row(index.row())
+        self._exec('UPDATE records SET description = ? WHERE id = ?', [value, row[self.id_column]])
+        row[index.column()] = value
+
+        self.dataChanged.emit(index, index, [Qt.ItemDataRole.DisplayRole, Qt.ItemDataRole.EditRole])
+        return True
+
+    def flags(self, index):
+        flags = super().flags(index)
+        if index.isValid() and index.column() == self.description_column:
+            flags |= Qt.ItemFlag.ItemIsEditable
+        return flags
+
+    def headerData(self, section, orientation, role=Qt.ItemDataRole.DisplayRole):
+        if orientation == Qt.Orientation.Horizontal and role == Qt.ItemDataRole.DisplayRole:
+            return self._headers.get(section, (self.fields + self.virtual_fields)[section])
+        return super().headerData(section, orientation, role)
+
+    def setHeaderData(self, section, orientation, value, role=Qt.ItemDataRole.EditRole):
+        if orientation != Qt.Orientation.Horizontal:
+            return False
+        if role not in (Qt.ItemDataRole.EditRole, Qt.ItemDataRole.DisplayRole):
+            return False
+        self._headers[section] = value
+        self.headerDataChanged.emit(orientation, section, section)
+        return True
+
+    def sort(self, column, order=Qt.SortOrder.AscendingOrder):
+        if not 0 <= column < len(self.fields):
+            return
+
+        self.beginResetModel()
+        self._sort_field = self.fields[column]
+        self._sort_order = order
+        self._clear_pages()
+        self.endResetModel()
+
+    def _on_file_status_changed(self, _filenames: list[str]) -> None:
+        self._missing_rows.clear()
+        if self._row_count:
+            self.dataChanged.emit(
+                self.index(0, 0),
+                self.index(self._row_count - 1, self.columnCount() - 1),
+                [Qt.ItemDataRole.ForegroundRole, Qt.ItemDataRole.ToolTipRole],
+            )
+
+    def _exec(self, sql: str, params: Sequence[Any] = ()) -> QSqlQuery:
+        return exec_query(self._db, sql, params)
+
+    def _count_records(self) -> int:
+        where, params = self._where()
+        query = self._exec(f'SELECT COUNT(*) FROM records{where}', params)
+        return query.value(0) if query.next() else 0
+
+    def _record_row_data(self, record_id: int) -> RowData | None:
+        where, params = self._where(['id = ?'], [record_id])
+        query = self._exec(f'SELECT {", ".join(self.fields)} FROM records{where}', params)
+        if not query.next():
+            return None
+        return [query.value(column) for column in range(len(self.fields))]
+
+    def _where(self, conditions: Sequence[str] = (), params: Sequence[Any] = ()) -> tuple[str, list[Any]]:
+        """Makes the WHERE clause with the given conditions and the search filter"""
+
+        conditions = list(conditions)
+        params = list(params)
+
+        if self._search_query:
+            conditions.insert(0, 'id IN (SELECT rowid FROM records_fts WHERE records_fts MATCH ?)')
+            params.insert(0, self._search_query)
+
+        if not conditions:
+            return '', params
+        return f' WHERE {" AND ".join(conditions)}', params
+
+    def _clear_pages(self) -> None:
+        self._pages.clear()
+        self._page_anchors.clear()
+        self._missing_rows.clear()
+
+    def _drop_pages_from(self, page: int) -> None:
+        for cached_page in [p for p in self._pages if p >= page]:
+            del self._pages[cached_page]
+        for anchored_page in [p for p in self._page_anchors if p >= page]:
+            del self._page_anchors[anchored_page]
+        self._drop_missing_rows(lambda row: row >= page * self.page_size)
+
+    def _drop_missing_rows(self, dropped: Callable[[int], bool]) -> None:
+        for row in [row for row in self._missing_rows if dropped(row)]:
+            del self._missing_rows[row]
+
+    def _order(self) -> tuple[str, str]:
+        if self._sort_order == Qt.SortOrder.AscendingOrder:
+            return 'ASC', '>'
+        return 'DESC', '<'
+
+    def _insert_position(self, key: SortKey) -> int:
+        """Returns the row for a new record with the given sort key
+
+        The new records usually go to the start or to the end of the table,
+        which is checked by the index, otherwise the rows before the key are counted.
+        """
+
+        sort_expr = self._sort_expression()
+        direction, _ = self._order()
+        inverse_direction = 'DESC' if direction == 'ASC' else 'ASC'
+
+        # The record itself is already in the database, so it is excluded from the checks
+        where, params = self._where(['id != ?'], [key[1]])
+        edges_sql = f'SELECT {sort_expr}, id FROM records{where} ORDER BY {sort_expr} {{0}}, id {{0}} LIMIT 1'
+
+        query = self._exec(edges_sql.format(inverse_direction), params)
+        if not query.next() or self._follows(key, (query.value(0), query.value(1))):
+            return self._row_count
+
+        query = self._exec(edges_sql.format(direction), params)
+        if query.next() and self._follows((query.value(0), query.value(1)), key):
+            return 0
+
+        return self._rows_before(key)
+
+    def _rows_before(self, key: SortKey) -> int:
+        _, comparison = self._order()
+        inverse_comparison = '<' if comparison == '>' else '>'
+
+        where, params = self._where([f'({self._sort_expression()}, id) {inverse_comparison} (?, ?)'], key)
+        query = self._exec(f'SELECT COUNT(*) FROM records{where}', params)
+        return query.value(0) if query.next() else self._row_count
+
+    def _follows(self, key: SortKey, other_key: SortKey) -> bool:
+        if self._sort_order == Qt.SortOrder.AscendingOrder:
+            return key > other_key
+        return key < other_key
+
+    def _sort_expression(self) -> str:
+        if self._sort_field == 'description':
+            return "COALESCE(description, '')"
+        return self._sort_field
+
+    def _sort_key(self, row: RowData) -> SortKey:
+        value = row[self.columns[self._sort_field]]
+        if value is None:
+            value = ''
+        return value, row[self.id_column]
+
+    def _row(self, row: int) -> RowData:
+        if row < 0 or row >= self._row_count:
+            return [None] * len(self.fields)
+
+        page, offset = divmod(row, self.page_size)
+        rows = self._page(page)
+
+        if offset >= len(rows):
+            return [None] * len(self.fields)
+        return rows[offset]
+
+    def _page(self, page: int) -> list[RowData]:
+        if page in self._pages:
+            self._pages.move_to_end(page)
+            return self._pages[page]
+
+        rows = self._fetch_page(page)
+
+        self._pages[page] = rows
+        if rows:
+            self._page_anchors[page] = self._sort_key(rows[-1])
+        while len(self._pages) > self.max_pages:
+            evicted, _ = self._pages.popitem(last=False)
+            self._drop_missing_rows(lambda row: row // self.page_size == evicted)
+
+        return rows
+
+    def _fetch_page(self, page: int) -> list[RowData]:
+        sort_expr = self._sort_expression()
+
+        direction, comparison = self._order()
+
+        # Seek right after the last row of the previous page when it is known,
+        # otherwise (e.g. the scroll bar was dragged far away) fall back to offset
+        anchor = self._page_anchors.get(page - 1)
+        if anchor is not None:
+            where, params = self._where([f'({sort_expr}, id) {comparison} (?, ?)'], anchor)
+        else:
+            where, params = self._where()
+
+        sql = f'SELECT {", ".join(self.fields)} FROM records{where}'
+        sql += f' ORDER BY {sort_expr} {direction}, id {direction} LIMIT ?'
+        params.append(self.page_size)
+
+        if anchor is None:
+            sql += ' OFFSET ?'
+            params.append(page * self.page_size)
+
+        query = self._exec(sql, params)
+        columns = range(len(self.fields))
+
+        rows = []
+        while query.next():
+            rows.append([query.value(column) for column in columns])
+        return rows
@@ -0,0 +1,176 @@
+from dataclasses import dataclass, field
+import os
+from pathlib import Path
+
+from PySide6.QtCore import QEventLoop, QMimeDatabase, QObject, QTimer, QUrl, Signal
+from PySide6.QtMultimedia import QAudioDecoder, QMediaFormat
+
+from .recordsdb import ScanIndexEntry
+from .silencetrim import read_wav_info
+from .tasks import Task
+from .utils import format_audio_format
+
+
+def probe_duration(filename: str, timeout: int = 5000) -> int:
+    """Returns the duration of the audio file in ms or 0 if it cannot be found out
+
+    The decoder runs its own event loop, so the function must be called from a worker thread.
+    """
+
+    if Path(filename).suffix.lower() == '.wav':
+        try:
+            info = read_wav_info(Path(filename))
+        except (OSError, ValueError):
+            pass
+        else:
+            return info.frame_count * 1000 // info.sample_rate
+
+    decoder = QAudioDecoder()
+    decoder.setSource(QUrl.fromLocalFile(filename))
+
+    loop = QEventLoop()
+    decoder.durationChanged.connect(lambda duration: duration > 0 and loop.quit())
+    decoder.finished.connect(loop.quit)
+    decoder.error.connect(lambda _: loop.quit())
+    QTimer.singleShot(timeout, loop.quit)
+
+    decoder.start()
+    loop.exec()
+
+    duration = decoder.duration()
+    decoder.stop()
+
+    return max(duration, 0)
+
+
+def probe_audio_format(filename: str) -> str:
+    """Returns the audio format of the file by its name or the empty string if it is not audio"""
+
+    mime_type = QMimeDatabase().mimeTypeForFile(filename, QMimeDatabase.MatchMode.MatchExtension)
+    if not mime_type.name().startswith('audio/'):
+        return ''
+
+    for file_format in QMediaFormat().supportedFileFormats(QMediaFormat.ConversionMode.Decode):
+        media_format = QMediaFormat(file_format)
+        if mime_type.inherits(media_format.mimeType().name()):
+            return format_audio_format(media_format)
+
+    return mime_type.name()
+
+
+@dataclass
+class OrphanFile:
+    filename: str
+    created: int
+    duration: int
+    audio_format: str
+
+
+@dataclass
+class ScanResult:
+    changed: dict[str, ScanIndexEntry] = field(default_factory=dict)
+    removed: list[str] = field(default_factory=list)
+    missing: list[int] = field(default_factory=list)
+    found: list[int] = field(default_factory=list)
+    orphans: list[OrphanFile] = field(default_factory=list)
+
+
+class RecordsScanner(Task):
+    """Reconciles the records with the files in the records directory
+
+    The directory is walked with os.scandir and the size and mtime of every file are compared
+    to the stored index, so only the new and changed files that are not records are probed.
+    The records which files do not exist are reported as missing and the audio files that are not
+    records or their segments are reported as orphans, unless the user has already declined to import them.
+    The files that are still being recorded are not probed and are not orphans.
+    The progress is the number of walked files.
+    """
+
+    scanned = Signal(ScanResult)
+
+    def __init__(
+        self,
+        directory: Path,
+        records: list[tuple[int, str, bool]],
+        index: dict[str, ScanIndexEntry],
+        segment_filenames: set[str] | None = None,
+        recording_filenames: set[str] | None = None,
+        parent: QObject | None = None,
+    ):
+        super().__init__(parent=parent)
+
+        self._directory = directory
+        self._records = records
+        self._index = index
+        self._segment_filenames = segment_filenames or set()
+        self._recording_filenames = recording_filenames or set()
+
+    def run(self) -> None:
+        files = self._walk()
+
+        record_filenames = {filename for _, filename, _ in self._records}
+        record_filenames |= self._segment_filenames | self._recording_filenames
+        result = ScanResult()
+
+        for filename, (size, mtime) in files.items():
+            self._check_cancelled()
+
+            entry = self._index.get(filename)
+            if entry is None or (entry.size, entry.mtime) != (size, mtime):
+                entry = result.changed[filename] = ScanIndexEntry(size, mtime)
+
+            if filename in record_filenames or entry.ignored:
+                continue
+
+            if entry.audio_format is None:
+                entry.audio_format = probe_audio_format(filename)
+                entry.duration = probe_duration(filename) if entry.audio_format else 0
+                result.changed[filename] = entry
+
+            if entry.audio_format:
+                result.orphans.append(OrphanFile(filename, mtime // 1_000_000_000, entry.duration, entry.audio_format))
+
+        result.removed = [filename for filename in self._index if filename not in files]
+
+        for record_id, filename, missing in self._records:
+            if Path(filename).is_relative_to(self._directory):
+                exists = filename in files
+            else:
+                exists = os.path.exists(filename)
+
+            if exists == missing:
+                (result.found if exists else result.missing).append(record_id)
+
+        self.scanned.emit(result)
+
+    def _walk(self) -> dict[str, tuple[int, int]]:
+        """Returns the size and the mtime of every file in the directory tree by filename"""
+
+        files = {}
+        directories = [self._directory]
+
+        while directories:
+            self._check_cancelled()
+
+            try:
+                entries = os.scandir(directories.pop())
+            except OSError:
+                continue
+
+            with entries:
+                for entry in entries:
+                    if entry.name.startswith('.') or entry.name.endswith('.part'):
+                        continue
+
+                    try:
+                        if entry.is_dir(follow_symlinks=False):
+                            directories.append(Path(entry.path))
+                        elif entry.is_file():
+                            stat = entry.stat()
+                            files[Path(entry.path).as_posix()] = (stat.st_size, stat.st_mtime_ns)
+                    except OSError:
+                        continue
+
+            self.progress.emit(len(files), 0)
+
+        return files
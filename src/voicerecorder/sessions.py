@@ -0,0 +1,70 @@
+from typing import Any
+from collections.abc import Sequence
+import os
+from pathlib import Path
+
+from .record import Record
+from .recordsdb import RecordsDatabase
+from .utils import format_audio_format
+
+
+def write_playlist(path: Path, segments: Sequence[tuple[str, int]]) -> None:
+    """Writes the extended M3U playlist of the (filename, duration) segments relative to its directory"""
+
+    lines = ['#EXTM3U']
+    for filename, duration in segments:
+        segment_path = Path(filename)
+        lines.append(f'#EXTINF:{round(duration / 1000)},{segment_path.stem}')
+        lines.append(Path(os.path.relpath(segment_path, path.parent)).as_posix())
+
+    partial_path = path.with_name(f'{path.name}.part')
+    partial_path.write_text('\n'.join(lines) + '\n', encoding='utf-8')
+    os.replace(partial_path, path)
+
+
+def add_segment(records_db: RecordsDatabase, record: Record, description: str | None = None) -> tuple[int, bool]:
+    """Registers the segment under the record of its session and rewrites the session playlist
+
+    The session record is created with the first segment, its file is the playlist and its duration
+    is the sum of the segment durations. Returns the session record id and whether it has been created.
+    """
+
+    return add_session_segment(
+        records_db,
+        record.session,
+        record.filename,
+        record.created,
+        record.duration,
+        format_audio_format(record.audio_format),
+        description,
+    )
+
+
+def add_session_segment(
+    records_db: RecordsDatabase,
+    session: str,
+    filename: str,
+    created: int,
+    duration: int,
+    audio_format: str,
+    description: str | None = None,
+) -> tuple[int, bool]:
+    record_id = records_db.record_id(session)
+    is_new = record_id is None
+
+    if is_new:
+        record_id = records_db.insert_record(session, created, 0, audio_format, description)
+
+    records_db.insert_segment(record_id, filename, created, duration)
+    write_playlist(Path(session), records_db.segments(record_id))
+
+    return record_id, is_new
+
+
+def attach_segments(records_db: RecordsDatabase, records: Sequence[dict[str, Any]]) -> None:
+    """Adds the segment filenames of the session records to them as 'segments'"""
+
+    for record in records:
+        segments = records_db.segments(record['id'])
+        if segments:
+            record['segments'] = [filename for filename, _ in segments]
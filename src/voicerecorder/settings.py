@@ -1,20 +1,49 @@
-from typing import Any, ContextManager
-from contextlib import contextmanager
+from typing import TYPE_CHECKING, Any
+from collections.abc import Callable
 from pathlib import Path
 
-from PySide6.QtCore import QByteArray, QObject, QSettings, QStandardPaths
+from PySide6.QtCore import QByteArray, QCoreApplication, QObject, QSettings, QStandardPaths, QTimer, Signal
 from PySide6.QtMultimedia import QMediaDevices, QMediaFormat
-from PySide6.QtWidgets import QMainWindow
 
 from .constants import APP_NAME, PKG_NAME
 
+if TYPE_CHECKING:
+    from PySide6.QtWidgets import QMainWindow
 
-class Settings:
-    """Stores and manages the application settings"""
+
+def _to_bool(value: Any) -> bool:
+    return value in (True, 'true', '1')
+
+
+class Settings(QObject):
+    """Stores and manages the application settings
+
+    The settings file is read into memory once and the getters are served from it, every typed value
+    is converted only once. The changes are written back in one batch after a short delay or by flush().
+    """
+
+    # The settings key ('Group/Key') that has been changed
+    changed = Signal(str)
+
+    flush_delay = 1000  # ms
 
     def __init__(self, parent: QObject | None = None):
+        super().__init__(parent)
+
         self.app_config_dir().mkdir(parents=True, exist_ok=True)
-        self._settings = QSettings(str(self.settings_file_path()), QSettings.Format.IniFormat, parent)
+        self._settings = QSettings(str(self.settings_file_path()), QSettings.Format.IniFormat, self)
+
+        self._values: dict[str, Any] = {key: self._settings.value(key) for key in self._settings.allKeys()}
+        self._typed_values: dict[str, Any] = {}
+        self._dirty_keys: set[str] = set()
+
+        self._flush_timer = QTimer(self)
+        self._flush_timer.setSingleShot(True)
+        self._flush_timer.setInterval(self.flush_delay)
+        self._flush_timer.timeout.connect(self.flush)
+
+        if app := QCoreApplication.instance():
+            app.aboutToQuit.connect(self.flush)
 
     @staticmethod
     def app_config_dir() -> Path:
@@ -26,69 +55,169 @@ class Settings:
     def records_db_path(self) -> Path:
         return self.app_config_dir() / 'records.db'
 
-    @contextmanager
-    def group(self, name: str) -> ContextManager[QSettings]:  # noqa
-        self._settings.beginGroup(name)
+    def media_capabilities_path(self) -> Path:
+        return self.app_config_dir() / 'media-capabilities.json'
+
+    def value(
+        self,
+        key: str,
+        default: Any = None,
+        convert: Callable[[Any], Any] | None = None,
+        default_factory: Callable[[], Any] | None = None,
+    ) -> Any:
+        """Returns the converted value of the 'Group/Key' key, the missing key is set to the default"""
+
         try:
-            yield self._settings  # noqa
-        finally:
-            self._settings.endGroup()
-
-    def set_default(self, group: str, key: str, value: Any) -> Any:
-        with self.group(group) as s:
-            if s.contains(key):
-                value = s.value(key)
-            else:
-                s.setValue(key, value)
+            return self._typed_values[key]
+        except KeyError:
+            pass
+
+        if key not in self._values:
+            self._values[key] = default_factory() if default_factory is not None else default
+            self._schedule_flush(key)
+
+        value = self._values[key]
+        if convert is not None:
+            value = convert(value)
+
+        self._typed_values[key] = value
         return value
 
+    def set_value(self, key: str, value: Any) -> None:
+        if key in self._values and self._values[key] == value:
+            return
+
+        self._values[key] = value
+        self._typed_values.pop(key, None)
+        self._schedule_flush(key)
+        self.changed.emit(key)
+
+    def flush(self) -> None:
+        """Writes the changed values to the settings file"""
+
+        self._flush_timer.stop()
+
+        if not self._dirty_keys:
+            return
+
+        for key in sorted(self._dirty_keys):
+            self._settings.setValue(key, self._values[key])
+        self._dirty_keys.clear()
+        self._settings.sync()
+
+    def _schedule_flush(self, key: str) -> None:
+        self._dirty_keys.add(key)
+        if QCoreApplication.instance() is not None:
+            self._flush_timer.start()
+
     def records_directory(self) -> Path:
-        documents_dir = Path(QStandardPaths.standardLocations(QStandardPaths.StandardLocation.MusicLocation)[0])
-        default_records_dir = documents_dir / APP_NAME
-        return Path(self.set_default('Record', 'RecordsDirectory', default_records_dir.as_posix()))
+        def default_records_dir() -> str:
+            music_dir = Path(QStandardPaths.standardLocations(QStandardPaths.StandardLocation.MusicLocation)[0])
+            return (music_dir / APP_NAME).as_posix()
+
+        return self.value('Record/RecordsDirectory', convert=Path, default_factory=default_records_dir)
+
+    def set_records_directory(self, directory: Path) -> None:
+        self.set_value('Record/RecordsDirectory', directory.as_posix())
 
     def record_filename_format(self) -> str:
         default_format = 'record-%d-%m-%Y-%H-%M-%S'
-        return self.set_default('Record', 'RecordFilenameFormat', default_format)
+        return self.value('Record/RecordFilenameFormat', default_format)
+
+    def record_to_destination(self) -> bool:
+        """Whether the recorder writes directly to the file in the records directory"""
+        return self.value('Record/RecordToDestination', True, _to_bool)
+
+    def segment_minutes(self) -> int | None:
+        """The longest segment of the segmented recording in minutes, or None not to rotate by the time"""
+        return self.value('Segments/Minutes', 0, lambda value: max(int(value), 0) or None)
+
+    def segment_megabytes(self) -> int | None:
+        """The largest segment of the segmented recording in MiB, or None not to rotate by the size"""
+        return self.value('Segments/Megabytes', 0, lambda value: max(int(value), 0) or None)
+
+    def auto_pause(self) -> bool:
+        """Whether the recording is paused automatically while there is no voice"""
+        return self.value('AutoPause/Enabled', False, _to_bool)
+
+    def auto_pause_threshold(self) -> float:
+        """Voice energy threshold in dBFS"""
+        return self.value('AutoPause/Threshold', -45.0, float)
+
+    def auto_pause_hangover(self) -> int:
+        """How long the recording goes on after the voice has ended, in ms"""
+        return self.value('AutoPause/Hangover', 2000, int)
+
+    def auto_pause_pre_roll(self) -> int:
+        """The longest start of the voice that can be missed while the recording is auto-paused, in ms"""
+        return self.value('AutoPause/PreRoll', 30, int)
+
+    def trim_silence(self) -> bool:
+        """Whether the silence is cut off the finished WAV records"""
+        return self.value('TrimSilence/Enabled', False, _to_bool)
+
+    def trim_silence_threshold(self) -> float:
+        """Silence level in dBFS"""
+        return self.value('TrimSilence/Threshold', -50.0, float)
+
+    def trim_silence_margin(self) -> int:
+        """How much of the silence is kept around the sound, in ms"""
+        return self.value('TrimSilence/Margin', 250, int)
+
+    def trim_silence_max_gap(self) -> int | None:
+        """The longest silent gap inside the record that is kept, in ms, or None to keep all gaps"""
+        return self.value('TrimSilence/MaxGap', 0, lambda value: max(int(value), 0) or None)
 
     def record_table_format(self) -> str:
         default_format = '%d.%m.%Y %H:%M:%S'
-        return self.set_default('Record', 'RecordTableFormat', default_format)
+        return self.value('Record/RecordTableFormat', default_format)
 
-    def restory_window_state(self, window: QMainWindow) -> None:
-        geometry = self.set_default('UI', 'WindowGeometry', window.saveGeometry())
-        state = self.set_default('UI', 'WindowState', window.saveState())
+    def restory_window_state(self, window: 'QMainWindow') -> None:
+        geometry = self.value('UI/WindowGeometry', window.saveGeometry())
+        state = self.value('UI/WindowState', window.saveState())
 
         window.restoreGeometry(geometry)
         window.restoreState(state)
 
-    def set_window_state(self, window: QMainWindow) -> None:
-        with self.group('UI') as s:
-            s.setValue('WindowGeometry', window.saveGeometry())
-            s.setValue('WindowState', window.saveState())
+    def set_window_state(self, window: 'QMainWindow') -> None:
+        self.set_value('UI/WindowGeometry', window.saveGeometry())
+        self.set_value('UI/WindowState', window.saveState())
 
     def get_audio_input_id(self) -> QByteArray:
-        default_input_id = QMediaDevices.defaultAudioInput().id()
-        return self.set_default('Audio', 'Input', default_input_id)
+        return self.value('Audio/Input', default_factory=lambda: QMediaDevices.defaultAudioInput().id())
 
     def set_audio_input_id(self, audio_input_id: QByteArray) -> None:
-        with self.group('Audio') as s:
-            s.setValue('Input', audio_input_id)
+        self.set_value('Audio/Input', audio_input_id)
+
+    def extra_audio_input_ids(self) -> list[QByteArray]:
+        """Inputs that are recorded at once with the selected one"""
+        return self.value(
+            'Audio/ExtraInputs', '', lambda ids: [QByteArray.fromHex(i.encode()) for i in str(ids).split() if i]
+        )
+
+    def set_extra_audio_input_ids(self, audio_input_ids: list[QByteArray]) -> None:
+        self.set_value('Audio/ExtraInputs', ' '.join(i.toHex().data().decode() for i in audio_input_ids))
+
+    def audio_fallback_input_id(self) -> QByteArray:
+        """Input to switch to when the recording input is unplugged, the default input if it is empty"""
+        return self.value('Audio/FallbackInput', QByteArray(), QByteArray)
 
     def get_audio_codec(self) -> QMediaFormat.AudioCodec:
         default_codec = QMediaFormat.AudioCodec.Opus
-        codec = self.set_default('Record', 'AudioCodec', hex(default_codec.value))
-        return QMediaFormat.AudioCodec(int(codec, 16))
+        return self.value(
+            'Record/AudioCodec', hex(default_codec.value), lambda codec: QMediaFormat.AudioCodec(int(codec, 16))
+        )
 
     def set_audio_codec(self, codec: QMediaFormat.AudioCodec) -> None:
-        with self.group('Record') as s:
-            s.setValue('AudioCodec', hex(codec.value))
+        self.set_value('Record/AudioCodec', hex(codec.value))
 
     def get_file_format(self) -> QMediaFormat.FileFormat:
         default_format = QMediaFormat.FileFormat.Matroska
-        file_format = self.set_default('Record', 'FileFormat', hex(default_format.value))
-        return QMediaFormat.FileFormat(int(file_format, 16))
+        return self.value(
+            'Record/FileFormat',
+            hex(default_format.value),
+            lambda file_format: QMediaFormat.FileFormat(int(file_format, 16)),
+        )
 
     def set_file_format(self, file_format: QMediaFormat.FileFormat) -> None:
-        with self.group('Record') as s:
-            s.setValue('FileFormat', hex(file_format.value))
+        self.set_value('Record/FileFormat', hex(file_format.value))
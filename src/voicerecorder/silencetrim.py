@@ -0,0 +1,289 @@
+from dataclasses import dataclass
+import os
+from pathlib import Path
+import struct
+
+import numpy as np
+from PySide6.QtCore import QObject, Signal
+
+from .recordfinalizer import fsync_directory
+from .tasks import Task
+
+WAVE_FORMAT_PCM = 0x0001
+WAVE_FORMAT_IEEE_FLOAT = 0x0003
+WAVE_FORMAT_EXTENSIBLE = 0xFFFE
+
+_RIFF_HEADER = struct.Struct('<4sI4s')
+_CHUNK_HEADER = struct.Struct('<4sI')
+_FMT = struct.Struct('<HHIIHH')
+
+type FrameRange = tuple[int, int]
+
+
+@dataclass
+class WavInfo:
+    fmt_chunk: bytes
+    format_tag: int
+    channels: int
+    sample_rate: int
+    block_align: int
+    data_offset: int
+    data_size: int
+
+    @property
+    def frame_count(self) -> int:
+        return self.data_size // self.block_align
+
+    @property
+    def sample_width(self) -> int:
+        return self.block_align // self.channels
+
+
+def read_wav_info(path: Path) -> WavInfo:
+    """Reads the format and the location of the PCM data of the RIFF/WAVE file
+
+    The data size is limited by the file size, so the files with unfinished headers can be read too.
+    """
+
+    with open(path, 'rb') as f:
+        try:
+            riff, _, wave = _RIFF_HEADER.unpack(f.read(_RIFF_HEADER.size))
+        except struct.error:
+            raise ValueError(f'{path} is not a WAV file') from None
+        if riff != b'RIFF' or wave != b'WAVE':
+            raise ValueError(f'{path} is not a WAV file')
+
+        fmt_chunk = None
+
+        while len(header := f.read(_CHUNK_HEADER.size)) == _CHUNK_HEADER.size:
+            chunk_id, size = _CHUNK_HEADER.unpack(header)
+
+            if chunk_id == b'fmt ':
+                fmt_chunk = f.read(size)
+                f.seek(size % 2, os.SEEK_CUR)
+            elif chunk_id == b'data':
+                break
+            else:
+                f.seek(size + size % 2, os.SEEK_CUR)
+        else:
+            raise ValueError(f'{path} has no data chunk')
+
+        if fmt_chunk is None or len(fmt_chunk) < _FMT.size:
+            raise ValueError(f'{path} has no format chunk')
+
+        data_offset = f.tell()
+        data_size = min(size, os.fstat(f.fileno()).st_size - data_offset)
+
+    format_tag, channels, sample_rate, _, block_align, _ = _FMT.unpack_from(fmt_chunk)
+    if format_tag == WAVE_FORMAT_EXTENSIBLE and len(fmt_chunk) >= 26:
+        # The format of the extensible WAV is the start of the sub-format GUID
+        (format_tag,) = struct.unpack_from('<H', fmt_chunk, 24)
+
+    info = WavInfo(fmt_chunk, format_tag, channels, sample_rate, block_align, data_offset, data_size)
+
+    if channels < 1 or block_align % channels or (format_tag, info.sample_width) not in _SAMPLE_DECODERS:
+        raise ValueError(f'{path} has unsupported sample format')
+    return info
+
+
+def repair_wav_header(path: Path) -> WavInfo:
+    """Rewrites the RIFF and the data chunk sizes of the unfinished WAV file by the data it has
+
+    The size in the header is the placeholder the recorder has not updated, so the data is taken
+    up to the end of the file. The incomplete frame at the end of the data is left out of the data chunk.
+    """
+
+    info = read_wav_info(path)
+    file_size = path.stat().st_size
+
+    data_size = min(file_size - info.data_offset, 0xFFFFFFFF)
+    info.data_size = data_size - data_size % info.block_align
+    riff_size = min(file_size - 8, 0xFFFFFFFF)
+
+    with open(path, 'r+b') as f:
+        f.seek(4)
+        f.write(struct.pack('<I', riff_size))
+        f.seek(info.data_offset - 4)
+        f.write(struct.pack('<I', info.data_size))
+        f.flush()
+        os.fsync(f.fileno())
+
+    return info
+
+
+def _decode_int24(data: np.ndarray) -> np.ndarray:
+    triples = data.reshape(-1, 3)
+    samples = triples[:, 0].astype(np.int32) | (triples[:, 1].astype(np.int32) << 8)
+    samples |= triples[:, 2].view(np.int8).astype(np.int32) << 16
+    return samples.astype(np.float32) / 8388608.0
+
+
+# Converters of the raw data bytes to float32 samples in [-1, 1] by (format tag, sample width)
+_SAMPLE_DECODERS = {
+    (WAVE_FORMAT_PCM, 1): lambda data: (data.astype(np.float32) - 128.0) / 128.0,
+    (WAVE_FORMAT_PCM, 2): lambda data: data.view('<i2').astype(np.float32) / 32768.0,
+    (WAVE_FORMAT_PCM, 3): _decode_int24,
+    (WAVE_FORMAT_PCM, 4): lambda data: data.view('<i4').astype(np.float32) / 2147483648.0,
+    (WAVE_FORMAT_IEEE_FLOAT, 4): lambda data: data.view('<f4'),
+    (WAVE_FORMAT_IEEE_FLOAT, 8): lambda data: data.view('<f8').astype(np.float32),
+}
+
+
+def decode_frames(data: np.ndarray, info: WavInfo) -> np.ndarray:
+    """Converts the raw bytes of whole frames to float32 samples with the (frames, channels) shape"""
+    samples = _SAMPLE_DECODERS[info.format_tag, info.sample_width](data)
+    return samples.reshape(-1, info.channels)
+
+
+def retained_ranges(
+    voiced_runs: list[FrameRange], frame_count: int, margin: int, max_gap: int | None = None
+) -> list[FrameRange]:
+    """Returns the frame ranges to keep around the voiced runs
+
+    Each run is widened by the margin. Without the max gap only the head and the tail are cut,
+    otherwise the silent gaps longer than the max gap are cut too.
+    """
+
+    if not voiced_runs:
+        return []
+    if max_gap is None:
+        voiced_runs = [(voiced_runs[0][0], voiced_runs[-1][1])]
+        max_gap = 0
+
+    ranges: list[FrameRange] = []
+
+    for start, end in voiced_runs:
+        start = max(start - margin, 0)
+        end = min(end + margin, frame_count)
+
+        if ranges and start - ranges[-1][1] <= max_gap:
+            ranges[-1] = (ranges[-1][0], end)
+        else:
+            ranges.append((start, end))
+
+    return ranges
+
+
+class SilenceTrimmer(Task):
+    """Cuts the silence off the WAV record in place
+
+    The PCM data is memory-mapped and analysed by chunks of windows, and then only the retained
+    frame ranges are copied by chunks to a partial file that replaces the record, so the memory
+    does not depend on the record length.
+    The progress is reported in frames for the analysis and then for the copying.
+    """
+
+    trimmed = Signal(str, int)
+
+    window_duration = 10  # ms
+    chunk_windows = 4096
+    copy_size = 4 * 1024 * 1024
+
+    def __init__(
+        self,
+        path: Path,
+        threshold: float = -50.0,
+        margin: int = 250,
+        max_gap: int | None = None,
+        parent: QObject | None = None,
+    ):
+        super().__init__(parent=parent)
+
+        self._path = path
+        self._threshold = threshold
+        self._margin = margin
+        self._max_gap = max_gap
+
+    def run(self) -> None:
+        info = read_wav_info(self._path)
+        if info.frame_count == 0:
+            return
+
+        partial_path = self._path.with_name(f'{self._path.name}.part')
+
+        try:
+            kept_frames = self._trim(info, partial_path)
+            if kept_frames is None:
+                return
+            os.replace(partial_path, self._path)
+        finally:
+            partial_path.unlink(missing_ok=True)
+
+        fsync_directory(self._path.parent)
+        self.trimmed.emit(self._path.as_posix(), kept_frames * 1000 // info.sample_rate)
+
+    def _trim(self, info: WavInfo, partial_path: Path) -> int | None:
+        """Writes the retained frames to the partial file and returns their count
+
+        None is returned when there is nothing to cut or the record is entirely silent.
+        """
+
+        data = np.memmap(self._path, dtype=np.uint8, mode='r', offset=info.data_offset, shape=(info.data_size,))
+
+        ms_frames = info.sample_rate / 1000
+        max_gap = None if self._max_gap is None else int(self._max_gap * ms_frames)
+        ranges = retained_ranges(
+            self._voiced_runs(data, info), info.frame_count, int(self._margin * ms_frames), max_gap
+        )
+
+        if not ranges or ranges == [(0, info.frame_count)]:
+            return None
+
+        kept_frames = sum(end - start for start, end in ranges)
+        data_size = kept_frames * info.block_align
+        fmt_chunk = info.fmt_chunk + b'\0' * (len(info.fmt_chunk) % 2)
+
+        with open(partial_path, 'wb') as f:
+            f.write(_RIFF_HEADER.pack(b'RIFF', 4 + 8 + len(fmt_chunk) + 8 + data_size, b'WAVE'))
+            f.write(_CHUNK_HEADER.pack(b'fmt ', len(info.fmt_chunk)))
+            f.write(fmt_chunk)
+            f.write(_CHUNK_HEADER.pack(b'data', data_size))
+
+            copy_frames = max(self.copy_size // info.block_align, 1)
+            copied = 0
+
+            for start, end in ranges:
+                for chunk_start in range(start, end, copy_frames):
+                    self._check_cancelled()
+
+                    chunk_end = min(chunk_start + copy_frames, end)
+                    f.write(data[chunk_start * info.block_align : chunk_end * info.block_align])
+
+                    copied += chunk_end - chunk_start
+                    self.progress.emit(copied, kept_frames)
+
+            f.flush()
+            os.fsync(f.fileno())
+
+        return kept_frames
+
+    def _voiced_runs(self, data: np.ndarray, info: WavInfo) -> list[FrameRange]:
+        window = max(info.sample_rate * self.window_duration // 1000, 1)
+        chunk_frames = window * self.chunk_windows
+        min_energy = 10.0 ** (self._threshold / 10.0)
+
+        runs: list[FrameRange] = []
+
+        for chunk_start in range(0, info.frame_count, chunk_frames):
+            self._check_cancelled()
+
+            chunk_end = min(chunk_start + chunk_frames, info.frame_count)
+            samples = decode_frames(data[chunk_start * info.block_align : chunk_end * info.block_align], info)
+
+            energy = np.mean(np.square(samples, dtype=np.float64), axis=1)
+            window_starts = np.arange(0, energy.size, window)
+            window_energy = np.add.reduceat(energy, window_starts) / np.diff(window_starts, append=energy.size)
+
+            edges = np.diff((window_energy > min_energy).astype(np.int8), prepend=0, append=0)
+            starts = chunk_start + np.flatnonzero(edges == 1) * window
+            ends = np.minimum(chunk_start + np.flatnonzero(edges == -1) * window, chunk_end)
+
+            for start, end in zip(starts.tolist(), ends.tolist()):
+                if runs and runs[-1][1] == start:
+                    runs[-1] = (runs[-1][0], end)
+                else:
+                    runs.append((start, end))
+
+            self.progress.emit(chunk_end, info.frame_count)
+
+        return runs
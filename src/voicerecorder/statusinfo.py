@@ -43,8 +43,8 @@ class StatusInfo(QWidget):
         self._animation_timer.start()
         self.setVisible(True)
 
-    def set_pause_status(self):
-        self._status_text.setText(self.tr('Paused'))
+    def set_pause_status(self, auto: bool = False):
+        self._status_text.setText(self.tr('Paused (no voice)') if auto else self.tr('Paused'))
         self._animation_timer.stop()
         self._status_icon_opacity.setOpacity(0.5)
         self.setVisible(True)
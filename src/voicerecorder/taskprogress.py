@@ -0,0 +1,77 @@
+from PySide6.QtWidgets import QHBoxLayout, QLabel, QMessageBox, QProgressBar, QToolButton, QWidget
+
+from .tasks import Task
+
+
+class TaskProgress(QWidget):
+    """Shows the progress of the latest running background task and allows to cancel it"""
+
+    def __init__(self, parent: QWidget | None = None, *args, **kwargs):
+        super().__init__(parent, *args, **kwargs)
+
+        self._tasks: list[tuple[Task, str]] = []
+        self._progress: dict[Task, tuple[int, int]] = {}
+
+        self._text = QLabel()
+
+        self._progress_bar = QProgressBar()
+        self._progress_bar.setMaximumWidth(120)
+        self._progress_bar.setTextVisible(False)
+
+        self._cancel_button = QToolButton()
+        self._cancel_button.setText('✕')
+        self._cancel_button.setAutoRaise(True)
+        self._cancel_button.setToolTip(self.tr('Cancel'))
+        self._cancel_button.clicked.connect(self._cancel_current)
+
+        self._layout = QHBoxLayout()
+        self._layout.addWidget(self._text)
+        self._layout.addWidget(self._progress_bar)
+        self._layout.addWidget(self._cancel_button)
+        self._layout.setContentsMargins(5, 0, 5, 5)
+
+        self.setLayout(self._layout)
+        self.setVisible(False)
+
+    def track(self, task: Task, text: str) -> None:
+        self._tasks.append((task, text))
+        self._progress[task] = (0, 0)
+
+        task.progress.connect(lambda done, total: self._on_task_progress(task, done, total))
+        task.failed.connect(lambda message: self._on_task_failed(text, message))
+        task.finished.connect(lambda: self._on_task_finished(task))
+
+        self._update()
+
+    def _current(self) -> tuple[Task, str] | None:
+        return self._tasks[-1] if self._tasks else None
+
+    def _cancel_current(self) -> None:
+        if current := self._current():
+            current[0].cancel()
+
+    def _on_task_progress(self, task: Task, done: int, total: int) -> None:
+        if task in self._progress:
+            self._progress[task] = (done, total)
+            self._update()
+
+    def _on_task_failed(self, text: str, message: str) -> None:
+        QMessageBox.warning(self.window(), text, message)
+
+    def _on_task_finished(self, task: Task) -> None:
+        self._tasks = [item for item in self._tasks if item[0] is not task]
+        self._progress.pop(task, None)
+        self._update()
+
+    def _update(self) -> None:
+        if not (current := self._current()):
+            self.setVisible(False)
+            return
+
+        task, text = current
+        done, total = self._progress[task]
+
+        self._text.setText(text)
+        self._progress_bar.setRange(0, total)
+        self._progress_bar.setValue(done)
+        self.setVisible(True)
@@ -0,0 +1,111 @@
+from typing import Any
+from collections.abc import Callable, Iterable
+from functools import partial
+import threading
+
+from PySide6.QtCore import QObject, QThreadPool, Signal
+
+
+class TaskCancelled(Exception):
+    """Raised by the task that stops because it has been cancelled"""
+
+
+class Task(QObject):
+    """Background task running on a thread pool
+
+    The signals are emitted from the worker threads and are delivered to the receivers
+    in their own threads, so the task can be connected to widgets directly.
+    The task that stops on cancellation emits cancelled instead of failed.
+    """
+
+    progress = Signal(int, int)
+    failed = Signal(str)
+    cancelled = Signal()
+    finished = Signal()
+
+    def __init__(self, thread_pool: QThreadPool | None = None, parent: QObject | None = None):
+        super().__init__(parent)
+
+        self._thread_pool = thread_pool or QThreadPool.globalInstance()
+        self._cancel_event = threading.Event()
+
+    def start(self) -> None:
+        self._thread_pool.start(self._run)
+
+    def cancel(self) -> None:
+        self._cancel_event.set()
+
+    def is_cancelled(self) -> bool:
+        return self._cancel_event.is_set()
+
+    def run(self) -> None:
+        raise NotImplementedError
+
+    def _check_cancelled(self) -> None:
+        if self.is_cancelled():
+            raise TaskCancelled
+
+    def _run(self) -> None:
+        try:
+            self.run()
+        except TaskCancelled:
+            self.cancelled.emit()
+        except Exception as err:
+            self.failed.emit(str(err))
+        finally:
+            self.finished.emit()
+
+
+class BatchTask(Task):
+    """Applies the function to every item in parallel on the thread pool workers
+
+    The items that have not started yet are skipped after cancellation,
+    the items that stop on cancellation are not reported as failed.
+    """
+
+    item_done = Signal(object, object)
+    item_failed = Signal(object, str)
+
+    def __init__(
+        self,
+        func: Callable[[Any], Any],
+        items: Iterable[Any],
+        thread_pool: QThreadPool | None = None,
+        parent: QObject | None = None,
+    ):
+        super().__init__(thread_pool, parent)
+
+        self._func = func
+        self._items = list(items)
+        self._done_count = 0
+        self._lock = threading.Lock()
+
+    def start(self) -> None:
+        if not self._items:
+            self.finished.emit()
+            return
+
+        for item in self._items:
+            self._thread_pool.start(partial(self._run_item, item))
+
+    def _run_item(self, item: Any) -> None:
+        if not self.is_cancelled():
+            try:
+                result = self._func(item)
+            except TaskCancelled:
+                pass
+            except Exception as err:
+                self.item_failed.emit(item, str(err))
+            else:
+                self.item_done.emit(item, result)
+
+        with self._lock:
+            self._done_count += 1
+            done_count = self._done_count
+
+        self.progress.emit(done_count, len(self._items))
+
+        if done_count == len(self._items):
+            if self.is_cancelled():
+                self.cancelled.emit()
+            self.finished.emit()
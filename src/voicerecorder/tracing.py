@@ -0,0 +1,181 @@
+"""
+Lightweight tracing with named spans written as a Chrome trace (Perfetto compatible) JSON file
+
+The tracing is enabled with the VOICERECORDER_TRACE environment variable or the --trace command line
+option set to the trace file path, the file is written when the process exits. When the tracing is
+disabled, a span is a shared no-op context manager.
+
+    VOICERECORDER_TRACE=trace.json voicerecorder
+    voicerecorder --trace trace.json list
+
+"""
+
+from typing import Any
+import atexit
+from collections.abc import Callable, Sequence
+from functools import wraps
+import json
+import os
+from pathlib import Path
+import threading
+import time
+
+TRACE_ENV = 'VOICERECORDER_TRACE'
+TRACE_OPTION = '--trace'
+
+
+class _NullSpan:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        return False
+
+
+_NULL_SPAN = _NullSpan()
+
+
+class Tracer:
+    """Collects the complete events of the spans from all threads and writes them to the trace file"""
+
+    def __init__(self, path: Path):
+        self._path = path
+        self._pid = os.getpid()
+        self._events: list[dict[str, Any]] = []
+        self._thread_names: dict[int, str] = {}
+        self._lock = threading.Lock()
+
+    def add(self, name: str, category: str, start: int, end: int, args: dict[str, Any] | None) -> None:
+        tid = threading.get_native_id()
+        event = {
+            'name': name,
+            'cat': category,
+            'ph': 'X',
+            'ts': start / 1000,
+            'dur': (end - start) / 1000,
+            'pid': self._pid,
+            'tid': tid,
+        }
+        if args:
+            event['args'] = args
+
+        with self._lock:
+            self._events.append(event)
+            if tid not in self._thread_names:
+                self._thread_names[tid] = threading.current_thread().name
+
+    def instant(self, name: str, category: str) -> None:
+        with self._lock:
+            self._events.append(
+                {
+                    'name': name,
+                    'cat': category,
+                    'ph': 'i',
+                    's': 'p',
+                    'ts': time.perf_counter_ns() / 1000,
+                    'pid': self._pid,
+                    'tid': threading.get_native_id(),
+                }
+            )
+
+    def write(self) -> None:
+        with self._lock:
+            events = list(self._events)
+            thread_names = dict(self._thread_names)
+
+        metadata = [
+            {'name': 'thread_name', 'ph': 'M', 'pid': self._pid, 'tid': tid, 'args': {'name': name}}
+            for tid, name in thread_names.items()
+        ]
+
+        self._path.parent.mkdir(parents=True, exist_ok=True)
+        with self._path.open('w', encoding='utf-8') as f:
+            json.dump({'traceEvents': metadata + events, 'displayTimeUnit': 'ms'}, f)
+
+
+class _Span:
+    __slots__ = ('_tracer', '_name', '_category', '_args', '_start')
+
+    def __init__(self, tracer: Tracer, name: str, category: str, args: dict[str, Any]):
+        self._tracer = tracer
+        self._name = name
+        self._category = category
+        self._args = args
+        self._start = 0
+
+    def __enter__(self):
+        self._start = time.perf_counter_ns()
+        return self
+
+    def __exit__(self, *exc_info):
+        self._tracer.add(self._name, self._category, self._start, time.perf_counter_ns(), self._args)
+        return False
+
+
+_tracer: Tracer | None = None
+
+
+def enable(path: Path) -> None:
+    """Starts collecting the spans, the trace is written to the file at exit"""
+
+    global _tracer
+
+    if _tracer is not None:
+        return
+
+    _tracer = Tracer(path)
+    atexit.register(_tracer.write)
+
+
+def configure(argv: Sequence[str]) -> list[str]:
+    """Enables the tracing from the environment or the --trace option and returns the arguments without it"""
+
+    args = list(argv)
+    path = os.environ.get(TRACE_ENV)
+
+    for index, arg in enumerate(args):
+        if arg == TRACE_OPTION and index + 1 < len(args):
+            path = args[index + 1]
+            del args[index : index + 2]
+            break
+        if arg.startswith(f'{TRACE_OPTION}='):
+            path = arg.partition('=')[2]
+            del args[index]
+            break
+
+    if path:
+        enable(Path(path))
+    return args
+
+
+def span(name: str, category: str = 'app', **args: Any) -> _Span | _NullSpan:
+    """Returns the context manager that measures the named span"""
+
+    if _tracer is None:
+        return _NULL_SPAN
+    return _Span(_tracer, name, category, args)
+
+
+def instant(name: str, category: str = 'app') -> None:
+    """Marks the moment in the trace"""
+
+    if _tracer is not None:
+        _tracer.instant(name, category)
+
+
+def traced[**P, R](name: str, category: str = 'app') -> Callable[[Callable[P, R]], Callable[P, R]]:
+    """Decorator that measures every call of the function as the named span"""
+
+    def decorator(func: Callable[P, R]) -> Callable[P, R]:
+        @wraps(func)
+        def wrapper(*args: P.args, **kwargs: P.kwargs) -> R:
+            if _tracer is None:
+                return func(*args, **kwargs)
+            with _Span(_tracer, name, category, {}):
+                return func(*args, **kwargs)
+
+        return wrapper
+
+    return decorator
@@ -2,6 +2,18 @@ from datetime import datetime, timedelta
 
 from PySide6.QtMultimedia import QMediaFormat
 
+# Audio file formats (containers) the records can be written to and their file suffixes
+AUDIO_FILE_FORMATS = {
+    QMediaFormat.FileFormat.Mpeg4Audio: '.mp4a',
+    QMediaFormat.FileFormat.Matroska: '.mka',
+    QMediaFormat.FileFormat.Ogg: '.oga',
+    QMediaFormat.FileFormat.Wave: '.wav',
+    QMediaFormat.FileFormat.WMA: '.wma',
+    QMediaFormat.FileFormat.MP3: '.mp3',
+    QMediaFormat.FileFormat.AAC: '.aac',
+    QMediaFormat.FileFormat.FLAC: '.flac',
+}
+
 
 def format_duration(duration: int) -> str:
     duration_delta = timedelta(seconds=duration // 1000)
@@ -12,6 +24,14 @@ def format_timestamp(timestamp: int | float, fmt: str) -> str:
     return datetime.fromtimestamp(timestamp).strftime(fmt)
 
 
+def audio_media_format(file_format: QMediaFormat.FileFormat, audio_codec: QMediaFormat.AudioCodec) -> QMediaFormat:
+    media_format = QMediaFormat()
+    media_format.setFileFormat(file_format)
+    media_format.setAudioCodec(audio_codec)
+    media_format.setVideoCodec(QMediaFormat.VideoCodec.Unspecified)
+    return media_format
+
+
 def format_audio_format(audio_format: QMediaFormat) -> str:
     file_format = QMediaFormat.fileFormatName(audio_format.fileFormat())
     audio_codec = QMediaFormat.audioCodecName(audio_format.audioCodec())
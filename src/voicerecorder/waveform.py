@@ -0,0 +1,234 @@
+from collections import OrderedDict
+from functools import partial
+import os
+import threading
+
+import numpy as np
+from PySide6.QtCore import QEventLoop, QLineF, QObject, QSize, QThread, QThreadPool, QUrl, Signal
+from PySide6.QtGui import QPalette
+from PySide6.QtMultimedia import QAudioDecoder, QAudioFormat
+from PySide6.QtWidgets import QStyle, QStyledItemDelegate
+
+from .audiosamples import mono_samples
+from .recordsdb import RecordsDatabase
+
+PEAK_BINS = 256
+
+
+class PeakAccumulator:
+    """Reduces the samples to min/max blocks as they are decoded
+
+    Only the block extrema are kept, so the memory does not depend on the record length.
+    """
+
+    block_size = 1024
+
+    def __init__(self):
+        self._mins: list[np.ndarray] = []
+        self._maxs: list[np.ndarray] = []
+        self._tail = np.empty(0, dtype=np.float32)
+
+    def add(self, samples: np.ndarray) -> None:
+        samples = np.concatenate((self._tail, samples))
+        size = samples.size - samples.size % self.block_size
+
+        blocks = samples[:size].reshape(-1, self.block_size)
+        self._mins.append(blocks.min(axis=1))
+        self._maxs.append(blocks.max(axis=1))
+
+        self._tail = samples[size:]
+
+    def peaks(self, bins: int = PEAK_BINS) -> np.ndarray:
+        """Returns the envelope as int8 array of (min, max) pairs with the given number of bins"""
+
+        block_mins = list(self._mins)
+        block_maxs = list(self._maxs)
+
+        if self._tail.size:
+            block_mins.append(self._tail.min(keepdims=True))
+            block_maxs.append(self._tail.max(keepdims=True))
+
+        if not block_mins:
+            return np.zeros((bins, 2), dtype=np.int8)
+
+        mins = np.concatenate(block_mins)
+        maxs = np.concatenate(block_maxs)
+
+        edges = np.linspace(0, mins.size, bins + 1).astype(np.intp)[:-1]
+        envelope = np.stack((np.minimum.reduceat(mins, edges), np.maximum.reduceat(maxs, edges)), axis=1)
+
+        return np.round(np.clip(envelope, -1.0, 1.0) * 127).astype(np.int8)
+
+
+def decode_peaks(filename: str, cancel_event: threading.Event | None = None) -> np.ndarray:
+    """Decodes the audio file and computes its min/max envelope
+
+    The decoder runs its own event loop, so the function must be called from a worker thread.
+    """
+
+    audio_format = QAudioFormat()
+    audio_format.setSampleFormat(QAudioFormat.SampleFormat.Float)
+    audio_format.setChannelCount(1)
+    audio_format.setSampleRate(8000)
+
+    decoder = QAudioDecoder()
+    decoder.setAudioFormat(audio_format)
+    decoder.setSource(QUrl.fromLocalFile(filename))
+
+    accumulator = PeakAccumulator()
+    loop = QEventLoop()
+    errors = []
+
+    def read_buffer():
+        if cancel_event is not None and cancel_event.is_set():
+            errors.append('Decoding has been cancelled')
+            decoder.stop()
+            loop.quit()
+            return
+
+        buffer = decoder.read()
+        accumulator.add(mono_samples(bytes(buffer.constData()), buffer.format()))
+
+    def fail(_error):
+        errors.append(decoder.errorString())
+        loop.quit()
+
+    decoder.bufferReady.connect(read_buffer)
+    decoder.finished.connect(loop.quit)
+    decoder.error.connect(fail)
+
+    decoder.start()
+    loop.exec()
+
+    if errors:
+        raise RuntimeError(f'Cannot decode {filename!r}: {errors[0]}')
+    return accumulator.peaks()
+
+
+class WaveformCache(QObject):
+    """Waveform peaks of the records
+
+    The peaks of the recently drawn records are kept in memory and all of them are stored
+    in the records database by filename and mtime. Missing or outdated peaks are computed
+    by the workers of the own thread pool, never on the GUI thread.
+    """
+
+    peaks_changed = Signal(str)
+    _peaks_computed = Signal(str, int, object)
+
+    memory_size = 2048
+
+    def __init__(self, records_db: RecordsDatabase, parent: QObject | None = None):
+        super().__init__(parent)
+
+        self._records_db = records_db
+        self._peaks: OrderedDict[str, np.ndarray | None] = OrderedDict()
+
+        self._cancel_event = threading.Event()
+        self._thread_pool = QThreadPool(self)
+        self._thread_pool.setMaxThreadCount(max(1, QThread.idealThreadCount() // 2))
+
+        self._peaks_computed.connect(self._on_peaks_computed)
+
+    def peaks(self, filename: str) -> np.ndarray | None:
+        """Returns the known peaks of the record file and schedules their (re)computing if needed"""
+
+        if filename in self._peaks:
+            self._peaks.move_to_end(filename)
+            return self._peaks[filename]
+
+        peaks = mtime = None
+
+        if stored := self._records_db.waveform(filename):
+            mtime, data = stored
+            peaks = np.frombuffer(data, dtype=np.int8).reshape(-1, 2)
+
+        self._peaks[filename] = peaks
+        while len(self._peaks) > self.memory_size:
+            self._peaks.popitem(last=False)
+
+        self._thread_pool.start(partial(self._compute_peaks, filename, mtime))
+        return peaks
+
+    def close(self) -> None:
+        self._cancel_event.set()
+        self._thread_pool.clear()
+        self._thread_pool.waitForDone()
+
+    def _compute_peaks(self, filename: str, stored_mtime: int | None) -> None:
+        if self._cancel_event.is_set():
+            return
+
+        try:
+            mtime = os.stat(filename).st_mtime_ns
+        except OSError:
+            return
+        if mtime == stored_mtime:
+            return
+
+        try:
+            peaks = decode_peaks(filename, self._cancel_event)
+        except RuntimeError:
+            return
+
+        self._peaks_computed.emit(filename, mtime, peaks)
+
+    def _on_peaks_computed(self, filename: str, mtime: int, peaks: np.ndarray) -> None:
+        self._records_db.set_waveform(filename, mtime, peaks.tobytes())
+
+        if filename in self._peaks:
+            self._peaks[filename] = peaks
+        self.peaks_changed.emit(filename)
+
+
+class WaveformDelegate(QStyledItemDelegate):
+    """Draws the waveform thumbnail of the record from the waveform cache"""
+
+    width = 120
+
+    def __init__(self, waveform_cache: WaveformCache, filename_column: int, parent: QObject | None = None):
+        super().__init__(parent)
+        self._waveform_cache = waveform_cache
+        self._filename_column = filename_column
+
+    def paint(self, painter, option, index):
+        super().paint(painter, option, index)
+
+        filename = index.siblingAtColumn(self._filename_column).data()
+        if not filename:
+            return
+
+        peaks = self._waveform_cache.peaks(filename)
+        rect = option.rect.adjusted(2, 2, -2, -2)
+
+        if peaks is None or rect.width() <= 0:
+            return
+
+        width = rect.width()
+        edges = np.linspace(0, len(peaks), width + 1).astype(np.intp)[:-1]
+        mins = np.minimum.reduceat(peaks[:, 0], edges) / 127
+        maxs = np.maximum.reduceat(peaks[:, 1], edges) / 127
+
+        center = rect.top() + rect.height() / 2
+        half_height = rect.height() / 2
+        tops = center - maxs * half_height
+        bottoms = center - mins * half_height
+
+        lines = [QLineF(rect.left() + x, tops[x], rect.left() + x, bottoms[x]) for x in range(width)]
+
+        if option.state & QStyle.StateFlag.State_Selected:
+            color = option.palette.color(QPalette.ColorRole.HighlightedText)
+        else:
+            color = option.palette.color(QPalette.ColorRole.Text)
+
+        painter.save()
+        painter.setPen(color)
+        painter.drawLines(lines)
+        painter.restore()
+
+    def sizeHint(self, option, index):
+        size = super().sizeHint(option, index)
+        return QSize(self.width, size.height())
+
+    def createEditor(self, parent, option, index):
+        return None
@@ -0,0 +1,7 @@
+from PySide6.QtCore import QCoreApplication
+import pytest
+
+
+@pytest.fixture(scope='session')
+def app() -> QCoreApplication:
+    return QCoreApplication.instance() or QCoreApplication([])
@@ -0,0 +1,81 @@
+from pathlib import Path
+import struct
+import wave
+
+import pytest
+
+from voicerecorder.journal import RecordingJournal, RecordingRecovery
+from voicerecorder.recordsdb import RecordsDatabase
+
+
+def _wav(path: Path, sample_rate: int, frames: int) -> None:
+    with wave.open(str(path), 'wb') as f:
+        f.setnchannels(1)
+        f.setsampwidth(2)
+        f.setframerate(8000)
+        f.writeframes(b'\x01\x00' * frames)
+
+    # The sample rate of the fmt chunk
+    data = bytearray(path.read_bytes())
+    data[24:28] = struct.pack('<I', sample_rate)
+    path.write_bytes(bytes(data))
+
+
+def _entry(entry_id: int, path: Path) -> dict:
+    return {
+        'id': entry_id,
+        'filename': path.as_posix(),
+        'location': None,
+        'created': 1_700_000_000,
+        'format': 'Wave/PCM',
+        'session': None,
+        'duration': 0,
+        'size': 0,
+    }
+
+
+def test_broken_entry_does_not_stop_recovery(tmp_path):
+    broken = tmp_path / 'broken.wav'
+    _wav(broken, 0, 8000)
+    good = tmp_path / 'good.wav'
+    _wav(good, 8000, 8000)
+
+    recovery = RecordingRecovery([_entry(1, broken), _entry(2, good)])
+    results = []
+    recovery.recovered.connect(results.append)
+    recovery.run()
+
+    [recovered] = results
+    assert [item.entry['id'] for item in recovered] == [1, 2]
+    assert recovered[0].filename is None
+    assert recovered[1].filename == good.as_posix()
+    assert recovered[1].duration == 1000
+
+
+@pytest.fixture
+def records_db(app, tmp_path):
+    records_db = RecordsDatabase(tmp_path / 'records.db', connection_name='test-journal')
+    records_db.open()
+    yield records_db
+    records_db.close()
+
+
+def test_entries_of_running_owners_are_not_unfinished(records_db, tmp_path):
+    journal = RecordingJournal(records_db)
+    other_journal = RecordingJournal(records_db)
+
+    records_db.begin_recording((tmp_path / 'own.wav').as_posix(), 1_700_000_000, 'Wave/PCM', owner=journal.owner)
+    records_db.begin_recording(
+        (tmp_path / 'other.wav').as_posix(), 1_700_000_000, 'Wave/PCM', owner=other_journal.owner
+    )
+
+    assert journal.unfinished() == []
+
+
+def test_entries_of_crashed_owner_are_unfinished_at_once(records_db, tmp_path):
+    journal = RecordingJournal(records_db)
+    filename = (tmp_path / 'crashed.wav').as_posix()
+    records_db.begin_recording(filename, 1_700_000_000, 'Wave/PCM', owner='12345-1')
+    records_db.begin_recording((tmp_path / 'legacy.wav').as_posix(), 1_700_000_000, 'Wave/PCM')
+
+    assert [entry['filename'] for entry in journal.unfinished()] == [filename]
@@ -0,0 +1,31 @@
+from PySide6.QtCore import Qt
+import pytest
+
+from voicerecorder.recordsdb import RecordsDatabase
+from voicerecorder.recordsmodel import RecordsTableModel
+
+
+@pytest.fixture
+def records_db(app, tmp_path):
+    records_db = RecordsDatabase(tmp_path / 'records.db', connection_name='test-records-model')
+    records_db.open()
+    yield records_db
+    records_db.close()
+
+
+def test_set_missing_updates_loaded_row(records_db):
+    record_id = records_db.insert_record('/records/record.mka', 1_700_000_000, 1000, 'Matroska/Opus')
+
+    model = RecordsTableModel(records_db.database())
+    model.select()
+    assert not model.is_missing(0)
+
+    changed = []
+    model.dataChanged.connect(lambda top_left, bottom_right, roles: changed.append((top_left.row(), roles)))
+
+    records_db.set_records_missing([record_id], True)
+    model.set_missing(0, True)
+
+    assert model.is_missing(0)
+    assert model.row_record(0)['missing']
+    assert changed == [(0, [Qt.ItemDataRole.ForegroundRole, Qt.ItemDataRole.ToolTipRole])]
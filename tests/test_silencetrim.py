@@ -0,0 +1,144 @@
+from pathlib import Path
+import struct
+import wave
+
+import numpy as np
+import pytest
+
+from voicerecorder.silencetrim import SilenceTrimmer, read_wav_info, repair_wav_header, retained_ranges
+
+SAMPLE_RATE = 8000
+
+
+def _unfinished_wav(path: Path, frames: int, placeholder: int, tail: bytes = b'') -> None:
+    """Writes the WAV file as the recorder leaves it after a crash: the sizes in the header are placeholders"""
+
+    with wave.open(str(path), 'wb') as f:
+        f.setnchannels(2)
+        f.setsampwidth(2)
+        f.setframerate(SAMPLE_RATE)
+        f.writeframes(b'\x01\x00\x02\x00' * frames)
+
+    data = bytearray(path.read_bytes())
+    data[4:8] = struct.pack('<I', placeholder)
+    data[40:44] = struct.pack('<I', placeholder)
+    path.write_bytes(bytes(data) + tail)
+
+
+@pytest.mark.parametrize('placeholder', [0, 4 * 100, 0xFFFFFFFF])
+def test_repair_wav_header_takes_data_up_to_end_of_file(tmp_path, placeholder):
+    path = tmp_path / 'record.wav'
+    _unfinished_wav(path, SAMPLE_RATE * 3, placeholder)
+
+    info = repair_wav_header(path)
+
+    assert info.frame_count == SAMPLE_RATE * 3
+    assert read_wav_info(path).frame_count == SAMPLE_RATE * 3
+
+    with wave.open(str(path), 'rb') as f:
+        assert f.getnframes() == SAMPLE_RATE * 3
+
+
+def test_repair_wav_header_leaves_out_incomplete_frame(tmp_path):
+    path = tmp_path / 'record.wav'
+    _unfinished_wav(path, SAMPLE_RATE, 0, tail=b'\x01\x00\x02')
+
+    info = repair_wav_header(path)
+
+    assert info.data_size == SAMPLE_RATE * 4
+    assert struct.unpack('<I', path.read_bytes()[4:8])[0] == path.stat().st_size - 8
+
+
+def _write_wav(path: Path, samples: np.ndarray) -> None:
+    with wave.open(str(path), 'wb') as f:
+        f.setnchannels(1)
+        f.setsampwidth(2)
+        f.setframerate(SAMPLE_RATE)
+        f.writeframes(samples.astype('<i2').tobytes())
+
+
+def _tone(seconds: float) -> np.ndarray:
+    t = np.arange(int(SAMPLE_RATE * seconds)) / SAMPLE_RATE
+    return (np.sin(2 * np.pi * 440 * t) * 16000).astype(np.int16)
+
+
+def _silence(seconds: float) -> np.ndarray:
+    return np.zeros(int(SAMPLE_RATE * seconds), dtype=np.int16)
+
+
+def _trim(path: Path, **kwargs) -> list[tuple[str, int]]:
+    trimmer = SilenceTrimmer(path, **kwargs)
+    trimmed = []
+    trimmer.trimmed.connect(lambda filename, duration: trimmed.append((filename, duration)))
+    trimmer.run()
+    return trimmed
+
+
+def test_retained_ranges_cut_head_and_tail():
+    assert retained_ranges([], 1000, 10) == []
+    assert retained_ranges([(100, 200), (500, 600)], 1000, 10) == [(90, 610)]
+    assert retained_ranges([(5, 200), (900, 995)], 1000, 10) == [(0, 1000)]
+
+
+def test_retained_ranges_cut_long_gaps():
+    runs = [(100, 200), (230, 300), (700, 800)]
+    assert retained_ranges(runs, 1000, 10, max_gap=50) == [(90, 310), (690, 810)]
+    assert retained_ranges(runs, 1000, 10, max_gap=500) == [(90, 810)]
+
+
+def test_voiced_runs_find_the_sound(tmp_path):
+    path = tmp_path / 'record.wav'
+    _write_wav(path, np.concatenate([_silence(0.5), _tone(1), _silence(0.5), _tone(0.25)]))
+
+    info = read_wav_info(path)
+    data = np.fromfile(path, dtype=np.uint8, offset=info.data_offset)
+
+    runs = SilenceTrimmer(path)._voiced_runs(data, info)
+
+    assert runs == [(4000, 12000), (16000, 18000)]
+
+
+def test_trimmer_cuts_silence_and_keeps_margin(tmp_path):
+    path = tmp_path / 'record.wav'
+    tone = _tone(1)
+    _write_wav(path, np.concatenate([_silence(1), tone, _silence(1)]))
+
+    trimmed = _trim(path, margin=100)
+
+    assert trimmed == [(path.as_posix(), 1200)]
+    with wave.open(str(path), 'rb') as f:
+        assert (f.getnchannels(), f.getsampwidth(), f.getframerate()) == (1, 2, SAMPLE_RATE)
+        assert f.getnframes() == SAMPLE_RATE * 12 // 10
+        frames = np.frombuffer(f.readframes(f.getnframes()), dtype='<i2')
+
+    margin = SAMPLE_RATE // 10
+    assert not frames[:margin].any() and not frames[-margin:].any()
+    assert np.array_equal(frames[margin:-margin], tone)
+    assert read_wav_info(path).data_size == path.stat().st_size - read_wav_info(path).data_offset
+
+
+def test_trimmer_cuts_long_gaps(tmp_path):
+    path = tmp_path / 'record.wav'
+    tone = _tone(0.5)
+    _write_wav(path, np.concatenate([tone, _silence(2), tone]))
+
+    trimmed = _trim(path, margin=100, max_gap=500)
+
+    # The margins are kept only on the gap side of the tones at the edges of the record
+    assert trimmed == [(path.as_posix(), 1200)]
+    with wave.open(str(path), 'rb') as f:
+        frames = np.frombuffer(f.readframes(f.getnframes()), dtype='<i2')
+
+    margin = SAMPLE_RATE // 10
+    assert np.array_equal(frames, np.concatenate([tone, _silence(0.1), _silence(0.1), tone]))
+    assert frames.size == (tone.size + margin) * 2
+
+
+def test_trimmer_leaves_silent_record(tmp_path):
+    path = tmp_path / 'record.wav'
+    _write_wav(path, _silence(2))
+    data = path.read_bytes()
+
+    assert _trim(path) == []
+    assert path.read_bytes() == data
+    assert not path.with_name(f'{path.name}.part').exists()
@@ -0,0 +1,57 @@
+from voicerecorder.tasks import BatchTask, Task
+
+
+class _Task(Task):
+    def __init__(self, error: Exception | None = None):
+        super().__init__()
+        self._error = error
+
+    def run(self) -> None:
+        self._check_cancelled()
+        if self._error is not None:
+            raise self._error
+
+
+def _outcomes(task: Task) -> list[str]:
+    outcomes = []
+    task.failed.connect(lambda message: outcomes.append(f'failed: {message}'))
+    task.cancelled.connect(lambda: outcomes.append('cancelled'))
+    task.finished.connect(lambda: outcomes.append('finished'))
+    return outcomes
+
+
+def test_cancelled_task_does_not_fail():
+    task = _Task()
+    outcomes = _outcomes(task)
+
+    task.cancel()
+    task._run()
+
+    assert outcomes == ['cancelled', 'finished']
+
+
+def test_task_error_fails():
+    task = _Task(RuntimeError('broken'))
+    outcomes = _outcomes(task)
+
+    task._run()
+
+    assert outcomes == ['failed: broken', 'finished']
+
+
+def test_cancelled_batch_items_do_not_fail():
+    def func(item):
+        task._check_cancelled()
+        return item
+
+    task = BatchTask(func, [1, 2])
+    outcomes = _outcomes(task)
+    failed_items = []
+    task.item_failed.connect(lambda item, _: failed_items.append(item))
+
+    task.cancel()
+    task._run_item(1)
+    task._run_item(2)
+
+    assert failed_items == []
+    assert outcomes == ['cancelled', 'finished']